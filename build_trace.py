@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Per-stage build instrumentation shared by the challenge build scripts.
+
+A Tracer records timed spans. Each span notes:
+
+  - wall time and CPU time
+  - CPU time of child processes that finished inside it (ffmpeg, gcc,
+    strip, strings)
+  - peak RSS
+  - optional bytes in and out
+
+Spans nest. Spans recorded in worker processes are returned as plain dicts
+(tracer.records) and merged into the parent tracer.
+
+    tracer = Tracer("the_snap")
+    with tracer.span("png", bytes_in=len(payload)) as span:
+        png = build_png(payload)
+        span.bytes_out = len(png)
+    print(tracer.summary())
+    tracer.write_trace("build_trace.json")    # chrome://tracing / Perfetto
+    tracer.append_history("history.jsonl")    # one line per build
+
+CPU time, child CPU time and peak RSS are process-wide counters, so a
+span's figures are only its own when nothing else ran beside it. Each
+span records its scope:
+
+  own      no span of another thread overlapped it: the figures are its own
+  process  it started alone, but spans in other threads (e.g. workers it
+           started) ran while it was open: the figures cover the whole
+           process and include theirs
+  thread   it started while another thread had a span open: cpu_s is the
+           thread's own CPU time; child CPU and peak RSS cannot be
+           attributed and are left empty
+
+Peak RSS uses the Linux VmHWM counter. Only a span that starts with no
+other thread's span open resets it; a nested span keeps its parent's peak
+so far. Elsewhere it falls back to ru_maxrss, the process-lifetime peak.
+"""
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_STATUS = '/proc/self/status'
+_CLEAR_REFS = '/proc/self/clear_refs'
+
+# Open spans and span starts per thread, across every Tracer in the process
+_activity_lock = threading.Lock()
+_open = {}
+_starts = {}
+
+
+def _forget_activity():
+    """A forked worker starts with no spans open (the parent's are not its own)."""
+    global _activity_lock
+    _activity_lock = threading.Lock()
+    _open.clear()
+    _starts.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_activity)
+
+
+def _enter(tid):
+    """(other threads have spans open?, start marks) for a span starting in `tid`."""
+    with _activity_lock:
+        busy = any(n for t, n in _open.items() if t != tid)
+        _open[tid] = _open.get(tid, 0) + 1
+        _starts[tid] = _starts.get(tid, 0) + 1
+        return busy, (sum(_starts.values()), _starts[tid])
+
+
+def _leave(tid, marks):
+    """True if a span started in another thread since `marks`."""
+    with _activity_lock:
+        _open[tid] -= 1
+        total, own = marks
+        return (sum(_starts.values()) - total) - (_starts[tid] - own) > 0
+
+
+def _children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _maxrss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def _read_hwm_mb():
+    """Peak RSS since the last reset, in MB (None if unavailable)."""
+    try:
+        with open(_STATUS) as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _can_reset_hwm():
+    return os.access(_CLEAR_REFS, os.W_OK)
+
+
+def _reset_hwm():
+    """Reset the VmHWM peak counter (process-wide); False where unsupported."""
+    try:
+        with open(_CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class Span:
+    """One timed region; set bytes_in / bytes_out / args while it is open."""
+
+    __slots__ = ('name', 'bytes_in', 'bytes_out', 'args', 'start', 'duration',
+                 'cpu_s', 'subprocess_s', 'peak_rss_mb', 'scope', 'depth', 'pid', 'tid')
+
+    def __init__(self, name, bytes_in=None, depth=0, **args):
+        self.name = name
+        self.bytes_in = bytes_in
+        self.bytes_out = None
+        self.args = args
+        self.depth = depth
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.start = self.duration = self.cpu_s = self.subprocess_s = None
+        self.peak_rss_mb = self.scope = None
+
+    def record(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class Tracer:
+    """Collects spans for one build run."""
+
+    def __init__(self, name):
+        self.name = name
+        self.records = []
+        self.started = time.time()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hwm = _read_hwm_mb() is not None and _can_reset_hwm()
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _peak_now(self):
+        return _read_hwm_mb() if self._hwm else _maxrss_mb()
+
+    @contextmanager
+    def span(self, name, bytes_in=None, **args):
+        """Time the enclosed block as a span named `name`."""
+        stack = self._stack()
+        span = Span(name, bytes_in, len(stack), **args)
+        busy, marks = _enter(span.tid)
+        if busy:
+            span.scope = "thread"
+        elif self._hwm:
+            if stack:
+                # The reset below would hide the parent's peak so far
+                stack[-1].peak_rss_mb = max(stack[-1].peak_rss_mb or 0, self._peak_now())
+            _reset_hwm()
+        stack.append(span)
+        span.start = time.time()
+        t0, cpu0, thread0, child0 = (time.perf_counter(), time.process_time(),
+                                     time.thread_time(), _children_cpu())
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - t0
+            overlapped = _leave(span.tid, marks)
+            if busy:
+                span.cpu_s = time.thread_time() - thread0
+            else:
+                span.scope = "process" if overlapped else "own"
+                span.cpu_s = time.process_time() - cpu0
+                span.subprocess_s = _children_cpu() - child0
+                span.peak_rss_mb = max(span.peak_rss_mb or 0, self._peak_now())
+            stack.pop()
+            if stack and span.peak_rss_mb is not None:
+                stack[-1].peak_rss_mb = max(stack[-1].peak_rss_mb or 0, span.peak_rss_mb)
+            with self._lock:
+                self.records.append(span.record())
+
+    def merge(self, records, depth=None, **args):
+        """
+        Add span records produced elsewhere (e.g. by a worker process),
+        nested under the calling thread's open span unless depth is given.
+        """
+        if depth is None:
+            depth = len(self._stack())
+        with self._lock:
+            for rec in records:
+                rec = dict(rec)
+                rec['depth'] += depth
+                rec['args'] = {**rec.get('args', {}), **args}
+                self.records.append(rec)
+
+    # ── Output ──
+    def totals(self):
+        """Totals per span name: {name: {count, seconds, cpu_s, ...}}."""
+        out = {}
+        for rec in self.records:
+            entry = out.setdefault(rec['name'], {"count": 0, "seconds": 0.0, "cpu_s": 0.0,
+                                                 "subprocess_s": 0.0, "peak_rss_mb": 0.0,
+                                                 "bytes_in": 0, "bytes_out": 0})
+            entry["count"] += 1
+            entry["seconds"] += rec['duration']
+            entry["cpu_s"] += rec['cpu_s']
+            entry["subprocess_s"] += rec['subprocess_s'] or 0
+            entry["peak_rss_mb"] = max(entry["peak_rss_mb"], rec['peak_rss_mb'] or 0)
+            entry["bytes_in"] += rec['bytes_in'] or 0
+            entry["bytes_out"] += rec['bytes_out'] or 0
+        return out
+
+    def summary(self):
+        """Human-readable span table in start order."""
+        if not self.records:
+            return "  (no spans recorded)"
+        lines = [f"  {'span':<24} {'wall':>8} {'cpu':>8} {'subproc':>8} {'peak MB':>8} "
+                 f"{'in':>10} {'out':>10}  scope"]
+        for rec in sorted(self.records, key=lambda r: (r['start'], r['depth'])):
+            name = '  ' * rec['depth'] + rec['name']
+            size_in, size_out = (f"{n:>10}" if n is not None else f"{'-':>10}"
+                                 for n in (rec['bytes_in'], rec['bytes_out']))
+            sub, peak = (f"{rec['subprocess_s']:7.3f}s" if rec['subprocess_s'] is not None
+                         else f"{'-':>8}",
+                         f"{rec['peak_rss_mb']:8.1f}" if rec['peak_rss_mb'] is not None
+                         else f"{'-':>8}")
+            lines.append(f"  {name:<24} {rec['duration']:7.3f}s {rec['cpu_s']:7.3f}s "
+                         f"{sub} {peak} {size_in} {size_out}  {rec.get('scope') or '-'}")
+        if any(rec.get('scope') != "own" for rec in self.records):
+            lines.append("  scope: own = the span's own figures, process = whole process "
+                         "while open, thread = thread CPU only")
+        return '\n'.join(lines)
+
+    def trace_events(self):
+        """Chrome trace-event 'complete' events (microsecond timestamps)."""
+        events = []
+        for rec in self.records:
+            args = {k: rec.get(k) for k in ('cpu_s', 'subprocess_s', 'peak_rss_mb', 'scope',
+                                            'bytes_in', 'bytes_out') if rec.get(k) is not None}
+            args.update(rec['args'])
+            events.append({
+                "name": rec['name'], "cat": self.name, "ph": "X",
+                "ts": round((rec['start'] - self.started) * 1e6),
+                "dur": round(rec['duration'] * 1e6),
+                "pid": rec['pid'], "tid": rec['tid'], "args": args,
+            })
+        return events
+
+    def write_trace(self, path):
+        """Write a trace-event JSON file (loads in chrome://tracing and Perfetto)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms",
+                       "otherData": {"build": self.name,
+                                     "started": time.strftime('%Y-%m-%dT%H:%M:%S',
+                                                              time.localtime(self.started))}},
+                      f, default=str)
+        return path
+
+    def append_history(self, path, **extra):
+        """Append one JSON line of per-span totals, for trends across many builds."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        line = {"build": self.name, "started": self.started,
+                "wall_s": time.time() - self.started, "spans": self.totals(), **extra}
+        with open(path, 'a') as f:
+            f.write(json.dumps(line, default=str) + '\n')
+        return path
+
+
+def nbytes(value):
+    """Size in bytes of a bytes-like or NumPy value, else None."""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return None
+
+
+def load_history(path):
+    """Read a history file written by append_history()."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv):
+    """Summarize where build time goes across runs in a history file."""
+    if len(argv) != 1:
+        print("usage: build_trace.py HISTORY.jsonl")
+        sys.exit(2)
+    runs = load_history(argv[0])
+    totals = {}
+    for run in runs:
+        for name, entry in run["spans"].items():
+            acc = totals.setdefault(name, [0, 0.0, 0.0])
+            acc[0] += 1
+            acc[1] += entry["seconds"]
+            acc[2] += entry["subprocess_s"]
+    wall = sum(run["wall_s"] for run in runs)
+    print(f"{len(runs)} run(s), {wall:.1f}s total wall time")
+    print(f"  {'span':<24} {'runs':>6} {'total':>10} {'mean':>9} {'subproc':>10}")
+    for name, (count, seconds, sub) in sorted(totals.items(), key=lambda kv: -kv[1][1]):
+        print(f"  {name:<24} {count:>6} {seconds:9.2f}s {seconds / count:8.3f}s {sub:9.2f}s")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
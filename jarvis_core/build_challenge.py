@@ -17,8 +17,12 @@ Anti-LLM layers:
   2. Constructor initializes state (LLMs often miss constructors)
   3. Key is mutated by calibrate_heuristics() at runtime
   4. Player must trace data flow across 3 functions for real flag
+
+Compiled binaries are cached by source hash (see compile_farm.py); pass
+--no-cache to always run gcc.
 """
 
+import argparse
 import os
 import sys
 import subprocess
@@ -27,12 +31,19 @@ import struct
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(BASE_DIR, "challenge_output")
 C_SOURCE = os.path.join(BASE_DIR, "jarvis_core.c")
+TRACE_DIR = os.path.join(BASE_DIR, ".build_trace")
+CFLAGS = ["-O1", "-s"]
+
+# Shared build instrumentation lives at the repository root
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+from build_trace import Tracer
 
 # ─────────────────────────────────────────────
 # Flags
 # ─────────────────────────────────────────────
 REAL_FLAG = "MYTHX{c0r3_unl0ck3d_7}"
 FALSE_FLAG = "MYTHX{jarvis_online}"
+FLAG_PREFIX = REAL_FLAG[:REAL_FLAG.index("{") + 1]
 DECOY_XOR_KEY = 0x4A
 
 # ─────────────────────────────────────────────
@@ -95,11 +106,12 @@ def format_c_array(data, name="data"):
 
 def generate_c_source(false_enc, real_enc, init_key):
     """Generate the C source code for the challenge binary."""
+    return render_c_source(format_c_array(false_enc), format_c_array(real_enc),
+                           format_c_array(init_key))
 
-    false_arr = format_c_array(false_enc)
-    real_arr = format_c_array(real_enc)
-    init_arr = format_c_array(init_key)
 
+def render_c_source(false_arr, real_arr, init_arr):
+    """The C source with already formatted array initializers (format_c_array text)."""
     source = f'''/*
  * JARVIS Core - CTF Challenge Binary
  * Category: Reverse Engineering
@@ -239,10 +251,14 @@ int main(void) {{
     return source
 
 
-def compile_binary(source_path, output_path, target="native"):
-    """Compile and strip the binary."""
+def compile_binary(source_path, output_path, target="native", tracer=None, log=print):
+    """
+    Compile and strip the binary (gcc and strip get their own spans if
+    traced). Progress goes to `log`, so pooled callers can silence it.
+    """
+    tracer = tracer or Tracer("compile")
     cc = "gcc"
-    flags = ["-O1", "-s", "-o", output_path, source_path]
+    flags = CFLAGS + ["-o", output_path, source_path]
 
     if target == "linux" and sys.platform == "darwin":
         # Try cross-compiler
@@ -254,29 +270,35 @@ def compile_binary(source_path, output_path, target="native"):
             except (FileNotFoundError, subprocess.CalledProcessError):
                 continue
         else:
-            print("[!] No cross-compiler found. Building native (macOS) binary.")
-            print("    For Linux ELF, install: brew install x86_64-elf-gcc")
-            print("    Or use Docker: docker run --rm -v $(pwd):/work gcc gcc ...")
+            log("[!] No cross-compiler found. Building native (macOS) binary.")
+            log("    For Linux ELF, install: brew install x86_64-elf-gcc")
+            log("    Or use Docker: docker run --rm -v $(pwd):/work gcc gcc ...")
 
     cmd = [cc] + flags
-    print(f"[*] Compiling: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    log(f"[*] Compiling: {' '.join(cmd)}")
+    with tracer.span("gcc", bytes_in=os.path.getsize(source_path)) as span:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode == 0:
+            span.bytes_out = os.path.getsize(output_path)
 
     if result.returncode != 0:
-        print(f"[!] Compilation failed:\n{result.stderr}")
+        log(f"[!] Compilation failed:\n{result.stderr}")
         return False
 
     # Strip symbols
     strip_cmd = ["strip", output_path]
-    subprocess.run(strip_cmd, capture_output=True)
+    with tracer.span("strip", bytes_in=os.path.getsize(output_path)) as span:
+        subprocess.run(strip_cmd, capture_output=True)
+        span.bytes_out = os.path.getsize(output_path)
 
     size = os.path.getsize(output_path)
-    print(f"[+] Binary built: {output_path} ({size} bytes)")
+    log(f"[+] Binary built: {output_path} ({size} bytes)")
     return True
 
 
-def main():
+def main(trace_dir=TRACE_DIR, use_cache=True):
     os.makedirs(OUTPUT_DIR, exist_ok=True)
+    tracer = Tracer("jarvis_core")
 
     print("=" * 60)
     print("  Building 'JARVIS Core' CTF Challenge")
@@ -285,13 +307,17 @@ def main():
 
     # Step 1: Compute calibrated key
     print("[*] Computing calibrated key...")
-    calibrated = compute_calibrated_key(INIT_KEY)
+    with tracer.span("calibrate_key", bytes_in=len(INIT_KEY)) as span:
+        calibrated = compute_calibrated_key(INIT_KEY)
+        span.bytes_out = len(calibrated)
     print(f"    Init key:       {[f'0x{b:02X}' for b in INIT_KEY]}")
     print(f"    Calibrated key: {[f'0x{b:02X}' for b in calibrated]}")
 
     # Step 2: Encode false flag
     print(f"\n[*] Encoding false flag: {FALSE_FLAG}")
-    false_enc = encode_false_flag(FALSE_FLAG, DECOY_XOR_KEY)
+    with tracer.span("encode_false_flag", bytes_in=len(FALSE_FLAG)) as span:
+        false_enc = encode_false_flag(FALSE_FLAG, DECOY_XOR_KEY)
+        span.bytes_out = len(false_enc)
     print(f"    XOR key: 0x{DECOY_XOR_KEY:02X}")
     print(f"    Encoded: {[f'0x{b:02X}' for b in false_enc]}")
 
@@ -302,7 +328,9 @@ def main():
 
     # Step 3: Encode real flag
     print(f"\n[*] Encoding real flag: {REAL_FLAG}")
-    real_enc = encode_real_flag(REAL_FLAG, calibrated)
+    with tracer.span("encode_real_flag", bytes_in=len(REAL_FLAG)) as span:
+        real_enc = encode_real_flag(REAL_FLAG, calibrated)
+        span.bytes_out = len(real_enc)
     print(f"    Encoded: {[f'0x{b:02X}' for b in real_enc]}")
 
     # Verify real flag
@@ -311,48 +339,84 @@ def main():
 
     # Step 4: Generate C source
     print(f"\n[*] Generating C source: {C_SOURCE}")
-    source = generate_c_source(false_enc, real_enc, INIT_KEY)
-    with open(C_SOURCE, 'w') as f:
-        f.write(source)
+    with tracer.span("generate_c_source", bytes_in=len(false_enc) + len(real_enc)) as span:
+        source = generate_c_source(false_enc, real_enc, INIT_KEY)
+        with open(C_SOURCE, 'w') as f:
+            f.write(source)
+        span.bytes_out = len(source)
     print(f"[+] C source written ({len(source)} bytes)")
 
     # Step 5: Compile
     binary_path = os.path.join(OUTPUT_DIR, "jarvis_core.bin")
     print(f"\n[*] Compiling binary...")
-    if compile_binary(C_SOURCE, binary_path):
+    from compile_farm import BinaryCache, compile_source
+    with tracer.span("compile"):
+        compiled, cached, key = compile_source(source, binary_path, BinaryCache(enabled=use_cache),
+                                               tracer=tracer, log=print)
+    if compiled:
+        if cached:
+            print(f"[+] Binary cache hit ({key[:16]}): gcc and strip skipped")
         print(f"[+] Challenge binary: {binary_path}")
     else:
         print("[!] Compilation failed — see errors above")
+        print(tracer.summary())
         sys.exit(1)
 
-    # Step 6: Quick verification — run the binary
+    # Step 6: Quick verification — run the binary under the sandbox rlimits
     print(f"\n[*] Testing binary...")
+    from sandbox import RunJob, run_binaries
     try:
-        result = subprocess.run([binary_path], capture_output=True, text=True, timeout=5)
+        with tracer.span("run_binary") as span:
+            (result,), _ = run_binaries([RunJob(binary_path, binary_path, (REAL_FLAG, FALSE_FLAG))],
+                                        timeout=5)
+            span.bytes_out = len(result.stdout)
         print(f"    Output:")
         for line in result.stdout.strip().split('\n'):
             print(f"      {line}")
-        if "Authorization failed" in result.stdout:
+        if result.ok:
             print(f"    ✓ Binary correctly takes the fail path")
         else:
             print(f"    ✗ WARNING: Binary did not print expected output!")
+            for problem in result.problems:
+                print(f"      {problem}")
     except Exception as e:
         print(f"    Could not run binary: {e}")
 
-    # Step 7: Verify strings aren't visible
-    print(f"\n[*] Checking strings output...")
+    # Step 6b: Replay the dead decrypt path from the binary's own bytes
+    print(f"\n[*] Replaying decrypt path from the binary...")
+    from verifier import verify_binaries
     try:
-        result = subprocess.run(["strings", binary_path], capture_output=True, text=True)
-        if REAL_FLAG in result.stdout:
-            print(f"    ✗ CRITICAL: Real flag visible in strings!")
-        elif FALSE_FLAG in result.stdout:
-            print(f"    ✗ WARNING: False flag visible in strings!")
-        elif "MYTHIX" in result.stdout:
-            print(f"    ✗ WARNING: Flag prefix visible in strings!")
+        with tracer.span("replay", bytes_in=os.path.getsize(binary_path)) as span:
+            replayed, = verify_binaries([binary_path], [REAL_FLAG])
+            span.bytes_out = len(replayed.found or "")
+        if replayed.ok:
+            print(f"    ✓ init[] -> calibrate -> enc[] decrypts to {replayed.found}")
         else:
-            print(f"    ✓ No flag content visible in strings output")
+            print(f"    ✗ WARNING: {'; '.join(replayed.problems)}")
     except Exception as e:
-        print(f"    Could not run strings: {e}")
+        print(f"    Could not replay decrypt path: {e}")
+
+    # Step 7: Verify no flag text (plain, XOR'd or rotated) is in the binary
+    print(f"\n[*] Scanning binary for flag leaks...")
+    from leakscan import format_leak, scan_file
+    try:
+        with tracer.span("leak_scan", bytes_in=os.path.getsize(binary_path)) as span:
+            leaks = scan_file(binary_path, [REAL_FLAG, FALSE_FLAG])
+            span.bytes_out = len(leaks)
+        for leak in leaks:
+            if leak.needle != REAL_FLAG and leak.transform == f"xor 0x{DECOY_XOR_KEY:02X}":
+                print(f"    ✓ Decoy data[] is findable, as designed: {format_leak(leak)}")
+            elif leak.needle == REAL_FLAG and leak.full:
+                print(f"    ✗ CRITICAL: Real flag leaked: {format_leak(leak)}")
+            elif leak.needle == FALSE_FLAG and leak.full:
+                print(f"    ✗ WARNING: False flag leaked: {format_leak(leak)}")
+            else:
+                print(f"    ✗ WARNING: Flag prefix leaked: {format_leak(leak)}")
+        if not any(leak.transform != f"xor 0x{DECOY_XOR_KEY:02X}" or leak.needle == REAL_FLAG
+                   for leak in leaks):
+            print(f"    ✓ No flag content (plain, XOR'd or rotated) in the binary")
+    except Exception as e:
+        print(f"    Could not scan binary: {e}")
 
     print()
     print("=" * 60)
@@ -373,6 +437,20 @@ def main():
     print(f"     Using init values directly → WRONG output")
     print(f"     Using calibrated values → CORRECT flag")
 
+    print()
+    print("Build trace:")
+    print(tracer.summary())
+    if trace_dir:
+        trace_path = tracer.write_trace(os.path.join(trace_dir, "last_build.json"))
+        tracer.append_history(os.path.join(trace_dir, "history.jsonl"))
+        print(f"[*] Trace events: {trace_path} (history: {trace_dir}/history.jsonl)")
+
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Build the 'JARVIS Core' CTF challenge")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always run gcc and strip (skip the binary cache)")
+    parser.add_argument('--trace-dir', default=TRACE_DIR,
+                        help="where build traces and the history file go")
+    args = parser.parse_args()
+    main(trace_dir=args.trace_dir, use_cache=not args.no_cache)
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Parallel compile farm with a content-hash binary cache for JARVIS Core.
+
+build_challenge.py compiles one binary in series: gcc, strip, run, then a
+leak scan. The farm does the same work for many sources at once:
+
+  cache     Every binary is stored under SHA-256(C source, compiler version,
+            target, CFLAGS). A cache hit is a file copy and skips gcc and
+            strip entirely. Entries are written atomically (temp file +
+            rename), so concurrent builds never see half-written binaries.
+  compile   Misses are compiled on a bounded thread pool. The threads only
+            wait on gcc/strip subprocesses, so they overlap fully.
+  verify    Each binary is handed to a second bounded pool as soon as it
+            is built, so checks overlap with compiles still running:
+            run (with a timeout) -> check the output -> scan for flag
+            leaks in-process (leakscan.py). Once everything is built, the
+            decrypt path of all binaries is replayed in one batch
+            (verifier.py).
+
+The report gives cache hits, failures and the throughput in binaries per
+second for both stages.
+
+Usage:
+  python3 compile_farm.py teams.txt --secret "$JARVIS_VARIANT_SECRET" [-j 8]
+
+Per-team sources use the same flags and keys as variants.py, so a farm
+build of a team is the compiled counterpart of its patched variant.
+"""
+
+import argparse
+import functools
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import build_challenge as jarvis
+from leakscan import format_leak, scan_file
+from verifier import verify_binaries
+
+CACHE_DIR = os.path.join(jarvis.BASE_DIR, ".build_cache", "binaries")
+FARM_DIR = os.path.join(jarvis.OUTPUT_DIR, "farm")
+RUN_TIMEOUT = 5
+EXPECTED_OUTPUT = [
+    "Booting Stark Industries AI Core...",
+    "Loading heuristics...",
+    "JARVIS: All systems online.",
+    "JARVIS: Authorization failed.",
+]
+
+Job = namedtuple('Job', 'name source output flags init_key', defaults=(None,))
+BuildResult = namedtuple('BuildResult', 'name path key cached ok seconds')
+CheckResult = namedtuple('CheckResult', 'name ok problems seconds')
+
+
+# ─────────────────────────────────────────────
+# Binary cache
+# ─────────────────────────────────────────────
+@functools.lru_cache(maxsize=None)
+def compiler_version(cc="gcc"):
+    try:
+        return subprocess.run([cc, "--version"], capture_output=True, text=True).stdout
+    except FileNotFoundError:
+        return ""
+
+
+def cache_key(source, target="native", cc="gcc"):
+    """SHA-256 of everything that determines the binary."""
+    h = hashlib.sha256()
+    for part in (source, compiler_version(cc), target, ' '.join(jarvis.CFLAGS)):
+        h.update(part.encode())
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+class BinaryCache:
+    """Content-addressed store of compiled binaries (one file per key)."""
+
+    def __init__(self, root=CACHE_DIR, enabled=True):
+        self.root = root
+        self.enabled = enabled
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".bin")
+
+    def get(self, key, dest):
+        """Copy the cached binary for `key` to dest; False on a miss."""
+        if not self.enabled or not os.path.exists(self._path(key)):
+            return False
+        shutil.copyfile(self._path(key), dest)
+        os.chmod(dest, 0o755)
+        return True
+
+    def put(self, key, path):
+        if not self.enabled:
+            return
+        final = self._path(key)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(final), suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, final)
+
+
+def compile_source(source, output, cache=None, target="native", tracer=None, log=None):
+    """
+    Compile `source` (C text) to `output`, or copy it from the cache.
+    Returns (ok, cached, key).
+    """
+    cache = cache or BinaryCache()
+    key = cache_key(source, target)
+    if cache.get(key, output):
+        return True, True, key
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "jarvis_core.c")
+        with open(src, 'w') as f:
+            f.write(source)
+        ok = jarvis.compile_binary(src, output, target, tracer, log=log or (lambda *a: None))
+    if ok:
+        cache.put(key, output)
+    return ok, False, key
+
+
+# ─────────────────────────────────────────────
+# Verification
+# ─────────────────────────────────────────────
+def check_output(stdout, flags):
+    """Problems with a binary's stdout: it must be exactly EXPECTED_OUTPUT, no flags."""
+    problems = []
+    lines = stdout.splitlines()
+    if lines != EXPECTED_OUTPUT:
+        extra = [line for line in lines if line not in EXPECTED_OUTPUT]
+        missing = [line for line in EXPECTED_OUTPUT if line not in lines]
+        problems += [f"unexpected output line: {line!r}" for line in extra]
+        problems += [f"missing output line: {line!r}" for line in missing]
+    problems += [f"flag printed: {flag}" for flag in flags if flag in stdout]
+    return problems
+
+
+def scan_leaks(path, flags):
+    """Problems found by the leak scanner: any flag or flag prefix, plain or obfuscated."""
+    return [f"leak: {format_leak(leak)}" for leak in scan_file(path, flags)
+            if leak.transform != f"xor 0x{jarvis.DECOY_XOR_KEY:02X}" or leak.needle in flags[:1]]
+
+
+def verify_binary(name, path, flags, timeout=RUN_TIMEOUT):
+    """Run the binary, check its output and scan it for flag leaks."""
+    start = time.perf_counter()
+    try:
+        result = subprocess.run([path], capture_output=True, text=True, timeout=timeout)
+        problems = check_output(result.stdout, flags)
+        if result.returncode != 0:
+            problems.append(f"exit status {result.returncode}")
+    except subprocess.TimeoutExpired:
+        problems = [f"timed out after {timeout}s"]
+    except OSError as e:
+        problems = [f"could not run: {e}"]
+    problems += scan_leaks(path, flags)
+    return CheckResult(name, not problems, problems, time.perf_counter() - start)
+
+
+# ─────────────────────────────────────────────
+# Farm
+# ─────────────────────────────────────────────
+def _build(job, cache):
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(job.output), exist_ok=True)
+    ok, cached, key = compile_source(job.source, job.output, cache)
+    return BuildResult(job.name, job.output, key, cached, ok, time.perf_counter() - start)
+
+
+def _replay(builds, by_name):
+    """Failed CheckResults from replaying every built binary's decrypt path in one batch."""
+    start = time.perf_counter()
+    results = verify_binaries([b.path for b in builds], [by_name[b.name].flags[0] for b in builds],
+                              names=[b.name for b in builds],
+                              init_keys=[by_name[b.name].init_key for b in builds])
+    seconds = (time.perf_counter() - start) / max(1, len(builds))
+    return [CheckResult(r.name, False, [f"replay: {p}" for p in r.problems], seconds)
+            for r in results if not r.ok]
+
+
+def run_farm(jobs, workers=None, cache=None, verify=True):
+    """
+    Compile every Job on a pool of `workers` threads and verify each binary
+    as soon as it is built. Returns (builds, checks, stats).
+    """
+    workers = workers or os.cpu_count() or 1
+    cache = cache or BinaryCache()
+    by_name = {job.name: job for job in jobs}
+    builds = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as compile_pool, \
+            ThreadPoolExecutor(max_workers=workers) as verify_pool:
+        pending = {compile_pool.submit(_build, job, cache) for job in jobs}
+        verifying = []
+        while pending:
+            done, pending = wait(pending, return_when="FIRST_COMPLETED")
+            for future in done:
+                result = future.result()
+                builds.append(result)
+                if verify and result.ok:
+                    verifying.append(verify_pool.submit(
+                        verify_binary, result.name, result.path, by_name[result.name].flags))
+        compiled_at = time.perf_counter()
+        checks = [future.result() for future in verifying]
+    if verify:
+        checks += _replay([b for b in builds if b.ok], by_name)
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        "binaries": len(jobs),
+        "cache_hits": sum(b.cached for b in builds),
+        "build_failures": sum(not b.ok for b in builds),
+        "check_failures": sum(not c.ok for c in checks),
+        "compile_s": compiled_at - start,
+        "total_s": elapsed,
+        "binaries_per_s": len(jobs) / elapsed if elapsed > 0 else float('inf'),
+    }
+    return builds, checks, stats
+
+
+def team_jobs(team_ids, secret, out_dir=FARM_DIR):
+    """One Job per team, with the flags and key variants.py derives."""
+    from flag_encoder import c_sources, encode_batch
+    from variants import assign_dirs, assign_secrets
+
+    secrets = assign_secrets(team_ids, secret)
+    dirs = assign_dirs(team_ids)
+    flags = [secrets[team][0] for team in team_ids]
+    sources = c_sources(encode_batch(flags, [secrets[team][1] for team in team_ids])) \
+        if team_ids else []
+    return [Job(team, source, os.path.join(out_dir, dirs[team], "jarvis_core.bin"),
+                (flag, jarvis.FALSE_FLAG), secrets[team][1])
+            for team, flag, source in zip(team_ids, flags, sources)]
+
+
+def format_stats(stats):
+    return (f"[+] {stats['binaries']} binaries in {stats['total_s']:.2f}s "
+            f"({stats['binaries_per_s']:.1f} binaries/s; compiles done at "
+            f"{stats['compile_s']:.2f}s, {stats['cache_hits']} cache hits, "
+            f"{stats['build_failures']} build / {stats['check_failures']} check failures)")
+
+
+def main(argv=None):
+    from variants import read_team_ids
+
+    parser = argparse.ArgumentParser(description="Compile and verify per-team JARVIS Core binaries")
+    parser.add_argument('teams', help="file with one team ID per line")
+    parser.add_argument('--secret', default=os.environ.get('JARVIS_VARIANT_SECRET'),
+                        help="HMAC secret for flag derivation (default: $JARVIS_VARIANT_SECRET)")
+    parser.add_argument('-o', '--out', default=FARM_DIR, help="output directory")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="compile / verify workers (default: CPU count)")
+    parser.add_argument('--no-cache', action='store_true', help="always run gcc")
+    parser.add_argument('--no-verify', action='store_true', help="skip run / output / leak checks")
+    args = parser.parse_args(argv)
+    if not args.secret:
+        parser.error("a flag secret is required (--secret or $JARVIS_VARIANT_SECRET)")
+
+    jobs = team_jobs(read_team_ids(args.teams), args.secret, args.out)
+    print(f"[*] Compiling {len(jobs)} binaries on {args.jobs or os.cpu_count()} workers...")
+    builds, checks, stats = run_farm(jobs, args.jobs, BinaryCache(enabled=not args.no_cache),
+                                     verify=not args.no_verify)
+    for result in builds:
+        if not result.ok:
+            print(f"[!] {result.name}: compilation failed")
+    for check in checks:
+        for problem in check.problems:
+            print(f"[!] {check.name}: {problem}")
+    print(format_stats(stats))
+    if stats["build_failures"] or stats["check_failures"]:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Vectorized batch flag encoder for JARVIS Core team variants.
+
+build_challenge.py encodes one flag at a time with per-byte loops. This
+module does the same math for N teams at once on NumPy uint8 matrices:
+
+  calibrate   cal = ROL1(init) ^ (i + 1)                        (N, 16)
+  decoy       data = FALSE_FLAG ^ DECOY_XOR_KEY                 (N, n)
+  real        enc[i] = (flag[i] + 3i) ^ cal[i % 16]             (N, L)
+
+uint8 arithmetic wraps mod 256 exactly like the C code, so no masking is
+needed. From the matrices it emits per-team C initializers (the same text
+format_c_array() produces, through a hex digit table), whole C sources
+built from those initializers, or patch blobs (the patcher template
+tiled to N rows, each array written with one fancy-indexed assignment).
+round_trip() decrypts the whole batch with verifier.py's replay and
+compares it to the flags in one operation.
+
+Usage:
+  python3 flag_encoder.py [N] [--blobs]    # time each step for N synthetic teams
+"""
+
+import hashlib
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import build_challenge as jarvis
+from patcher import FIELDS, PatchError, _build_id_range
+from verifier import calibrate, decrypt
+
+Encoded = namedtuple('Encoded', 'init calibrated data enc')
+
+_DIGITS = np.frombuffer(''.join(f"{b:02X}" for b in range(256)).encode(),
+                        dtype=np.uint8).reshape(256, 2)
+
+
+def flag_matrix(flags):
+    """(N, L) uint8 matrix of equal-length ASCII flags."""
+    lengths = {len(flag) for flag in flags}
+    if len(lengths) != 1:
+        raise ValueError(f"Flags in one batch must share a length, got {sorted(lengths)}")
+    return np.frombuffer(''.join(flags).encode('ascii'), dtype=np.uint8).reshape(len(flags), -1)
+
+
+def encode_batch(flags, init_keys):
+    """
+    Encode N flags with N init keys ((N, 16) array-like, or a list of
+    16-byte keys). Returns Encoded matrices (init, calibrated, data, enc).
+    """
+    init = np.asarray([list(k) for k in init_keys] if not isinstance(init_keys, np.ndarray)
+                      else init_keys, dtype=np.uint8)
+    plain = flag_matrix(flags)
+    if init.shape != (len(plain), len(jarvis.INIT_KEY)):
+        raise ValueError(f"Expected ({len(plain)}, {len(jarvis.INIT_KEY)}) init keys, "
+                         f"got {init.shape}")
+    cal = calibrate(init)
+    i = np.arange(plain.shape[1])
+    enc = (plain + (i * 3).astype(np.uint8)) ^ cal[:, i % cal.shape[1]]
+    decoy = np.frombuffer(jarvis.FALSE_FLAG.encode(), dtype=np.uint8) ^ np.uint8(jarvis.DECOY_XOR_KEY)
+    data = np.broadcast_to(decoy, (len(plain), len(decoy)))
+    return Encoded(init, cal, data, enc)
+
+
+def round_trip(encoded, flags):
+    """(N,) bool: the decoy decodes to FALSE_FLAG and enc decrypts to each flag."""
+    real = decrypt(encoded.enc, calibrate(encoded.init)) == flag_matrix(flags)
+    decoy = (encoded.data ^ np.uint8(jarvis.DECOY_XOR_KEY)) == \
+        np.frombuffer(jarvis.FALSE_FLAG.encode(), dtype=np.uint8)
+    return real.all(axis=1) & decoy.all(axis=1)
+
+
+# ─────────────────────────────────────────────
+# Emitters
+# ─────────────────────────────────────────────
+def c_initializers(matrix, per_line=12, indent="        "):
+    """
+    One C array initializer per row, formatted like format_c_array(). The
+    text is laid out once with "0x??" cells and every row's hex digits are
+    written into an (N, chars) matrix through the digit table.
+    """
+    n = matrix.shape[1]
+    lines = [indent + ", ".join(["0x??"] * (min(i + per_line, n) - i))
+             for i in range(0, n, per_line)]
+    layout = np.frombuffer(",\n".join(lines).encode(), dtype=np.uint8)
+    slots = np.flatnonzero(layout == ord('?'))[::2]           # first digit of each cell
+    text = np.tile(layout, (len(matrix), 1))
+    text[:, slots] = _DIGITS[matrix, 0]
+    text[:, slots + 1] = _DIGITS[matrix, 1]
+    flat, width = text.tobytes().decode('ascii'), len(layout)
+    return [flat[i:i + width] for i in range(0, len(flat), width)]
+
+
+def c_sources(encoded):
+    """Complete C sources per team: the batch's initializers in render_c_source()."""
+    inits, encs = c_initializers(encoded.init), c_initializers(encoded.enc)
+    decoys = c_initializers(encoded.data[:1]) * len(encs) \
+        if (encoded.data == encoded.data[:1]).all() else c_initializers(encoded.data)
+    return [jarvis.render_c_source(data, enc, init) for init, data, enc in zip(inits, decoys, encs)]
+
+
+def _scatter(template):
+    """(offsets, field, index) flat arrays covering every patched byte of the template."""
+    offsets, fields, indices = [], [], []
+    for f, field in enumerate(FIELDS):
+        for i, slot in enumerate(template.layout[field]):
+            offsets += slot
+            fields += [f] * len(slot)
+            indices += [i] * len(slot)
+    return np.array(offsets, dtype=np.intp), np.array(fields), np.array(indices, dtype=np.intp)
+
+
+def patch_blobs(encoded, template, build_id=True):
+    """
+    (N, size) uint8 matrix of patched binaries: the template in every row
+    with init[], data[] and enc[] written at the layout offsets. Each row
+    gets its own build ID (SHA-1 of the row) unless build_id is False.
+    """
+    n = len(encoded.enc)
+    for field, matrix in zip(("init", "data", "enc"), (encoded.init, encoded.data, encoded.enc)):
+        if matrix.shape[1] != template.lengths[field]:
+            raise PatchError(f"{field}[] has {matrix.shape[1]} bytes, "
+                             f"the template has {template.lengths[field]}")
+    blobs = np.tile(np.frombuffer(template.binary, dtype=np.uint8), (n, 1))
+    offsets, fields, indices = _scatter(template)
+    for f, matrix in enumerate((encoded.init, encoded.data, encoded.enc)):
+        sel = fields == f
+        if sel.any():
+            blobs[:, offsets[sel]] = matrix[:, indices[sel]]
+    bid = _build_id_range(template.binary) if build_id else None
+    if bid:
+        start, stop = bid
+        blobs[:, start:stop] = 0
+        for row in blobs:
+            row[start:stop] = np.frombuffer(hashlib.sha1(row).digest()[:stop - start],
+                                            dtype=np.uint8)
+    return blobs
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 10000
+    rng = np.random.default_rng(0)
+    tags = rng.integers(0, 1 << 32, n, dtype=np.uint64)
+    flags = [f"MYTHX{{c0r3_unl0ck3d_{int(t):08x}}}" for t in tags]
+    keys = rng.integers(0, 256, (n, len(jarvis.INIT_KEY)), dtype=np.uint8)
+
+    start = time.perf_counter()
+    encoded = encode_batch(flags, keys)
+    t_encode = time.perf_counter() - start
+    ok = round_trip(encoded, flags)
+    t_check = time.perf_counter() - start - t_encode
+    print(f"[+] {n} teams encoded in {t_encode * 1000:.1f} ms, "
+          f"round trip in {t_check * 1000:.1f} ms ({ok.sum()}/{n} ok)")
+
+    start = time.perf_counter()
+    inits = c_initializers(encoded.enc)
+    print(f"[+] {len(inits)} enc[] C initializers in {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    sources = c_sources(encoded)
+    print(f"[+] {len(sources)} C sources in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Cross-check the first rows against the scalar reference implementation
+    for flag, key, enc in zip(flags[:100], keys[:100].tolist(), encoded.enc[:100].tolist()):
+        assert enc == jarvis.encode_real_flag(flag, jarvis.compute_calibrated_key(key))
+    assert inits[0] == jarvis.format_c_array(encoded.enc[0].tolist())
+    assert sources[0] == jarvis.generate_c_source(encoded.data[0].tolist(), encoded.enc[0].tolist(),
+                                                  encoded.init[0].tolist())
+
+    if '--blobs' in argv:
+        from patcher import build_template
+        template = build_template(len(flags[0]))
+        start = time.perf_counter()
+        blobs = patch_blobs(encoded, template)
+        print(f"[+] {len(blobs)} patch blobs ({blobs.nbytes >> 20} MB) in "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    if not ok.all():
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+In-process ELF string-leak scanner for JARVIS Core binaries.
+
+Replaces `strings | grep`. The binary is memory-mapped and only the
+sections that can carry data are read: PROGBITS (.text, .rodata, .data,
+.comment, ...) and string tables. Symbol tables, relocations, notes and
+.bss are skipped (a file that is not an ELF is scanned whole). Flags,
+flag prefixes, and their trivially obfuscated forms are searched in one
+pass over each section:
+
+  xor   every byte XOR'd with one key k (k = 0 is the plain text)
+  rol   every byte rotated left by r bits, optionally also XOR'd
+  add   every byte shifted by n mod 256 (Caesar over bytes)
+
+Instead of 255 x 8 + 255 patterns per needle, the section is searched in
+two difference spaces. In XOR space, d[i] = b[i] ^ b[i+1]: XOR by any key
+cancels out, so one pattern per rotation covers all 256 keys. In add
+space, d[i] = b[i+1] - b[i]: any shift cancels out. All keys are
+joined into one regular expression with overlapping matches. A hit is
+mapped back to its transform (which r, which k or n) from the first byte.
+
+Each needle is matched in its short form first (its first MATCH_LEN
+bytes), so a prefix hit is reported once even when several flags share it.
+A match that continues to the whole needle is reported as the full flag.
+
+Usage:
+  python3 leakscan.py [binary ...]      # default: the canonical build
+  python3 leakscan.py --manifest challenge_output/variants/manifest.json
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+
+import build_challenge as jarvis
+from patcher import PatchError, Section, elf_sections
+
+PREFIXES = (jarvis.FLAG_PREFIX,)
+SCANNED_TYPES = (1, 3)          # SHT_PROGBITS, SHT_STRTAB
+MATCH_LEN = 6                   # bytes of a needle that must match (5 differences)
+
+Leak = namedtuple('Leak', 'needle section offset file_offset transform full')
+
+
+@contextmanager
+def mapped(path):
+    """Read-only mmap of a file."""
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def _rol(data, r):
+    return bytes(((b << r) | (b >> (8 - r))) & 0xFF for b in data) if r else bytes(data)
+
+
+def _xor_diff(arr):
+    return (arr[:-1] ^ arr[1:]).tobytes()
+
+
+def _add_diff(arr):
+    return (arr[1:] - arr[:-1]).tobytes()        # uint8 arithmetic wraps mod 256
+
+
+class LeakScanner:
+    """Compiled multi-pattern search for a set of needles (flags and prefixes)."""
+
+    def __init__(self, needles, prefixes=PREFIXES):
+        self.needles = list(dict.fromkeys([*needles, *prefixes]))
+        # (space, key bytes) -> [(needle, rotation)]
+        self.keys = {}
+        for needle in self.needles:
+            raw = needle.encode() if isinstance(needle, str) else bytes(needle)
+            head = np.frombuffer(raw[:MATCH_LEN], dtype=np.uint8)
+            for r in range(8):
+                rotated = np.frombuffer(_rol(head.tobytes(), r), dtype=np.uint8)
+                self.keys.setdefault(("xor", _xor_diff(rotated)), []).append((needle, r))
+            self.keys.setdefault(("add", _add_diff(head)), []).append((needle, None))
+        self.patterns = {}
+        for space in ("xor", "add"):
+            keys = sorted({key for s, key in self.keys if s == space}, key=len, reverse=True)
+            self.patterns[space] = re.compile(
+                b'(?=(' + b'|'.join(re.escape(k) for k in keys) + b'))', re.DOTALL)
+
+    def _transform(self, data, pos, needle, space, r):
+        """(transform name, full match?) for a key hit at data[pos:]."""
+        raw = needle.encode() if isinstance(needle, str) else bytes(needle)
+        if space == "xor":
+            expect = _rol(raw, r)
+            k = data[pos] ^ expect[0]
+            window = bytes(data[pos:pos + len(raw)])
+            full = len(window) == len(raw) and bytes(b ^ k for b in expect) == window
+            name = ("plain" if k == 0 else f"xor 0x{k:02X}") if r == 0 else \
+                f"rol {r}" + (f" ^ 0x{k:02X}" if k else "")
+            return name, full
+        n = (data[pos] - raw[0]) & 0xFF
+        window = bytes(data[pos:pos + len(raw)])
+        full = len(window) == len(raw) and bytes((b + n) & 0xFF for b in raw) == window
+        return ("plain" if n == 0 else f"add 0x{n:02X}"), full
+
+    def scan_buffer(self, buf, sections=None):
+        """Leaks in the scanned sections of an ELF image (bytes, memoryview or mmap)."""
+        if sections is None:
+            try:
+                sections = elf_sections(buf)
+            except PatchError:
+                # Not an ELF (e.g. a Mach-O build): scan the whole file
+                sections = [Section("(file)", 0, len(buf), SCANNED_TYPES[0])]
+        leaks = []
+        for section in sections:
+            if section.type not in SCANNED_TYPES or section.size < 2:
+                continue
+            data = np.frombuffer(buf, dtype=np.uint8, count=section.size, offset=section.offset)
+            found = {}          # position -> Leak (XOR space first, so plain text reads "plain")
+            for space, diff in (("xor", _xor_diff), ("add", _add_diff)):
+                for match in self.patterns[space].finditer(diff(data)):
+                    pos = match.start()
+                    if pos in found:
+                        continue
+                    hits = [(needle, *self._transform(data, pos, needle, space, r))
+                            for needle, r in self.keys[(space, match.group(1))]]
+                    full = [hit for hit in hits if hit[2]]
+                    needle, name, is_full = max(full, key=lambda h: len(h[0])) if full else hits[0]
+                    found[pos] = Leak(needle, section.name, pos, section.offset + pos,
+                                      name, is_full)
+            leaks += [found[pos] for pos in sorted(found)]
+        return leaks
+
+    def scan_file(self, path):
+        with mapped(path) as buf:
+            return self.scan_buffer(buf)
+
+
+def scan_file(path, needles, prefixes=PREFIXES):
+    """Leaks of `needles` (plus the flag prefixes) in the ELF at `path`."""
+    return LeakScanner(needles, prefixes).scan_file(path)
+
+
+def format_leak(leak):
+    what = leak.needle if leak.full or len(leak.needle) <= MATCH_LEN \
+        else f"{leak.needle[:MATCH_LEN]}... (prefix of {leak.needle})"
+    return (f"{what} [{leak.transform}] in {leak.section}+0x{leak.offset:x} "
+            f"(file offset 0x{leak.file_offset:x})")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Scan ELF binaries for flag leaks")
+    parser.add_argument('files', nargs='*', help="binaries (checked for the canonical flags)")
+    parser.add_argument('--manifest', help="variants manifest.json: scan every team's binary "
+                                           "for its own flag")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    if args.manifest:
+        root = os.path.dirname(os.path.abspath(args.manifest))
+        with open(args.manifest) as f:
+            for team in json.load(f)["teams"]:
+                jobs.append((os.path.join(root, team["binary"]), (team["flag"], jarvis.FALSE_FLAG)))
+    default = os.path.join(jarvis.OUTPUT_DIR, "jarvis_core.bin")
+    for path in args.files or ([] if args.manifest else [default]):
+        jobs.append((path, (jarvis.REAL_FLAG, jarvis.FALSE_FLAG)))
+
+    leaky = 0
+    start = time.perf_counter()
+    for path, needles in jobs:
+        leaks = scan_file(path, needles)
+        leaky += bool(leaks)
+        for leak in leaks:
+            print(f"[!] {path}: {format_leak(leak)}")
+    elapsed = time.perf_counter() - start
+    rate = len(jobs) / elapsed if elapsed > 0 else float('inf')
+    print(f"[=] {len(jobs)} binaries scanned in {elapsed:.2f}s ({rate:.0f}/s), {leaky} with leaks")
+    if leaky:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
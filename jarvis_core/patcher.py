@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Binary patching engine for JARVIS Core variants.
+
+Two JARVIS Core builds differ only in three byte arrays:
+
+  init   INIT_KEY, in the constructor __core_preinit()
+  data   the XOR'd decoy flag, in debug_dump()
+  enc    the encrypted real flag, in decrypt_credentials()
+
+gcc -O1 does not emit these local arrays as contiguous data. It stores
+them to the stack with immediate operands (movabs / mov), so their bytes
+are spread through .text. Overlapping stores can write a byte twice, so it
+appears in two immediates. The decoy can also be dropped entirely as dead
+code. So the arrays are located by building the template twice:
+
+  1. generate_c_source() is compiled with placeholder arrays, once with
+     filling A and once with filling B. Both fillings hold only distinct,
+     nonzero, non-0xFF bytes, so gcc picks the same instructions for both.
+  2. The two binaries must have the same size, and every byte that differs
+     must be an array byte (or the build-ID note, which ld derives from
+     the contents). Each differing offset is mapped back to (array, index)
+     through its value in A, and the value in B must name the same slot.
+  3. Every index of init[] and enc[] must be found; data[] may be absent.
+
+The template binary and this layout are cached, keyed by the C source
+and compiler version. A variant is then a copy of the template with the
+team's bytes written at the layout offsets, plus a fresh build ID (SHA-1
+of the patched file), so no two variants share one.
+
+Usage:
+  python3 patcher.py [--rebuild]      # build/load the template, print its layout
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+import build_challenge as jarvis
+
+TEMPLATE_DIR = os.path.join(jarvis.BASE_DIR, ".build_cache", "template")
+FIELDS = ("init", "data", "enc")
+REQUIRED = ("init", "enc")          # data[] is dead code gcc may drop
+BUILD_ID_SECTION = ".note.gnu.build-id"
+
+Template = namedtuple('Template', 'binary layout lengths key path')
+Section = namedtuple('Section', 'name offset size type')
+
+
+class PatchError(Exception):
+    """The template cannot be located or patched as requested."""
+
+
+# ─────────────────────────────────────────────
+# ELF sections
+# ─────────────────────────────────────────────
+def elf_sections(data):
+    """Sections holding file bytes in a 64-bit little-endian ELF (bytes or mmap)."""
+    if data[:4] != b'\x7fELF' or data[4] != 2 or data[5] != 1:
+        raise PatchError("not a 64-bit little-endian ELF")
+    shoff, = struct.unpack_from('<Q', data, 0x28)
+    shentsize, shnum, shstrndx = struct.unpack_from('<HHH', data, 0x3A)
+    headers = [struct.unpack_from('<IIQQQQ', data, shoff + i * shentsize) for i in range(shnum)]
+    strtab_off, strtab_size = headers[shstrndx][4], headers[shstrndx][5]
+    strtab = data[strtab_off:strtab_off + strtab_size]
+    sections = []
+    for name_off, kind, _flags, _addr, offset, size in headers:
+        if kind == 8 or not size:       # SHT_NOBITS (.bss) occupies no file bytes
+            continue
+        name = strtab[name_off:strtab.index(b'\x00', name_off)].decode()
+        sections.append(Section(name, offset, size, kind))
+    return sections
+
+
+def section_at(sections, offset):
+    for section in sections:
+        if section.offset <= offset < section.offset + section.size:
+            return section.name
+    return None
+
+
+def _build_id_range(data):
+    """(start, stop) of the build-ID bytes (the note descriptor), or None."""
+    for section in elf_sections(data):
+        if section.name == BUILD_ID_SECTION:
+            namesz, descsz = struct.unpack_from('<II', data, section.offset)
+            start = section.offset + 12 + (namesz + 3) // 4 * 4
+            return start, start + descsz
+    return None
+
+
+# ─────────────────────────────────────────────
+# Template
+# ─────────────────────────────────────────────
+def field_lengths(flag_len):
+    return {"init": len(jarvis.INIT_KEY), "data": len(jarvis.FALSE_FLAG), "enc": flag_len}
+
+
+def placeholders(lengths, fill):
+    """
+    {field: bytes} placeholder arrays. Filling "a" counts up from 0x01 and
+    filling "b" counts down from 0xFE, so both are distinct and nonzero and
+    no slot has the same value in both.
+    """
+    values, k = {}, 0
+    for field in FIELDS:
+        n = lengths[field]
+        values[field] = bytes((k + i + 1) if fill == "a" else (0xFE - k - i) for i in range(n))
+        k += n
+    if k > 0x7E:
+        raise PatchError(f"{k} array bytes do not fit in distinct placeholder values")
+    return values
+
+
+def _compiler_version():
+    try:
+        return subprocess.run(["gcc", "--version"], capture_output=True, text=True).stdout
+    except FileNotFoundError:
+        raise PatchError("gcc not found: the template must be compiled once")
+
+
+def _compile(values, path):
+    source = jarvis.generate_c_source(values["data"], values["enc"], values["init"])
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "jarvis_template.c")
+        with open(src, 'w') as f:
+            f.write(source)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok = jarvis.compile_binary(src, path)
+    if not ok:
+        raise PatchError("template compilation failed")
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def locate(binary_a, binary_b, values_a, values_b):
+    """
+    {field: [[offsets of index 0], [offsets of index 1], ...]} from the two
+    placeholder builds. Raises PatchError on any byte that cannot be
+    explained by a placeholder or the build ID.
+    """
+    if len(binary_a) != len(binary_b):
+        raise PatchError(f"placeholder builds differ in size ({len(binary_a)} vs "
+                         f"{len(binary_b)} bytes): codegen depends on the array values")
+    slot_a = {v: (field, i) for field, vals in values_a.items() for i, v in enumerate(vals)}
+    slot_b = {v: (field, i) for field, vals in values_b.items() for i, v in enumerate(vals)}
+    build_id = _build_id_range(binary_a) or (0, 0)
+    layout = {field: [[] for _ in values_a[field]] for field in FIELDS}
+    for offset, (a, b) in enumerate(zip(binary_a, binary_b)):
+        if a == b or build_id[0] <= offset < build_id[1]:
+            continue
+        slot = slot_a.get(a)
+        if slot is None or slot_b.get(b) != slot:
+            raise PatchError(f"unexpected difference at 0x{offset:x}: 0x{a:02x} vs 0x{b:02x}")
+        layout[slot[0]][slot[1]].append(offset)
+
+    for field in FIELDS:
+        missing = [i for i, offsets in enumerate(layout[field]) if not offsets]
+        if field in REQUIRED and missing:
+            raise PatchError(f"{field}[] bytes {missing} not found in the template")
+        if missing and len(missing) != len(layout[field]):
+            raise PatchError(f"{field}[] only partly found (missing {missing})")
+    return layout
+
+
+def build_template(flag_len, template_dir=TEMPLATE_DIR, rebuild=False):
+    """Compile (or load the cached) template for flags of flag_len bytes."""
+    lengths = field_lengths(flag_len)
+    values_a, values_b = placeholders(lengths, "a"), placeholders(lengths, "b")
+    source = jarvis.generate_c_source(values_a["data"], values_a["enc"], values_a["init"])
+    key = hashlib.sha256((source + _compiler_version()).encode()).hexdigest()[:16]
+    path = os.path.join(template_dir, f"jarvis_{key}.bin")
+    layout_path = os.path.join(template_dir, f"jarvis_{key}.json")
+
+    if not rebuild and os.path.exists(path) and os.path.exists(layout_path):
+        with open(path, 'rb') as f:
+            binary = f.read()
+        with open(layout_path) as f:
+            layout = json.load(f)["layout"]
+        return Template(binary, layout, lengths, key, path)
+
+    os.makedirs(template_dir, exist_ok=True)
+    binary = _compile(values_a, path)
+    with tempfile.TemporaryDirectory() as tmp:
+        binary_b = _compile(values_b, os.path.join(tmp, "jarvis_b.bin"))
+    layout = locate(binary, binary_b, values_a, values_b)
+    with open(layout_path, 'w') as f:
+        json.dump({"lengths": lengths, "layout": layout}, f)
+    return Template(binary, layout, lengths, key, path)
+
+
+# ─────────────────────────────────────────────
+# Patching
+# ─────────────────────────────────────────────
+def _set_build_id(buf):
+    build_id = _build_id_range(buf)
+    if build_id is None:
+        return
+    start, stop = build_id
+    buf[start:stop] = bytes(stop - start)
+    buf[start:stop] = hashlib.sha1(buf).digest()[:stop - start]
+
+
+def patch(template, init, data, enc):
+    """A variant binary: the template with init[], data[] and enc[] written in."""
+    buf = bytearray(template.binary)
+    for field, values in (("init", init), ("data", data), ("enc", enc)):
+        if len(values) != template.lengths[field]:
+            raise PatchError(f"{field}[] has {len(values)} bytes, "
+                             f"the template has {template.lengths[field]}")
+        for offsets, value in zip(template.layout[field], values):
+            for offset in offsets:
+                buf[offset] = value
+    _set_build_id(buf)
+    return bytes(buf)
+
+
+def read_back(binary, template):
+    """{field: bytes or None} read from a patched binary at the template offsets."""
+    fields = {}
+    for field in FIELDS:
+        slots = template.layout[field]
+        if not slots[0]:
+            fields[field] = None
+            continue
+        values = []
+        for i, offsets in enumerate(slots):
+            seen = {binary[o] for o in offsets}
+            if len(seen) != 1:
+                raise PatchError(f"{field}[{i}] copies disagree: {sorted(seen)}")
+            values.append(seen.pop())
+        fields[field] = bytes(values)
+    return fields
+
+
+def main(argv):
+    rebuild = '--rebuild' in argv
+    start = time.perf_counter()
+    template = build_template(len(jarvis.REAL_FLAG), rebuild=rebuild)
+    elapsed = time.perf_counter() - start
+    sections = elf_sections(template.binary)
+    print(f"[+] Template {template.path} ({len(template.binary)} bytes) in {elapsed:.2f}s")
+    for field in FIELDS:
+        offsets = [o for slot in template.layout[field] for o in slot]
+        if not offsets:
+            print(f"    {field:<5} not in the binary (optimized out)")
+            continue
+        where = sorted({section_at(sections, o) for o in offsets})
+        print(f"    {field:<5} {template.lengths[field]:>3} bytes at {len(offsets)} offsets "
+              f"0x{min(offsets):x}-0x{max(offsets):x} ({', '.join(where)})")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
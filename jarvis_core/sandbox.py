@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Concurrent sandboxed execution harness for JARVIS Core binaries.
+
+A smoke test runs a binary and checks what it prints. The harness runs
+the smoke tests of many binaries at once from one asyncio event loop
+(build_challenge.py runs its single binary through it too):
+
+  spawn     asyncio subprocesses, at most `concurrency` alive at a time
+            (a semaphore). Each starts in its own session with an empty
+            environment, stdin from /dev/null and its own scratch working
+            directory (created for the run, removed after it).
+  limits    preexec_fn sets rlimits in the child before exec: CPU seconds,
+            address space, file size, open files and no core dumps. A
+            binary that spins is killed by the kernel (SIGXCPU/SIGKILL);
+            one that hangs without using CPU is killed, with its process
+            group, at the wall-clock timeout.
+  collect   stdout and stderr are read in full, up to MAX_OUTPUT bytes each;
+            a binary printing more is killed and reported.
+  check     stdout must be exactly compile_farm.EXPECTED_OUTPUT. Any other
+            line is reported, and the lines only dead code can print are
+            named: the decrypted flag, the debug dump, a confirmed
+            authorization.
+
+Only the standard library is used (no container runtime). The rlimits
+contain a runaway binary, not a hostile one: it still runs as the calling
+user with network and filesystem access.
+
+Usage:
+  python3 sandbox.py [binary ...] [-j 16] [--timeout 5]
+  python3 sandbox.py --manifest challenge_output/variants/manifest.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+import build_challenge as jarvis
+from compile_farm import RUN_TIMEOUT, check_output
+
+MAX_OUTPUT = 64 * 1024          # bytes of stdout / stderr kept per run
+READ_CHUNK = 4096
+MAX_PROBLEMS = 10               # distinct problems reported per run
+DEAD_CODE_LINES = {
+    "JARVIS: Authorization data:": "decrypted flag printed",
+    "JARVIS: Debug:": "debug dump printed",
+    "JARVIS: Authorization confirmed.": "authorization confirmed",
+}
+
+Limits = namedtuple('Limits', 'cpu_seconds memory_mb file_mb open_files')
+RunJob = namedtuple('RunJob', 'name path flags')
+RunResult = namedtuple('RunResult', 'name ok returncode stdout problems seconds timed_out')
+
+DEFAULT_LIMITS = Limits(cpu_seconds=2, memory_mb=256, file_mb=1, open_files=32)
+
+
+# ─────────────────────────────────────────────
+# Sandbox
+# ─────────────────────────────────────────────
+def limiter(limits):
+    """preexec_fn applying `limits` in the child (runs after fork, before exec)."""
+    settings = [
+        (resource.RLIMIT_CPU, limits.cpu_seconds, limits.cpu_seconds + 1),
+        (resource.RLIMIT_AS, limits.memory_mb << 20, limits.memory_mb << 20),
+        (resource.RLIMIT_FSIZE, limits.file_mb << 20, limits.file_mb << 20),
+        (resource.RLIMIT_NOFILE, limits.open_files, limits.open_files),
+        (resource.RLIMIT_CORE, 0, 0),
+    ]
+
+    def apply():
+        for kind, soft, hard in settings:
+            resource.setrlimit(kind, (soft, hard))
+    return apply
+
+
+def describe_exit(returncode):
+    if returncode >= 0:
+        return f"exit status {returncode}"
+    try:
+        return f"killed by {signal.Signals(-returncode).name}"
+    except ValueError:
+        return f"killed by signal {-returncode}"
+
+
+def _signal_group(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def _drain(stream):
+    while await stream.read(READ_CHUNK):
+        pass
+
+
+async def _read_capped(proc, stream, cap):
+    """
+    (data, overflowed): everything up to `cap` bytes. Past the cap the
+    process group is killed and the rest of the pipe is discarded.
+    """
+    data = bytearray()
+    while True:
+        chunk = await stream.read(READ_CHUNK)
+        if not chunk:
+            return bytes(data), False
+        data += chunk
+        if len(data) > cap:
+            _signal_group(proc)
+            await _drain(stream)
+            return bytes(data[:cap]), True
+
+
+async def _kill_group(proc):
+    """SIGKILL the run's process group, then drain its pipes to EOF so wait() can finish."""
+    _signal_group(proc)
+    for stream in (proc.stdout, proc.stderr):
+        await _drain(stream)
+
+
+def check_lines(stdout, flags):
+    """Distinct check_output() problems, with lines printed by dead code named."""
+    named = {}
+    for line in stdout.splitlines():
+        for prefix, what in DEAD_CODE_LINES.items():
+            if line.startswith(prefix):
+                named[f"unexpected output line: {line!r}"] = f"{what}: {line!r}"
+    problems = list(dict.fromkeys(named.get(p, p) for p in check_output(stdout, flags)))
+    if len(problems) > MAX_PROBLEMS:
+        problems[MAX_PROBLEMS:] = [f"... {len(problems) - MAX_PROBLEMS} more"]
+    return problems
+
+
+async def run_job(job, semaphore, timeout=RUN_TIMEOUT, limits=DEFAULT_LIMITS, scratch=None):
+    """
+    Run one binary under the semaphore and return its RunResult. `scratch`
+    is created as its working directory and removed after the run.
+    """
+    async with semaphore:
+        if scratch:
+            os.makedirs(scratch)
+        try:
+            return await _run(job, timeout, limits, scratch)
+        finally:
+            if scratch:
+                shutil.rmtree(scratch, ignore_errors=True)
+
+
+async def _run(job, timeout, limits, cwd):
+    start = time.perf_counter()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            os.path.abspath(job.path), stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            env={}, cwd=cwd, start_new_session=True, preexec_fn=limiter(limits))
+    except OSError as e:
+        return RunResult(job.name, False, None, "", [f"could not run: {e}"],
+                         time.perf_counter() - start, False)
+
+    reads = asyncio.gather(_read_capped(proc, proc.stdout, MAX_OUTPUT),
+                           _read_capped(proc, proc.stderr, MAX_OUTPUT))
+    timed_out = False
+    try:
+        (out, out_over), (_err, err_over) = await asyncio.wait_for(reads, timeout)
+    except asyncio.TimeoutError:
+        timed_out, out, out_over, err_over = True, b"", False, False
+    if timed_out:
+        await _kill_group(proc)
+    returncode = await proc.wait()
+    seconds = time.perf_counter() - start
+
+    stdout = out.decode('utf-8', errors='replace')
+    if timed_out:
+        problems = [f"timed out after {timeout}s"]
+    else:
+        problems = check_lines(stdout, job.flags)
+        if out_over or err_over:
+            problems = [f"more than {MAX_OUTPUT} bytes of output"] + \
+                [p for p in problems if not p.startswith("missing output line")]
+        elif returncode < 0:
+            # Killed by a limit: lines it never got to print are not news
+            problems = [describe_exit(returncode)] + \
+                [p for p in problems if not p.startswith("missing output line")]
+        elif returncode != 0:
+            problems.append(describe_exit(returncode))
+    return RunResult(job.name, not problems, returncode, stdout, problems, seconds, timed_out)
+
+
+async def _run_all(jobs, concurrency, timeout, limits):
+    """Every job under one semaphore, each in its own scratch directory."""
+    semaphore = asyncio.Semaphore(concurrency)
+    with tempfile.TemporaryDirectory(prefix="jarvis_sandbox_") as scratch:
+        return await asyncio.gather(*(run_job(job, semaphore, timeout, limits,
+                                              os.path.join(scratch, str(i)))
+                                      for i, job in enumerate(jobs)))
+
+
+def default_concurrency():
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+def run_binaries(jobs, concurrency=None, timeout=RUN_TIMEOUT, limits=DEFAULT_LIMITS):
+    """Run every RunJob concurrently. Returns (results, stats)."""
+    concurrency = concurrency or default_concurrency()
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    results = asyncio.run(_run_all(jobs, concurrency, timeout, limits))
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    stats = {
+        "binaries": len(jobs),
+        "concurrency": concurrency,
+        "failures": sum(not r.ok for r in results),
+        "timeouts": sum(r.timed_out for r in results),
+        "total_s": elapsed,
+        "cpu_s": (after.ru_utime + after.ru_stime) - (usage.ru_utime + usage.ru_stime),
+        "runs_per_s": len(jobs) / elapsed if elapsed > 0 else float('inf'),
+    }
+    return results, stats
+
+
+def format_stats(stats):
+    return (f"[=] {stats['binaries'] - stats['failures']}/{stats['binaries']} runs clean in "
+            f"{stats['total_s']:.2f}s ({stats['runs_per_s']:.0f} runs/s, "
+            f"{stats['concurrency']} at a time, {stats['cpu_s']:.2f}s child CPU, "
+            f"{stats['timeouts']} timeouts)")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Run JARVIS Core binaries concurrently "
+                                                 "under rlimits and check their output")
+    parser.add_argument('files', nargs='*', help="binaries (checked against the canonical flags)")
+    parser.add_argument('--manifest', help="variants manifest.json: run every team's binary")
+    parser.add_argument('-j', '--concurrency', type=int, default=None,
+                        help=f"processes alive at once (default: {default_concurrency()})")
+    parser.add_argument('--timeout', type=float, default=RUN_TIMEOUT,
+                        help=f"wall-clock seconds per run (default: {RUN_TIMEOUT})")
+    parser.add_argument('--cpu', type=int, default=DEFAULT_LIMITS.cpu_seconds,
+                        help="CPU seconds per process (RLIMIT_CPU)")
+    parser.add_argument('--memory-mb', type=int, default=DEFAULT_LIMITS.memory_mb,
+                        help="address space per process in MB (RLIMIT_AS)")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    if args.manifest:
+        root = os.path.dirname(os.path.abspath(args.manifest))
+        with open(args.manifest) as f:
+            for team in json.load(f)["teams"]:
+                jobs.append(RunJob(team["team"], os.path.join(root, team["binary"]),
+                                   (team["flag"], jarvis.FALSE_FLAG)))
+    default = os.path.join(jarvis.OUTPUT_DIR, "jarvis_core.bin")
+    for path in args.files or ([] if args.manifest else [default]):
+        jobs.append(RunJob(path, path, (jarvis.REAL_FLAG, jarvis.FALSE_FLAG)))
+
+    limits = DEFAULT_LIMITS._replace(cpu_seconds=args.cpu, memory_mb=args.memory_mb)
+    results, stats = run_binaries(jobs, args.concurrency, args.timeout, limits)
+    for result in results:
+        for problem in result.problems:
+            print(f"[!] {result.name}: {problem}")
+    print(format_stats(stats))
+    if stats["failures"]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
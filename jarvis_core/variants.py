@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Bulk per-team variant builder for "JARVIS Core", by binary patching.
+
+Every team gets its own real flag and its own INIT_KEY, so neither the
+answer nor the key schedule can be shared. Both are derived from
+HMAC-SHA256(secret, team_id):
+
+    INIT_KEY = digest[0:16]
+    flag     = MYTHX{c0r3_unl0ck3d_<tag>}     tag = 8 hex chars of digest[16:]
+
+All flags have the same length, so no team needs its own compile.
+patcher.py compiles one template binary (cached) and locates the init[],
+data[] and enc[] immediates in it. Each variant is then a copy of the
+template with the team's bytes written in. flag_encoder.py encodes and
+patches each batch of teams as NumPy matrices. Before any is written, each
+batch of variants is checked by verifier.py, which replays the decrypt
+path from the patched bytes. Each variant must give its team's flag.
+
+Usage:
+  python3 variants.py teams.txt --secret "$JARVIS_VARIANT_SECRET"
+
+teams.txt holds one team ID per line (blank lines and # comments ignored).
+Binaries go to challenge_output/variants/<team>/jarvis_core.bin and a
+manifest.json maps teams to binaries and flags.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import build_challenge as jarvis
+from flag_encoder import encode_batch, patch_blobs, round_trip
+from patcher import PatchError, build_template
+from team_variants import assign_dirs, assign_unique, read_team_ids, team_digest
+from verifier import BATCH, verify_binaries
+
+VARIANTS_DIR = os.path.join(jarvis.OUTPUT_DIR, "variants")
+FLAG_PREFIX = "MYTHX{c0r3_unl0ck3d_"
+TAG_CHARS = 8
+FLAG_LEN = len(FLAG_PREFIX) + TAG_CHARS + 1
+
+
+# ─────────────────────────────────────────────
+# Flag and key derivation
+# ─────────────────────────────────────────────
+def derive_team_secrets(team_id, secret, attempt=0):
+    """Deterministically derive (flag, init_key) for one team."""
+    digest = team_digest(secret, team_id, attempt)
+    return f"{FLAG_PREFIX}{digest[16:].hex()[:TAG_CHARS]}}}", list(digest[:16])
+
+
+def assign_secrets(team_ids, secret):
+    """Derive (flag, init_key) for all teams, re-deriving on the (rare) flag collision."""
+    return assign_unique(team_ids, lambda team, attempt: derive_team_secrets(team, secret, attempt),
+                         key=lambda secrets: secrets[0])
+
+
+# ─────────────────────────────────────────────
+# Variants
+# ─────────────────────────────────────────────
+def encode_variant(flag, init_key):
+    """(init, data, enc) byte arrays for one variant."""
+    encoded = encode_batch([flag], [init_key])
+    return init_key, encoded.data[0].tolist(), encoded.enc[0].tolist()
+
+
+def build_variants(team_ids, secret, out_dir=VARIANTS_DIR, verify=True, rebuild_template=False):
+    """Patch every team's binary from one template and write manifest.json."""
+    os.makedirs(out_dir, exist_ok=True)
+    secrets = assign_secrets(team_ids, secret)
+    dirs = assign_dirs(team_ids)
+
+    print(f"[*] Preparing template binary...")
+    t0 = time.perf_counter()
+    template = build_template(FLAG_LEN, rebuild=rebuild_template)
+    patched_offsets = sum(len(slot) for slots in template.layout.values() for slot in slots)
+    print(f"[+] Template ready in {time.perf_counter() - t0:.2f}s "
+          f"({len(template.binary)} bytes, {patched_offsets} patched offsets)")
+
+    print(f"[*] Patching {len(team_ids)} team variants...")
+    entries = []
+    t1 = time.perf_counter()
+    for start in range(0, len(team_ids), BATCH):
+        chunk = team_ids[start:start + BATCH]
+        flags = [secrets[team][0] for team in chunk]
+        encoded = encode_batch(flags, [secrets[team][1] for team in chunk])
+        if not round_trip(encoded, flags).all():
+            raise PatchError("Encoded arrays do not decrypt back to the team flags")
+        binaries = [row.tobytes() for row in patch_blobs(encoded, template)]
+        if verify:
+            results = verify_binaries(binaries, flags, names=chunk, template=template)
+            failed = [f"{r.name}: {'; '.join(r.problems)}" for r in results if not r.ok]
+            if failed:
+                raise PatchError("Patched variants failed verification:\n" + '\n'.join(failed))
+        for team, binary in zip(chunk, binaries):
+            flag, init_key = secrets[team]
+            team_dir = os.path.join(out_dir, dirs[team])
+            os.makedirs(team_dir, exist_ok=True)
+            path = os.path.join(team_dir, "jarvis_core.bin")
+            with open(path, 'wb') as f:
+                f.write(binary)
+            os.chmod(path, 0o755)
+            entries.append({
+                "team": team,
+                "flag": flag,
+                "init_key": bytes(init_key).hex(),
+                "binary": os.path.join(dirs[team], "jarvis_core.bin"),
+                "size": len(binary),
+                "sha256": hashlib.sha256(binary).hexdigest(),
+                "verified": verify,
+            })
+    elapsed = time.perf_counter() - t1
+
+    manifest = {
+        "challenge": "JARVIS Core",
+        "flag_format": f"{FLAG_PREFIX}<tag>}}",
+        "template": template.key,
+        "teams": entries,
+    }
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    rate = len(team_ids) / elapsed if elapsed > 0 else float('inf')
+    print(f"[+] {len(team_ids)} variants in {elapsed:.2f}s ({rate:.0f} variants/s)")
+    print(f"[+] Manifest: {manifest_path}")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build per-team variants of 'JARVIS Core'")
+    parser.add_argument('teams', help="file with one team ID per line")
+    parser.add_argument('--secret', default=os.environ.get('JARVIS_VARIANT_SECRET'),
+                        help="HMAC secret for flag derivation (default: $JARVIS_VARIANT_SECRET)")
+    parser.add_argument('-o', '--out', default=VARIANTS_DIR, help="output directory")
+    parser.add_argument('--no-verify', action='store_true',
+                        help="skip replaying the decrypt path of each patched binary")
+    parser.add_argument('--rebuild-template', action='store_true',
+                        help="recompile the template even if a cached one matches")
+    args = parser.parse_args(argv)
+    if not args.secret:
+        parser.error("a flag secret is required (--secret or $JARVIS_VARIANT_SECRET)")
+
+    build_variants(read_team_ids(args.teams), args.secret, args.out,
+                   verify=not args.no_verify, rebuild_template=args.rebuild_template)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Batch emulation verifier for JARVIS Core binaries.
+
+The shipped binary never takes the decrypt branch, so running it proves
+nothing about the bytes in decrypt_credentials(). This verifier takes the
+arrays out of the ELF itself and replays the solve path on them:
+
+  extract     the init[], data[] and enc[] bytes are read at the offsets the
+              patcher template found (patcher.py). Every other byte must
+              equal the template, apart from the build ID. This proves the
+              binary has the template's code around those arrays, so the
+              replay below is the code that would run. Bytes stored twice
+              by overlapping instructions must agree.
+  replay      constructor:  key = init
+              calibrate:    key[i] = ROL1(key[i]) ^ (i + 1)
+              decrypt:      out[i] = ((enc[i] ^ key[i % 16]) - 3i) & 0xFF
+              decoy:        out[i] = data[i] ^ DECOY_XOR_KEY (if gcc kept it)
+  check       the decrypt must give the expected flag, and decrypting with
+              the uncalibrated key must not (that trap is the point of the
+              challenge).
+  fallback    gcc's code generation depends on the array values (a zero
+              upper half of a movabs chunk becomes a shorter instruction),
+              so a correct binary can differ from the template. When the
+              team's init key is known, such a binary is instead compared
+              with a build of the source its flag and key produce (through
+              the compile farm's cache), and that source's arrays are
+              replayed.
+
+Binaries are loaded into one (N, size) uint8 matrix per flag length and
+every step is a NumPy operation over all rows at once. No subprocess runs
+per binary.
+
+Usage:
+  python3 verifier.py [binary ...]                  # expects REAL_FLAG
+  python3 verifier.py --manifest challenge_output/variants/manifest.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import build_challenge as jarvis
+from patcher import FIELDS, PatchError, _build_id_range, build_template
+
+BATCH = 4096             # binaries per matrix
+
+BinaryResult = namedtuple('BinaryResult', 'name ok found expected problems')
+
+CODE_DIFFERS = "code differs from the template outside the patched arrays"
+
+
+# ─────────────────────────────────────────────
+# Extraction
+# ─────────────────────────────────────────────
+def _offset_table(template):
+    """{field: (n, copies) offsets padded by repeating the first copy} (None if absent)."""
+    table = {}
+    for field in FIELDS:
+        slots = template.layout[field]
+        if not slots[0]:
+            table[field] = None
+            continue
+        width = max(len(slot) for slot in slots)
+        table[field] = np.array([slot + [slot[0]] * (width - len(slot)) for slot in slots])
+    return table
+
+
+def _fixed_mask(template):
+    """Boolean mask of the bytes every binary must share with the template."""
+    mask = np.ones(len(template.binary), dtype=bool)
+    for slots in template.layout.values():
+        for slot in slots:
+            mask[slot] = False
+    build_id = _build_id_range(template.binary)
+    if build_id:
+        mask[build_id[0]:build_id[1]] = False
+    return mask
+
+
+def extract_arrays(binaries, template):
+    """
+    ({field: (N, n) uint8 or None}, structural (N,) bool, consistent (N,) bool)
+    for an (N, size) matrix of binaries built from `template`.
+    """
+    reference = np.frombuffer(template.binary, dtype=np.uint8)
+    mask = _fixed_mask(template)
+    structural = (binaries[:, mask] == reference[mask]).all(axis=1)
+    arrays, consistent = {}, np.ones(len(binaries), dtype=bool)
+    for field, offsets in _offset_table(template).items():
+        if offsets is None:
+            arrays[field] = None
+            continue
+        copies = binaries[:, offsets]                       # (N, n, copies)
+        consistent &= (copies == copies[:, :, :1]).all(axis=(1, 2))
+        arrays[field] = copies[:, :, 0]
+    return arrays, structural, consistent
+
+
+# ─────────────────────────────────────────────
+# Replay
+# ─────────────────────────────────────────────
+def calibrate(init):
+    """calibrate_heuristics() over (N, 16) keys."""
+    key = init.astype(np.uint8)
+    rotated = (key << 1) | (key >> 7)
+    return rotated ^ np.arange(1, key.shape[1] + 1, dtype=np.uint8)
+
+
+def decrypt(enc, key):
+    """decrypt_credentials() over (N, L) ciphertexts with (N, 16) keys."""
+    i = np.arange(enc.shape[1])
+    k = key[:, i % key.shape[1]]
+    return (enc ^ k) - (i * 3).astype(np.uint8)        # uint8 arithmetic wraps like the C
+
+
+def replay(arrays):
+    """(real (N, L), uncalibrated (N, L), decoy (N, n) or None) decrypted outputs."""
+    init = arrays["init"]
+    real = decrypt(arrays["enc"], calibrate(init))
+    naive = decrypt(arrays["enc"], init)
+    decoy = arrays["data"] ^ np.uint8(jarvis.DECOY_XOR_KEY) if arrays["data"] is not None else None
+    return real, naive, decoy
+
+
+def _text(row):
+    return row.tobytes().decode('latin-1')
+
+
+def verify_matrix(binaries, flags, template, names=None):
+    """BinaryResults for an (N, size) matrix whose expected flags share one length."""
+    names = names or [str(i) for i in range(len(binaries))]
+    arrays, structural, consistent = extract_arrays(binaries, template)
+    real, naive, decoy = replay(arrays)
+    expected = np.frombuffer(''.join(flags).encode('latin-1'), dtype=np.uint8).reshape(len(flags), -1)
+    real_ok = (real == expected).all(axis=1)
+    naive_ok = (naive == expected).all(axis=1)
+    false_flag = np.frombuffer(jarvis.FALSE_FLAG.encode(), dtype=np.uint8)
+    decoy_ok = (decoy == false_flag).all(axis=1) if decoy is not None \
+        else np.ones(len(binaries), dtype=bool)
+
+    results = []
+    for i, name in enumerate(names):
+        problems = []
+        if not structural[i]:
+            problems.append(CODE_DIFFERS)
+        if not consistent[i]:
+            problems.append("copies of an array byte disagree")
+        if not real_ok[i]:
+            problems.append(f"decrypts to {_text(real[i])!r}")
+        if naive_ok[i]:
+            problems.append("flag decrypts without calibrate_heuristics()")
+        if not decoy_ok[i]:
+            problems.append(f"decoy decodes to {_text(decoy[i])!r}")
+        results.append(BinaryResult(name, not problems, _text(real[i]), flags[i], problems))
+    return results
+
+
+def load_matrix(blobs):
+    """(N, size) uint8 matrix of equal-size binaries (bytes or paths)."""
+    rows = [np.frombuffer(b, dtype=np.uint8) if isinstance(b, (bytes, bytearray))
+            else np.fromfile(b, dtype=np.uint8) for b in blobs]
+    return np.stack(rows)
+
+
+def _without_build_id(binary):
+    buf = bytearray(binary)
+    try:
+        build_id = _build_id_range(buf)
+    except PatchError:
+        return bytes(buf)
+    if build_id:
+        buf[build_id[0]:build_id[1]] = bytes(build_id[1] - build_id[0])
+    return bytes(buf)
+
+
+def reference_check(blob, flag, init_key, name=None):
+    """
+    BinaryResult for a binary whose code differs from the template, from a
+    build of the source `flag` and `init_key` produce. None if that source
+    cannot be compiled here.
+    """
+    from compile_farm import compile_source
+    from flag_encoder import c_sources, encode_batch
+
+    encoded = encode_batch([flag], [init_key])
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "reference.bin")
+        ok, _cached, _key = compile_source(c_sources(encoded)[0], out)
+        if not ok:
+            return None
+        with open(out, 'rb') as f:
+            reference = f.read()
+    if isinstance(blob, (bytes, bytearray)):
+        binary = blob
+    else:
+        with open(blob, 'rb') as f:
+            binary = f.read()
+
+    real, naive, decoy = replay({"init": encoded.init, "data": encoded.data, "enc": encoded.enc})
+    problems = []
+    if _without_build_id(binary) != _without_build_id(reference):
+        problems.append("code differs from the template and from a build of the expected source")
+    if naive[0].tobytes() == flag.encode():
+        problems.append("flag decrypts without calibrate_heuristics()")
+    found = _text(real[0])
+    if found != flag:
+        problems.append(f"decrypts to {found!r}")
+    return BinaryResult(name, not problems, found, flag, problems)
+
+
+def verify_binaries(blobs, flags, names=None, template=None, init_keys=None):
+    """
+    Verify binaries (bytes or paths) against their expected flags. Binaries
+    are grouped by flag length, one template per length, BATCH at a time.
+
+    init_keys (one per flag, or None) enable the reference-build fallback
+    for binaries whose code differs from the template; REAL_FLAG defaults
+    to the canonical INIT_KEY.
+    """
+    names = names or [b if isinstance(b, str) else str(i) for i, b in enumerate(blobs)]
+    init_keys = init_keys or [None] * len(flags)
+    results = [None] * len(blobs)
+    by_length = {}
+    for i, flag in enumerate(flags):
+        by_length.setdefault(len(flag), []).append(i)
+    for length, indices in by_length.items():
+        tmpl = template if template is not None and template.lengths["enc"] == length \
+            else build_template(length)
+        for start in range(0, len(indices), BATCH):
+            chunk = indices[start:start + BATCH]
+            good = []
+            for i in chunk:
+                blob = blobs[i]
+                size = len(blob) if isinstance(blob, (bytes, bytearray)) else os.path.getsize(blob)
+                if size != len(tmpl.binary):
+                    results[i] = BinaryResult(names[i], False, None, flags[i],
+                                              [f"{size} bytes, template has {len(tmpl.binary)}",
+                                               CODE_DIFFERS])
+                else:
+                    good.append(i)
+            if not good:
+                continue
+            matrix = load_matrix([blobs[i] for i in good])
+            for i, result in zip(good, verify_matrix(matrix, [flags[i] for i in good], tmpl,
+                                                     [names[i] for i in good])):
+                results[i] = result
+
+    for i, result in enumerate(results):
+        if CODE_DIFFERS not in result.problems:
+            continue
+        key = init_keys[i] if init_keys[i] is not None else \
+            (jarvis.INIT_KEY if flags[i] == jarvis.REAL_FLAG else None)
+        fallback = reference_check(blobs[i], flags[i], key, names[i]) if key is not None else None
+        if fallback is not None:
+            results[i] = fallback
+    return results
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Replay JARVIS Core's decrypt path from binaries")
+    parser.add_argument('files', nargs='*', help="binaries (expected to hold REAL_FLAG)")
+    parser.add_argument('--manifest', help="variants manifest.json: check every team's flag")
+    args = parser.parse_args(argv)
+
+    paths, flags, keys = [], [], []
+    if args.manifest:
+        root = os.path.dirname(os.path.abspath(args.manifest))
+        with open(args.manifest) as f:
+            for team in json.load(f)["teams"]:
+                paths.append(os.path.join(root, team["binary"]))
+                flags.append(team["flag"])
+                keys.append(list(bytes.fromhex(team["init_key"])))
+    default = os.path.join(jarvis.OUTPUT_DIR, "jarvis_core.bin")
+    for path in args.files or ([] if args.manifest else [default]):
+        paths.append(path)
+        flags.append(jarvis.REAL_FLAG)
+        keys.append(jarvis.INIT_KEY)
+
+    start = time.perf_counter()
+    results = verify_binaries(paths, flags, init_keys=keys)
+    elapsed = time.perf_counter() - start
+    failed = [r for r in results if not r.ok]
+    for result in failed:
+        print(f"[!] {result.name}: {'; '.join(result.problems)}")
+    if len(results) <= 10:
+        for result in results:
+            if result.ok:
+                print(f"[+] {result.name}: {result.found}")
+    rate = len(results) / elapsed if elapsed > 0 else float('inf')
+    print(f"[=] {len(results) - len(failed)}/{len(results)} binaries verified "
+          f"in {elapsed:.2f}s ({rate:.0f}/s)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
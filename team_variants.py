@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Per-team helpers shared by the variant builders (the snap/variants.py and
+jarvis_core/variants.py).
+
+Each builder derives a team's secrets from HMAC-SHA256(secret, team_id).
+The two differ only in how they turn the digest into a flag. On the rare
+collision between two teams' flags, the later team is re-derived from
+"<team_id>#<attempt>". Team IDs come from a text file and map to unique,
+filesystem-safe output directories.
+
+    teams = read_team_ids("teams.txt")
+    flags = assign_unique(teams, lambda team, attempt:
+                          make_flag(team_digest(secret, team, attempt)))
+    dirs = assign_dirs(teams)
+"""
+
+import hashlib
+import hmac
+import re
+
+
+def team_digest(secret, team_id, attempt=0):
+    """HMAC-SHA256(secret, team_id), or of "<team_id>#<attempt>" for a re-derivation."""
+    msg = team_id.encode() if attempt == 0 else f"{team_id}#{attempt}".encode()
+    return hmac.new(secret.encode(), msg, hashlib.sha256).digest()
+
+
+def assign_unique(team_ids, derive, key=lambda value: value):
+    """
+    {team: derive(team, attempt)} with key(value) unique across teams:
+    a team whose value collides is re-derived with the next attempt.
+    """
+    seen, values = set(), {}
+    for team in team_ids:
+        attempt = 0
+        value = derive(team, attempt)
+        while key(value) in seen:
+            attempt += 1
+            value = derive(team, attempt)
+        seen.add(key(value))
+        values[team] = value
+    return values
+
+
+def safe_name(team_id):
+    """Filesystem-safe directory name for a team ID."""
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', team_id).strip('._')
+    return name or hashlib.sha256(team_id.encode()).hexdigest()[:12]
+
+
+def assign_dirs(team_ids):
+    """Unique output directory per team (IDs that sanitize alike get a hash suffix)."""
+    dirs, used = {}, set()
+    for team in team_ids:
+        name = safe_name(team)
+        if name in used:
+            name = f"{name}-{hashlib.sha256(team.encode()).hexdigest()[:8]}"
+        used.add(name)
+        dirs[team] = name
+    return dirs
+
+
+def read_team_ids(path):
+    """Team IDs from a file, one per line (blank lines and # comments ignored)."""
+    with open(path) as f:
+        teams = [line.split('#', 1)[0].strip() for line in f]
+    teams = [t for t in teams if t]
+    if len(set(teams)) != len(teams):
+        raise ValueError(f"Duplicate team IDs in {path}")
+    return teams
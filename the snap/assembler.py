@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Streaming polyglot assembler for The Snap.
+
+Layers are written straight into the output file one after another instead
+of being concatenated in memory:
+
+  raw  bytes-like sources are written through a memoryview (no copy);
+       file sources are copied with os.sendfile where available, else with
+       a fixed-size readinto() buffer
+  zip  the source is deflated into a single-member ZIP written directly
+       into the output, block by block; offsets inside the ZIP are relative
+       to its own start, exactly as if it had been built in a BytesIO
+
+Peak memory stays at one copy buffer regardless of layer sizes. The offset
+and size of every layer are recorded in a JSON sidecar index.
+"""
+
+import io
+import json
+import os
+import time
+import zipfile
+from collections import namedtuple
+
+BLOCK_SIZE = 1 << 20
+
+# source: bytes-like object or path; member: ZIP member name (kind 'zip')
+Layer = namedtuple('Layer', 'name source kind member')
+Layer.__new__.__defaults__ = ('raw', None)
+
+
+class _OffsetWriter(io.RawIOBase):
+    """File wrapper whose positions are relative to `base` (for embedded ZIPs)."""
+
+    def __init__(self, fp, base):
+        self._fp = fp
+        self._base = base
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._fp.tell() - self._base
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            pos += self._base
+        return self._fp.seek(pos, whence) - self._base
+
+    def write(self, data):
+        return self._fp.write(data)
+
+    def flush(self):
+        self._fp.flush()
+
+
+def _source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    return memoryview(source).nbytes
+
+
+def _iter_blocks(source, block_size=BLOCK_SIZE):
+    """Yield memoryview blocks of a bytes-like or file source."""
+    if isinstance(source, (str, os.PathLike)):
+        buf = bytearray(block_size)
+        view = memoryview(buf)
+        with open(source, 'rb', buffering=0) as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                yield view[:n]
+        return
+    view = memoryview(source).cast('B')
+    for start in range(0, len(view), block_size):
+        yield view[start:start + block_size]
+
+
+def copy_source(out, source, block_size=BLOCK_SIZE):
+    """Copy one raw source into the open binary file `out`. Returns bytes written."""
+    if not isinstance(source, (str, os.PathLike)):
+        view = memoryview(source).cast('B')
+        out.write(view)
+        return len(view)
+
+    size = os.path.getsize(source)
+    if hasattr(os, 'sendfile'):
+        out.flush()
+        offset = 0
+        with open(source, 'rb') as src:
+            try:
+                while offset < size:
+                    sent = os.sendfile(out.fileno(), src.fileno(), offset, size - offset)
+                    if sent == 0:
+                        raise OSError(f"sendfile stalled at {offset}/{size} bytes of {source}")
+                    offset += sent
+            except OSError:
+                if offset:
+                    raise
+                # sendfile unsupported for this pair of files: buffered copy below
+            else:
+                out.seek(0, os.SEEK_END)  # resync the buffered writer
+                return size
+    written = 0
+    for block in _iter_blocks(source, block_size):
+        out.write(block)
+        written += len(block)
+    return written
+
+
+def write_zip_member(out, source, member, block_size=BLOCK_SIZE):
+    """Deflate `source` into a one-member ZIP written at out's position. Returns its size."""
+    base = out.tell()
+    size = _source_size(source)
+    zinfo = zipfile.ZipInfo(member, date_time=time.localtime(time.time())[:6])
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.external_attr = 0o600 << 16
+    with zipfile.ZipFile(_OffsetWriter(out, base), 'w', zipfile.ZIP_DEFLATED) as zf:
+        with zf.open(zinfo, 'w', force_zip64=size > zipfile.ZIP64_LIMIT) as dst:
+            for block in _iter_blocks(source, block_size):
+                dst.write(block)
+    out.seek(0, os.SEEK_END)
+    return out.tell() - base
+
+
+def assemble(path, layers, index_path=None, block_size=BLOCK_SIZE):
+    """
+    Stream `layers` into `path` in order and write the layer index.
+
+    Returns the index: a list of {name, kind, offset, size} dicts.
+    index_path defaults to <path without extension>.layers.json.
+    """
+    index = []
+    tmp = path + '.part'
+    try:
+        with open(tmp, 'wb', buffering=block_size) as out:
+            for layer in layers:
+                offset = out.tell()
+                if layer.kind == 'zip':
+                    size = write_zip_member(out, layer.source, layer.member or layer.name, block_size)
+                elif layer.kind == 'raw':
+                    size = copy_source(out, layer.source, block_size)
+                else:
+                    raise ValueError(f"Layer '{layer.name}': unknown kind '{layer.kind}'")
+                index.append({"name": layer.name, "kind": layer.kind, "offset": offset,
+                              "size": size})
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+    if index_path is None:
+        index_path = os.path.splitext(path)[0] + '.layers.json'
+    if index_path:
+        with open(index_path, 'w') as f:
+            json.dump({"file": os.path.basename(path),
+                       "size": sum(e["size"] for e in index),
+                       "layers": index}, f, indent=2)
+    return index
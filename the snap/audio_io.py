@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Streaming ffmpeg audio I/O for The Snap build.
+
+Audio never touches disk: MP3 input is decoded to raw s16le PCM on ffmpeg's
+stdout and read into NumPy in fixed-size chunks, and mixed PCM is piped into
+ffmpeg's stdin with the encoded MP3 collected from stdout. stdout/stderr are
+drained on background threads so large inputs cannot deadlock the pipes.
+"""
+
+import mmap
+import os
+import subprocess
+import threading
+
+import numpy as np
+
+FFMPEG = "ffmpeg"
+CHUNK_SAMPLES = 1 << 18          # 256k samples (512 KiB of s16 mono) per read/write
+PCM_DTYPE = np.dtype('<i2')
+
+
+class FFmpegError(RuntimeError):
+    """ffmpeg exited with a non-zero status."""
+
+
+def _drain(stream, sink):
+    """Read a pipe to EOF, appending chunks to `sink` (runs on a thread)."""
+    for block in iter(lambda: stream.read(1 << 16), b''):
+        sink.append(block)
+    stream.close()
+
+
+def _check(proc, cmd, stderr_chunks):
+    if proc.returncode != 0:
+        err = b''.join(stderr_chunks).decode(errors='replace').strip()
+        raise FFmpegError(f"{cmd[0]} exited with {proc.returncode}: {err[-2000:]}")
+
+
+# ─────────────────────────────────────────────
+# Decode: MP3 -> PCM over stdout
+# ─────────────────────────────────────────────
+def _feed(stream, data):
+    """Write `data` to a pipe and close it (runs on a thread)."""
+    try:
+        stream.write(data)
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its status is checked by the caller
+    finally:
+        try:
+            stream.close()
+        except BrokenPipeError:
+            pass
+
+
+def iter_decode(path, sample_rate=44100, channels=1, chunk_samples=CHUNK_SAMPLES):
+    """
+    Yield int16 PCM chunks (interleaved if channels > 1) decoded from `path`.
+
+    `path` may also be a bytes-like object holding the encoded file, which
+    is fed to ffmpeg's stdin (e.g. an MP3 layer carved out of a container).
+    Piped input is not seekable, so encoder-delay (gapless) trimming may be
+    skipped and the audio can start a few hundred samples later than when
+    decoding the same file from disk.
+    """
+    in_memory = isinstance(path, (bytes, bytearray, memoryview))
+    cmd = [FFMPEG, '-nostdin', '-loglevel', 'error', '-i', 'pipe:0' if in_memory else path,
+           '-ar', str(sample_rate), '-ac', str(channels), '-f', 's16le', '-']
+    if in_memory:
+        cmd.remove('-nostdin')
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE if in_memory else None,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_chunks = []
+    threads = [threading.Thread(target=_drain, args=(proc.stderr, stderr_chunks), daemon=True)]
+    if in_memory:
+        threads.append(threading.Thread(target=_feed, args=(proc.stdin, path), daemon=True))
+    for t in threads:
+        t.start()
+
+    chunk_bytes = chunk_samples * channels * PCM_DTYPE.itemsize
+    leftover = b''
+    try:
+        while True:
+            block = proc.stdout.read(chunk_bytes)
+            if not block:
+                break
+            block = leftover + block
+            usable = len(block) - len(block) % (PCM_DTYPE.itemsize * channels)
+            leftover = block[usable:]
+            if usable:
+                yield np.frombuffer(block[:usable], dtype=PCM_DTYPE)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        for t in threads:
+            t.join()
+    _check(proc, cmd, stderr_chunks)
+
+
+def decode_pcm(path, sample_rate=44100, channels=1, chunk_samples=CHUNK_SAMPLES):
+    """Decode `path` (or encoded bytes) fully into one int16 array (2 bytes per sample)."""
+    # One growing buffer instead of a chunk list + concatenated copy
+    buf = bytearray()
+    for chunk in iter_decode(path, sample_rate, channels, chunk_samples):
+        buf += memoryview(chunk).cast('B')
+    return np.frombuffer(buf, dtype=PCM_DTYPE)
+
+
+def decode_to_file(path, out_path, sample_rate=44100, channels=1, chunk_samples=CHUNK_SAMPLES):
+    """
+    Stream-decode `path` into a raw int16 file at out_path and return it as a
+    read-only np.memmap. Only one chunk is ever held in memory, so the decoded
+    track lives in the page cache rather than the process heap.
+    """
+    with open(out_path, 'wb') as f:
+        for chunk in iter_decode(path, sample_rate, channels, chunk_samples):
+            f.write(memoryview(chunk).cast('B'))
+    return map_pcm(out_path)
+
+
+def map_pcm(path):
+    """Map a raw int16 PCM file read-only (shared through the page cache, no copy)."""
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=PCM_DTYPE)
+    return np.memmap(path, dtype=PCM_DTYPE, mode='r')
+
+
+def release_pages(arr):
+    """
+    Drop the resident pages of a memory-mapped array from this process
+    (they stay in the page cache). A no-op for ordinary arrays.
+    """
+    mapping = getattr(arr, '_mmap', None)
+    if mapping is not None and hasattr(mmap, 'MADV_DONTNEED'):
+        mapping.madvise(mmap.MADV_DONTNEED)
+
+
+# ─────────────────────────────────────────────
+# Encode: PCM -> MP3 over stdin/stdout
+# ─────────────────────────────────────────────
+class Mp3Encoder:
+    """
+    Pipe int16 PCM into ffmpeg/libmp3lame and collect the MP3 bytes.
+
+        with Mp3Encoder(44100) as enc:
+            for chunk in pcm_chunks:
+                enc.write(chunk)
+        mp3_bytes = enc.data
+    """
+
+    def __init__(self, sample_rate=44100, channels=1, bitrate='128k'):
+        self.cmd = [FFMPEG, '-loglevel', 'error',
+                    '-f', 's16le', '-ar', str(sample_rate), '-ac', str(channels), '-i', '-',
+                    '-codec:a', 'libmp3lame', '-b:a', bitrate, '-f', 'mp3', '-']
+        self.data = None
+        self.samples_written = 0
+        self._proc = None
+
+    def __enter__(self):
+        self._proc = subprocess.Popen(self.cmd, stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._out, self._err = [], []
+        self._threads = [
+            threading.Thread(target=_drain, args=(self._proc.stdout, self._out), daemon=True),
+            threading.Thread(target=_drain, args=(self._proc.stderr, self._err), daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def write(self, pcm):
+        """Write a chunk of int16 samples."""
+        pcm = np.ascontiguousarray(pcm, dtype=PCM_DTYPE)
+        try:
+            self._proc.stdin.write(memoryview(pcm).cast('B'))
+        except BrokenPipeError:
+            # ffmpeg died early; close() raises FFmpegError with its stderr
+            self.close()
+            raise
+        self.samples_written += len(pcm)
+
+    def close(self):
+        """Flush stdin, wait for ffmpeg and return the MP3 bytes."""
+        if self._proc is None:
+            return self.data
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._proc.wait()
+        for t in self._threads:
+            t.join()
+        proc, self._proc = self._proc, None
+        _check(proc, self.cmd, self._err)
+        self.data = b''.join(self._out)
+        return self.data
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+        return False
+
+
+def encode_mp3(pcm_chunks, sample_rate=44100, channels=1, bitrate='128k'):
+    """Encode an iterable of int16 chunks to MP3 bytes."""
+    with Mp3Encoder(sample_rate, channels, bitrate) as enc:
+        for chunk in pcm_chunks:
+            enc.write(chunk)
+    return enc.data
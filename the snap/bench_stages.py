@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Stage benchmark suite for the_snap build functions.
+
+Runs each build stage over a parameter sweep and records wall time, CPU
+time (own and ffmpeg children) and peak RSS per case:
+
+  gauntlet     generate_gauntlet_image       image size
+  lsb          encode_lsb_red_channel        payload length
+  png          png_encoder.encode_png        encoder profile x image size
+  morse        generate_morse_tone           text length x WPM
+  spectrogram  generate_spectrogram_audio    text length x duration
+  mix          mix_spectrogram_into_mp3      source audio duration
+
+Every case runs in a fresh spawned process; inputs are prepared before
+timing starts. The peak RSS counter (VmHWM, as in build_trace.py) is then
+reset, so peak_rss_mb is the stage's own peak, not the imports and setup
+(setup_rss_mb). Where VmHWM cannot be reset it falls back to ru_maxrss,
+the process-lifetime peak, and the row says "peak_rss_scope": "process". The mix stage encodes a
+small synthetic MP3 (tones + noise) with ffmpeg, so the suite runs offline
+and never needs i_am_iron_man.mp3.
+
+Results go to bench_results.json and are compared to a baseline
+(bench_baseline.json, or --baseline). Any case whose wall time grew by
+more than --threshold is flagged as a regression and the exit status is 1.
+Timings only compare on one machine, so no baseline is committed. Without
+one, the run fails with exit status 2 instead of passing unchecked; record
+it with --save-baseline, or pass --no-compare to only collect numbers.
+
+Usage:
+  python3 bench_stages.py                      # full sweep, compare to baseline
+  python3 bench_stages.py --quick -s lsb morse # small sweep of two stages
+  python3 bench_stages.py --save-baseline      # record the current numbers
+  python3 bench_stages.py --no-compare         # numbers only, no regression check
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(BASE_DIR, "bench_results.json")
+BASELINE_FILE = os.path.join(BASE_DIR, "bench_baseline.json")
+DEFAULT_THRESHOLD = 0.25        # flag cases more than 25% slower than baseline
+MIN_REGRESSION_S = 0.005        # ignore differences below timer noise
+
+SWEEPS = {
+    "gauntlet": [{"size": s} for s in ((200, 150), (800, 600), (1920, 1080))],
+    "lsb": [{"payload": n} for n in (64, 1024, 16384, 60000)],
+    "png": [{"profile": p, "size": s} for p in ("pillow", "fast", "balanced", "small")
+            for s in ((800, 600), (1920, 1080))],
+    "morse": [{"chars": n, "wpm": w} for n in (8, 32, 128) for w in (15, 30)],
+    "spectrogram": [{"chars": n, "duration": d} for n in (9, 36) for d in (None, 30.0)],
+    "mix": [{"seconds": s} for s in (5, 30, 120)],
+}
+QUICK_SWEEPS = {
+    "gauntlet": [{"size": (200, 150)}, {"size": (800, 600)}],
+    "lsb": [{"payload": 64}, {"payload": 16384}],
+    "png": [{"profile": "pillow", "size": (800, 600)}, {"profile": "fast", "size": (800, 600)}],
+    "morse": [{"chars": 8, "wpm": 15}, {"chars": 32, "wpm": 30}],
+    "spectrogram": [{"chars": 9, "duration": None}],
+    "mix": [{"seconds": 5}],
+}
+
+
+# ─────────────────────────────────────────────
+# Synthetic inputs
+# ─────────────────────────────────────────────
+def make_synthetic_mp3(path, seconds, sample_rate=44100):
+    """Encode `seconds` of a tone chord with light noise to MP3 at `path`."""
+    from audio_io import encode_mp3
+
+    rng = np.random.default_rng(0)
+
+    def chunks(step=1 << 18):
+        total = int(seconds * sample_rate)
+        for start in range(0, total, step):
+            t = np.arange(start, min(start + step, total)) / sample_rate
+            x = 0.2 * np.sin(2 * np.pi * 220 * t) + 0.15 * np.sin(2 * np.pi * 330 * t)
+            x += 0.05 * np.sin(2 * np.pi * 2500 * t) + 0.02 * rng.standard_normal(len(t))
+            yield (x * 32767).astype(np.int16)
+
+    with open(path, 'wb') as f:
+        f.write(encode_mp3(chunks(), sample_rate))
+    return path
+
+
+def _text(n):
+    """Deterministic flag-alphabet text of length n."""
+    alphabet = "MYTHIX{I_4m_Ir0n_M4n_6000}"
+    return (alphabet * (n // len(alphabet) + 1))[:n]
+
+
+# ─────────────────────────────────────────────
+# Stage setups: build inputs (untimed), return the timed call
+# ─────────────────────────────────────────────
+def _setup_gauntlet(snap, params, mp3_dir):
+    width, height = params["size"]
+    return lambda: snap.generate_gauntlet_image(width, height)
+
+
+def _setup_lsb(snap, params, mp3_dir):
+    img = snap.generate_gauntlet_image(800, 600)
+    payload = (_text(64).encode() * (params["payload"] // 64 + 1))[:params["payload"]]
+    return lambda: snap.encode_lsb_red_channel(img, payload)
+
+
+def _setup_png(snap, params, mp3_dir):
+    from png_encoder import encode_png
+
+    width, height = params["size"]
+    img = snap.encode_lsb_red_channel(snap.generate_gauntlet_image(width, height), _text(64).encode())
+    return lambda: encode_png(img, snap.PNG_METADATA, params["profile"])
+
+
+def _setup_morse(snap, params, mp3_dir):
+    morse = snap.text_to_morse(_text(params["chars"]).encode().hex().upper())
+    return lambda: snap.generate_morse_tone(morse, snap.MORSE_FREQ_REAL, params["wpm"])
+
+
+def _setup_spectrogram(snap, params, mp3_dir):
+    text = _text(params["chars"])
+    return lambda: snap.generate_spectrogram_audio(text, duration_sec=params["duration"])
+
+
+def _setup_mix(snap, params, mp3_dir):
+    mp3_path = os.path.join(mp3_dir, f"synthetic_{params['seconds']}s.mp3")
+    spec = snap.generate_spectrogram_audio(snap.FLAG_PART1)
+    return lambda: snap.mix_spectrogram_into_mp3(mp3_path, spec)
+
+
+SETUPS = {
+    "gauntlet": _setup_gauntlet,
+    "lsb": _setup_lsb,
+    "png": _setup_png,
+    "morse": _setup_morse,
+    "spectrogram": _setup_spectrogram,
+    "mix": _setup_mix,
+}
+
+
+def _rss_mb():
+    """Current resident set size in MB (Linux), else None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def _run_case(stage, params, repeats, mp3_dir):
+    """Measure one case; runs in a fresh spawned process."""
+    sys.path.insert(0, BASE_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import build_challenge as snap
+        from build_trace import _read_hwm_mb, _reset_hwm
+        call = SETUPS[stage](snap, params, mp3_dir)
+        rss_before = _rss_mb()
+        stage_peak = _reset_hwm()
+
+        walls, cpus, child_cpus = [], [], []
+        for _ in range(repeats):
+            children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu0, wall0 = time.process_time(), time.perf_counter()
+            call()
+            walls.append(time.perf_counter() - wall0)
+            cpus.append(time.process_time() - cpu0)
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            child_cpus.append(after.ru_utime + after.ru_stime - children.ru_utime - children.ru_stime)
+
+    best = int(np.argmin(walls))
+    peak_mb = _read_hwm_mb() if stage_peak else None
+    if peak_mb is None:
+        stage_peak = False
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    return {
+        "stage": stage,
+        "params": params,
+        "wall_s": walls[best],
+        "cpu_s": cpus[best],
+        "cpu_children_s": child_cpus[best],
+        "peak_rss_mb": peak_mb,
+        "peak_rss_scope": "stage" if stage_peak else "process",
+        "setup_rss_mb": rss_before,
+        "repeats": repeats,
+    }
+
+
+# ─────────────────────────────────────────────
+# Suite
+# ─────────────────────────────────────────────
+def case_key(row):
+    return f"{row['stage']}:{json.dumps(row['params'], sort_keys=True)}"
+
+
+def run_suite(stages=None, quick=False, repeats=3):
+    """Run the sweeps and return the results document."""
+    sweeps = QUICK_SWEEPS if quick else SWEEPS
+    stages = stages or list(sweeps)
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    with tempfile.TemporaryDirectory(prefix="snap_bench_") as mp3_dir:
+        if "mix" in stages:
+            for params in sweeps["mix"]:
+                make_synthetic_mp3(os.path.join(mp3_dir, f"synthetic_{params['seconds']}s.mp3"),
+                                   params["seconds"])
+        for stage in stages:
+            for params in sweeps[stage]:
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    row = pool.submit(_run_case, stage, params, repeats, mp3_dir).result()
+                results.append(row)
+                print(f"  {case_key(row):<48} {row['wall_s'] * 1000:9.1f} ms wall  "
+                      f"{row['cpu_s'] * 1000:9.1f} ms cpu  {row['peak_rss_mb']:7.1f} MB peak")
+    return {
+        "meta": {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "quick": quick,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return [(key, base_s, new_s, ratio)] for cases slower than baseline by > threshold."""
+    base = {case_key(r): r for r in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        old = base.get(case_key(row))
+        if old is None:
+            continue
+        ratio = row["wall_s"] / old["wall_s"] if old["wall_s"] > 0 else float('inf')
+        if ratio > 1 + threshold and row["wall_s"] - old["wall_s"] > MIN_REGRESSION_S:
+            regressions.append((case_key(row), old["wall_s"], row["wall_s"], ratio))
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the_snap build stages")
+    parser.add_argument('-s', '--stages', nargs='+', choices=list(SWEEPS),
+                        help="stages to run (default: all)")
+    parser.add_argument('--quick', action='store_true', help="small sweep")
+    parser.add_argument('-r', '--repeats', type=int, default=3,
+                        help="timed runs per case; the fastest is kept (default: 3)")
+    parser.add_argument('-o', '--output', default=RESULTS_FILE, help="results JSON")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline JSON to compare to")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"regression threshold as a fraction (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="also write the results as the new baseline")
+    parser.add_argument('--no-compare', action='store_true',
+                        help="skip the regression check (a missing baseline is not an error)")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("  the_snap stage benchmarks")
+    print("=" * 60)
+    current = run_suite(args.stages, args.quick, args.repeats)
+
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"[+] Results: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"[+] Baseline saved: {args.baseline}")
+        return
+
+    if args.no_compare:
+        return
+    if not os.path.exists(args.baseline):
+        print(f"[!] No baseline at {args.baseline}: regressions cannot be detected.")
+        print(f"    Record one on this machine with --save-baseline (or pass --no-compare).")
+        sys.exit(2)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for field in ("machine", "cpus", "python", "numpy"):
+        if baseline["meta"].get(field) != current["meta"][field]:
+            print(f"[!] Baseline was recorded with {field}={baseline['meta'].get(field)} "
+                  f"(now {current['meta'][field]}): timings may not compare")
+    known = {case_key(r) for r in baseline["results"]}
+    unmatched = [case_key(r) for r in current["results"] if case_key(r) not in known]
+    if unmatched:
+        print(f"[!] {len(unmatched)} case(s) not in the baseline, not checked: "
+              f"{', '.join(unmatched[:5])}{' ...' if len(unmatched) > 5 else ''}")
+        if len(unmatched) == len(current["results"]):
+            sys.exit(2)
+    regressions = compare(current, baseline, args.threshold)
+    if not regressions:
+        print(f"[+] No regressions above {args.threshold:.0%} vs {args.baseline}")
+        return
+    print(f"[!] {len(regressions)} regression(s) above {args.threshold:.0%}:")
+    for key, old, new, ratio in regressions:
+        print(f"    {key:<48} {old * 1000:9.1f} -> {new * 1000:9.1f} ms  ({ratio:.2f}x)")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -10,21 +10,37 @@ Layers:
   4. WAV embedded in PNG with dual-frequency morse (800Hz decoy + 6000Hz real)
 
 Flag: MYTHIX{I_4m_Ir0n_M4n_6000}
+
+Each layer can also be rebuilt on its own, writing its intermediate file:
+
+  python3 build_challenge.py [build]      # everything (default)
+  python3 build_challenge.py lsb          # stages/lsb_payload.txt
+  python3 build_challenge.py image        # gauntlet.png
+  python3 build_challenge.py morse        # morse_signal_test.wav
+  python3 build_challenge.py spectrogram  # stages/spectrogram.mp3
+  python3 build_challenge.py assemble     # mission_log.txt + the_snap.mp3
+  python3 build_challenge.py verify       # solve the_snap.mp3
+
+NumPy, Pillow and the layer modules are imported inside the functions that
+need them, so a subcommand only pays for the imports of its own layer.
 """
 
-import struct
 import wave
 import io
 import os
 import sys
 import base64
-import zlib
-import math
-import random
+import tempfile
+import time
+from functools import partial
+
+from assembler import Layer, assemble
+from stage_cache import StageCache, file_digest
+from stage_graph import Stage, format_report, run_stages
 
-# numpy for audio signal generation
-import numpy as np
-from PIL import Image, PngImagePlugin
+# Shared build instrumentation lives at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from build_trace import Tracer, nbytes
 
 # ─────────────────────────────────────────────
 # Configuration
@@ -33,6 +49,16 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 INPUT_MP3 = os.path.join(BASE_DIR, "i_am_iron_man.mp3")
 OUTPUT_DIR = os.path.join(BASE_DIR, "challenge_output")
 FINAL_FILE = os.path.join(OUTPUT_DIR, "the_snap.mp3")
+QA_DIR = os.path.join(OUTPUT_DIR, "qa")
+STAGE_DIR = os.path.join(OUTPUT_DIR, "stages")      # intermediates with no test file
+LSB_PAYLOAD_FILE = os.path.join(STAGE_DIR, "lsb_payload.txt")
+PNG_FILE = os.path.join(OUTPUT_DIR, "gauntlet.png")
+WAV_FILE = os.path.join(OUTPUT_DIR, "morse_signal_test.wav")
+MIXED_MP3_FILE = os.path.join(STAGE_DIR, "spectrogram.mp3")
+MISSION_LOG_FILE = os.path.join(OUTPUT_DIR, "mission_log.txt")
+CACHE_DIR = os.path.join(BASE_DIR, ".build_cache")
+CACHE_MAX_MB = 512
+TRACE_DIR = os.path.join(BASE_DIR, ".build_trace")
 
 # Flag parts
 FLAG_PART1 = "MYTHIX{I_"       # Hidden in spectrogram
@@ -45,10 +71,24 @@ FALSE_FLAG_EXIF = "flag_candidate: MYTHIX{r3ality_st0ne_activated}"
 FALSE_FLAG_LSB1 = "MYTHIX{sn4p_complete_3000}"  # same as txt, reinforces
 FALSE_FLAG_LSB2 = "flag{not_the_real_one}"
 
+# PNG tEXt metadata (EXIF-like decoy)
+PNG_METADATA = {
+    "Comment": FALSE_FLAG_EXIF,
+    "Author": "S.H.I.E.L.D. Quantum Division",
+    "Description": "Gauntlet energy signature scan - classified",
+}
+
 # Audio parameters
 SAMPLE_RATE = 44100
 MORSE_WPM_DECOY = 20
 MORSE_WPM_REAL = 15
+MORSE_DECOY_TEXT = "ENDGAME"
+MORSE_FREQ_DECOY = 800
+MORSE_FREQ_REAL = 6000
+MP3_BITRATE = '128k'
+MIX_DTYPE = 'float32'           # NumPy sample type for mixing; 'float64' for reference output
+PNG_PROFILE = 'pillow'          # png_encoder.PROFILES entry for gauntlet.png
+CHUNK_SAMPLES = 1 << 18         # audio_io.CHUNK_SAMPLES, without importing NumPy
 
 # Morse code dictionary
 MORSE_CODE = {
@@ -67,32 +107,15 @@ MORSE_CODE = {
 # Step 1: Generate the PNG Image
 # ─────────────────────────────────────────────
 def generate_gauntlet_image(width=800, height=600):
-    """Generate an abstract 'gauntlet energy' image with swirling colors."""
-    print("[*] Generating gauntlet.png image...")
-    img = Image.new('RGB', (width, height))
-    pixels = img.load()
+    """Generate an abstract 'gauntlet energy' image with swirling colors.
 
-    for y in range(height):
-        for x in range(width):
-            # Create swirling abstract pattern
-            cx, cy = width / 2, height / 2
-            dx, dy = x - cx, y - cy
-            dist = math.sqrt(dx * dx + dy * dy)
-            angle = math.atan2(dy, dx)
-
-            # Purple-gold-orange galaxy swirl
-            r = int(128 + 127 * math.sin(dist * 0.03 + angle * 3))
-            g = int(80 + 80 * math.sin(dist * 0.025 - angle * 2 + 1.5))
-            b = int(140 + 115 * math.sin(dist * 0.02 + angle * 4 + 3.0))
-
-            # Ensure even values for LSB embedding later (clear LSB)
-            r = r & 0xFE
-            g = g & 0xFE
-            b = b & 0xFE
-
-            pixels[x, y] = (r, g, b)
+    The swirl is rendered for the whole image at once by gauntlet_render;
+    every channel comes back with its LSB already cleared for embedding.
+    """
+    from gauntlet_render import render_gauntlet
 
-    return img
+    print("[*] Generating gauntlet.png image...")
+    return render_gauntlet((width, height))
 
 
 # ─────────────────────────────────────────────
@@ -100,37 +123,18 @@ def generate_gauntlet_image(width=800, height=600):
 # ─────────────────────────────────────────────
 def encode_lsb_red_channel(img, message_bytes):
     """Encode data into the LSB of the red channel."""
+    import numpy as np
+    from PIL import Image
+    from lsb_engine import embed_lsb_array
+
     print(f"[*] Encoding {len(message_bytes)} bytes into red channel LSB...")
-    pixels = img.load()
-    width, height = img.size
-
-    # Convert message to bits
-    bits = []
-    for byte in message_bytes:
-        for i in range(7, -1, -1):
-            bits.append((byte >> i) & 1)
-
-    # Check capacity
-    max_bits = width * height
-    if len(bits) > max_bits:
-        raise ValueError(f"Message too large: {len(bits)} bits > {max_bits} capacity")
-
-    bit_idx = 0
-    for y in range(height):
-        for x in range(width):
-            if bit_idx >= len(bits):
-                break
-            r, g, b = pixels[x, y]
-            # Set LSB of red channel
-            r = (r & 0xFE) | bits[bit_idx]
-            pixels[x, y] = (r, g, b)
-            bit_idx += 1
-
-    print(f"[+] Encoded {bit_idx} bits into image")
-    return img
-
-
-def build_lsb_payload():
+    arr = np.array(img.convert('RGB'), dtype=np.uint8)
+    n_bits = embed_lsb_array(arr, message_bytes, channels="R", depth=1)
+    print(f"[+] Encoded {n_bits} bits into image")
+    return Image.fromarray(arr, 'RGB')
+
+
+def build_lsb_payload(part2=FLAG_PART2):
     """Build the LSB payload with 3 base64 strings (2 decoys + 1 real)."""
 
     # Decoy 1: Encodes to same false flag as mission_log.txt
@@ -141,7 +145,7 @@ def build_lsb_payload():
 
     # Real: Part 2 encoded as hex, then base64
     # 4m_Ir0n_ -> hex -> 346d5f4972306e5f -> base64
-    part2_hex = FLAG_PART2.encode().hex()  # "346d5f4972306e5f"
+    part2_hex = part2.encode().hex()  # "346d5f4972306e5f"
     real_b64 = base64.b64encode(part2_hex.encode()).decode()
 
     # Build payload: newline-separated base64 strings
@@ -153,7 +157,7 @@ def build_lsb_payload():
     print(f"      -> decodes to: {FALSE_FLAG_LSB1}")
     print(f"    Real   (b64): {real_b64}")
     print(f"      -> decodes to hex: {part2_hex}")
-    print(f"      -> hex decodes to: {FLAG_PART2}")
+    print(f"      -> hex decodes to: {part2}")
     print(f"    Decoy 2 (b64): {decoy2}")
     print(f"      -> decodes to: {FALSE_FLAG_LSB2}")
 
@@ -173,107 +177,78 @@ def text_to_morse(text):
 
 
 def generate_morse_tone(morse_str, frequency, wpm, sample_rate=44100):
-    """Generate audio samples for morse code at given frequency and WPM."""
-    # Timing based on WPM (PARIS standard)
-    dot_duration = 1.2 / wpm  # seconds per dot
-
-    samples = []
-
-    for i, char in enumerate(morse_str):
-        if char == '.':
-            duration = dot_duration
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            tone = np.sin(2 * np.pi * frequency * t)
-            # Apply envelope to avoid clicks
-            envelope = np.ones_like(t)
-            ramp = min(int(0.005 * sample_rate), len(t) // 4)
-            if ramp > 0:
-                envelope[:ramp] = np.linspace(0, 1, ramp)
-                envelope[-ramp:] = np.linspace(1, 0, ramp)
-            samples.extend(tone * envelope)
-            # Inter-element gap (1 dot)
-            gap = int(sample_rate * dot_duration)
-            samples.extend([0.0] * gap)
-
-        elif char == '-':
-            duration = dot_duration * 3
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            tone = np.sin(2 * np.pi * frequency * t)
-            envelope = np.ones_like(t)
-            ramp = min(int(0.005 * sample_rate), len(t) // 4)
-            if ramp > 0:
-                envelope[:ramp] = np.linspace(0, 1, ramp)
-                envelope[-ramp:] = np.linspace(1, 0, ramp)
-            samples.extend(tone * envelope)
-            # Inter-element gap
-            gap = int(sample_rate * dot_duration)
-            samples.extend([0.0] * gap)
-
-        elif char == ' ':
-            # Check if word gap (double space) or letter gap
-            # Letter gap = 3 dots (already 1 from inter-element, so add 2 more)
-            if i + 1 < len(morse_str) and morse_str[i + 1] == ' ':
-                continue  # skip, next space handles word gap
-            elif i > 0 and morse_str[i - 1] == ' ':
-                # Word gap = 7 dots (already 3 from letter, so add 4 more)
-                gap = int(sample_rate * dot_duration * 4)
-                samples.extend([0.0] * gap)
-            else:
-                # Letter gap
-                gap = int(sample_rate * dot_duration * 2)
-                samples.extend([0.0] * gap)
-
-    return np.array(samples)
-
-
-def generate_morse_wav():
-    """Generate WAV with dual-frequency morse: 800Hz decoy + 6000Hz real."""
-    print("[*] Generating morse_signal.wav...")
+    """Generate float32 samples for morse code at given frequency and WPM."""
+    from morse_synth import generate_keyed_tone
 
-    # Decoy morse at 800 Hz (obvious frequency)
-    decoy_text = "ENDGAME"
-    decoy_morse = text_to_morse(decoy_text)
-    print(f"    Decoy morse ({decoy_text}): {decoy_morse}")
-    decoy_samples = generate_morse_tone(decoy_morse, 800, MORSE_WPM_DECOY, SAMPLE_RATE)
+    # Timing based on WPM (PARIS standard); see morse_synth.build_schedule
+    return generate_keyed_tone(morse_str, frequency, wpm, sample_rate)
 
-    # Real morse at 6000 Hz (requires filtering/spectrogram analysis)
-    # Part 3 as hex: M4n_6000} -> hex
-    part3_hex = FLAG_PART3.encode().hex()  # "4d346e5f36303030fD" wait no
-    # Actually let's make the morse decode directly to the part3 text
-    # But encode it as hex to add the extra decode step
-    real_text = part3_hex.upper()
-    real_morse = text_to_morse(real_text)
-    print(f"    Real morse (hex of '{FLAG_PART3}'): {real_text}")
-    print(f"    Real morse: {real_morse}")
-    real_samples = generate_morse_tone(real_morse, 6000, MORSE_WPM_REAL, SAMPLE_RATE)
 
-    # Make both signals the same length (pad shorter one)
-    max_len = max(len(decoy_samples), len(real_samples))
-    decoy_padded = np.zeros(max_len)
-    real_padded = np.zeros(max_len)
-    decoy_padded[:len(decoy_samples)] = decoy_samples
-    real_padded[:len(real_samples)] = real_samples
+def generate_decoy_morse():
+    """Render the 800 Hz decoy channel at its mix level (shared by all variants)."""
+    from morse_synth import Carrier, synthesize
 
-    # Mix: decoy louder (0.7), real quieter (0.3)
-    mixed = decoy_padded * 0.7 + real_padded * 0.3
+    decoy_morse = text_to_morse(MORSE_DECOY_TEXT)
+    print(f"    Decoy morse ({MORSE_DECOY_TEXT}): {decoy_morse}")
+    return synthesize([Carrier(decoy_morse, MORSE_FREQ_DECOY, MORSE_WPM_DECOY, 0.7)], SAMPLE_RATE)
 
-    # Add subtle background noise
-    noise = np.random.normal(0, 0.02, max_len)
-    mixed = mixed + noise
 
-    # Normalize
-    mixed = mixed / np.max(np.abs(mixed)) * 0.9
+def generate_morse_wav(part3=FLAG_PART3, decoy_samples=None):
+    """
+    Generate WAV with dual-frequency morse: 800Hz decoy + 6000Hz real.
+
+    decoy_samples: optional pre-rendered output of generate_decoy_morse(),
+    so bulk builds only synthesize the per-team 6000 Hz channel.
+    """
+    import numpy as np
+    from morse_synth import Carrier, synthesize
 
-    # Convert to 16-bit PCM
-    pcm = (mixed * 32767).astype(np.int16)
+    print("[*] Generating morse_signal.wav...")
 
-    # Write WAV
+    # Real morse at 6000 Hz (requires filtering/spectrogram analysis)
+    # Part 3 is sent as hex to add an extra decode step
+    part3_hex = part3.encode().hex()
+    real_text = part3_hex.upper()
+    real_morse = text_to_morse(real_text)
+    print(f"    Real morse (hex of '{part3}'): {real_text}")
+    print(f"    Real morse: {real_morse}")
+    real = Carrier(real_morse, MORSE_FREQ_REAL, MORSE_WPM_REAL, 0.3)
+
+    if decoy_samples is None:
+        # Decoy morse at 800 Hz (obvious frequency)
+        decoy_morse = text_to_morse(MORSE_DECOY_TEXT)
+        print(f"    Decoy morse ({MORSE_DECOY_TEXT}): {decoy_morse}")
+        # Both carriers keyed into one buffer: decoy louder (0.7), real quieter (0.3)
+        mixed = synthesize([
+            Carrier(decoy_morse, MORSE_FREQ_DECOY, MORSE_WPM_DECOY, 0.7),
+            real,
+        ], SAMPLE_RATE)
+    else:
+        real_samples = synthesize([real], SAMPLE_RATE)
+        mixed = np.zeros(max(len(decoy_samples), len(real_samples)), dtype=np.float32)
+        mixed[:len(decoy_samples)] += decoy_samples
+        mixed[:len(real_samples)] += real_samples
+        del real_samples
+
+    # Add subtle background noise and find the peak, one chunk at a time
+    rng = np.random.default_rng()
+    bounds = range(0, len(mixed), CHUNK_SAMPLES)
+    peak = 0.0
+    for start in bounds:
+        chunk = mixed[start:start + CHUNK_SAMPLES]
+        chunk += rng.standard_normal(len(chunk), dtype=np.float32) * np.float32(0.02)
+        peak = max(peak, float(np.max(np.abs(chunk))))
+
+    # Normalize, convert to 16-bit PCM and write the WAV chunk by chunk
+    scale = np.float32(0.9 / peak * 32767)
     wav_buffer = io.BytesIO()
     with wave.open(wav_buffer, 'wb') as wf:
         wf.setnchannels(1)
         wf.setsampwidth(2)
         wf.setframerate(SAMPLE_RATE)
-        wf.writeframes(pcm.tobytes())
+        for start in bounds:
+            chunk = mixed[start:start + CHUNK_SAMPLES] * scale
+            wf.writeframes(memoryview(chunk.astype('<i2')).cast('B'))
 
     wav_data = wav_buffer.getvalue()
     print(f"[+] Generated morse WAV: {len(wav_data)} bytes")
@@ -284,150 +259,27 @@ def generate_morse_wav():
 # Step 4: Generate Spectrogram Text for MP3
 # ─────────────────────────────────────────────
 
-# Simple bitmap font for spectrogram text (5x7 pixel characters)
-FONT = {
-    'M': [
-        [1,0,0,0,1],
-        [1,1,0,1,1],
-        [1,0,1,0,1],
-        [1,0,0,0,1],
-        [1,0,0,0,1],
-        [1,0,0,0,1],
-        [1,0,0,0,1],
-    ],
-    'Y': [
-        [1,0,0,0,1],
-        [1,0,0,0,1],
-        [0,1,0,1,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-    ],
-    'T': [
-        [1,1,1,1,1],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-    ],
-    'H': [
-        [1,0,0,0,1],
-        [1,0,0,0,1],
-        [1,0,0,0,1],
-        [1,1,1,1,1],
-        [1,0,0,0,1],
-        [1,0,0,0,1],
-        [1,0,0,0,1],
-    ],
-    'I': [
-        [1,1,1,1,1],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [1,1,1,1,1],
-    ],
-    'X': [
-        [1,0,0,0,1],
-        [0,1,0,1,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,1,0,1,0],
-        [1,0,0,0,1],
-    ],
-    '{': [
-        [0,0,1,1,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,1,0,0,0],
-        [0,0,1,0,0],
-        [0,0,1,0,0],
-        [0,0,1,1,0],
-    ],
-    '_': [
-        [0,0,0,0,0],
-        [0,0,0,0,0],
-        [0,0,0,0,0],
-        [0,0,0,0,0],
-        [0,0,0,0,0],
-        [0,0,0,0,0],
-        [1,1,1,1,1],
-    ],
-}
-
-
-def generate_spectrogram_audio(text, duration_sec=None):
+def generate_spectrogram_audio(text, duration_sec=None, **options):
     """
     Generate audio where the spectrogram visually shows text.
     Each text column becomes a set of frequency bins that are 'on'.
     Text appears in the 15-19 kHz range.
+
+    Glyphs come from the spectro_synth atlas; extra keyword options
+    (phase_continuous, window, row_scale, freq_low/freq_high) are passed
+    through to spectro_synth.synthesize_text.
     """
+    from spectro_synth import render_bitmap, synthesize_text
+
     print(f"[*] Generating spectrogram text: '{text}'")
 
-    # Build bitmap for the full text
-    bitmap = []
-    for ch in text:
-        if ch in FONT:
-            for row_idx in range(7):
-                if row_idx >= len(bitmap):
-                    bitmap.append([])
-                bitmap[row_idx].extend(FONT[ch][row_idx])
-                bitmap[row_idx].append(0)  # gap between chars
-        else:
-            # Unknown char: blank space
-            for row_idx in range(7):
-                if row_idx >= len(bitmap):
-                    bitmap.append([])
-                bitmap[row_idx].extend([0, 0, 0, 0, 0, 0])
-
-    text_width = len(bitmap[0]) if bitmap else 0
-    text_height = len(bitmap)  # 7 rows
-
-    print(f"    Bitmap size: {text_width} x {text_height}")
-
-    # Map rows to frequencies (15 kHz to 19 kHz, bottom row = 15kHz)
-    freq_low = 15000
-    freq_high = 19000
-    freqs = [freq_low + (freq_high - freq_low) * (text_height - 1 - r) / (text_height - 1)
-             for r in range(text_height)]
-
-    # Each column lasts for a short time
-    col_duration = 0.04  # 40ms per column
-    if duration_sec is None:
-        duration_sec = col_duration * text_width + 0.5  # small padding
-
-    total_samples = int(SAMPLE_RATE * duration_sec)
-    samples = np.zeros(total_samples)
-
-    # For each column in the bitmap
-    for col_idx in range(text_width):
-        t_start = col_idx * col_duration
-        t_end = t_start + col_duration
-        n_start = int(t_start * SAMPLE_RATE)
-        n_end = min(int(t_end * SAMPLE_RATE), total_samples)
-
-        if n_start >= total_samples:
-            break
-
-        t = np.arange(n_end - n_start) / SAMPLE_RATE
-
-        for row_idx in range(text_height):
-            if bitmap[row_idx][col_idx]:
-                freq = freqs[row_idx]
-                # Add sine wave at this frequency
-                samples[n_start:n_end] += 0.15 * np.sin(2 * np.pi * freq * t)
-
-    # Normalize
-    max_val = np.max(np.abs(samples))
-    if max_val > 0:
-        samples = samples / max_val * 0.3  # Keep amplitude low
-    
-    print(f"[+] Generated spectrogram audio: {len(samples)} samples ({duration_sec:.1f}s)")
+    bitmap = render_bitmap(text)
+    print(f"    Bitmap size: {bitmap.shape[1]} x {bitmap.shape[0]}")
+
+    samples = synthesize_text(text, SAMPLE_RATE, duration_sec=duration_sec,
+                              **options).astype(MIX_DTYPE)
+
+    print(f"[+] Generated spectrogram audio: {len(samples)} samples ({len(samples) / SAMPLE_RATE:.1f}s)")
     return samples
 
 
@@ -436,6 +288,8 @@ def generate_spectrogram_audio(text, duration_sec=None):
 # ─────────────────────────────────────────────
 def embed_in_png(png_data, embedded_data, marker=b"WAV_EMBED"):
     """Append data after the PNG IEND chunk so binwalk can find it."""
+    from carver import carve_layers, LayoutError
+
     # Find the IEND chunk
     iend_pos = png_data.rfind(b'IEND')
     if iend_pos < 0:
@@ -449,6 +303,10 @@ def embed_in_png(png_data, embedded_data, marker=b"WAV_EMBED"):
 
     # The embedded data is a valid WAV, so binwalk will find the RIFF header
     result = png_data[:iend_end] + embedded_data
+    layers = carve_layers(result)
+    if len(layers) < 2 or layers[0]["kind"] != "png" or layers[1]["offset"] != iend_end:
+        raise LayoutError(f"embedded data not carved at {iend_end}: "
+                          f"{[(layer['kind'], layer['offset']) for layer in layers]}")
     return result
 
 
@@ -483,165 +341,328 @@ Handle with extreme caution.
 
 
 # ─────────────────────────────────────────────
-# Step 7: Mix Spectrogram into MP3 Audio
+# Step 7: Mix Spectrogram into MP3 Audio (streamed)
 # ─────────────────────────────────────────────
-def mix_spectrogram_into_mp3(mp3_path, spec_samples, output_wav_path):
-    """
-    Convert MP3 to WAV, mix in spectrogram tones, save as WAV.
-    The final step converts back to MP3 via ffmpeg.
+def _mixed_chunk(audio, spec_samples, offset, start, stop, dtype=MIX_DTYPE):
+    """Return audio[start:stop] in [-1, 1] with the overlapping spectrogram added."""
+    import numpy as np
+
+    dtype = np.dtype(dtype).type
+    chunk = audio[start:stop].astype(dtype)
+    chunk /= dtype(32768.0)
+    lo, hi = max(start, offset), min(stop, offset + len(spec_samples))
+    if lo < hi:
+        chunk[lo - start:hi - start] += spec_samples[lo - offset:hi - offset]
+    return chunk
+
+
+def mix_spectrogram_into_mp3(mp3_path, spec_samples, chunk_samples=CHUNK_SAMPLES, audio=None,
+                             dtype=MIX_DTYPE, low_memory=False):
     """
-    import subprocess
-
-    # Convert MP3 to WAV
-    temp_wav = output_wav_path + ".temp.wav"
-    print(f"[*] Converting MP3 to WAV...")
-    subprocess.run([
-        'ffmpeg', '-y', '-i', mp3_path,
-        '-ar', str(SAMPLE_RATE), '-ac', '1', '-f', 'wav', temp_wav
-    ], capture_output=True, check=True)
-
-    # Read the WAV
-    with wave.open(temp_wav, 'rb') as wf:
-        n_channels = wf.getnchannels()
-        sampwidth = wf.getsampwidth()
-        framerate = wf.getframerate()
-        n_frames = wf.getnframes()
-        audio_data = wf.readframes(n_frames)
-
-    # Convert to numpy
-    if sampwidth == 2:
-        audio = np.frombuffer(audio_data, dtype=np.int16).astype(np.float64)
-    else:
-        raise ValueError(f"Unexpected sample width: {sampwidth}")
+    Decode the MP3, mix in spectrogram tones and re-encode to MP3.
 
-    audio = audio / 32768.0  # normalize to [-1, 1]
+    Everything goes through ffmpeg pipes (no temp WAV files). Mixing runs
+    in fixed-size chunks of `dtype` samples: one pass finds the peak, a
+    second pass scales, converts to 16-bit and streams each chunk into the
+    encoder. `audio` may be an already decoded int16 PCM array (or memmap)
+    of mp3_path, which skips the decode (bulk builds share one decode).
 
-    # Pad or trim spectrogram to match audio length
+    low_memory decodes the source into a temporary int16 file that is
+    memory-mapped instead of held in the heap, so peak RSS depends on
+    chunk_samples rather than on the track length. Returns the MP3 bytes.
+    """
+    from audio_io import decode_pcm, decode_to_file
+
+    if audio is not None:
+        return _mix_and_encode(audio, spec_samples, chunk_samples, dtype)
+    if not low_memory:
+        print(f"[*] Decoding MP3 via ffmpeg pipe...")
+        return _mix_and_encode(decode_pcm(mp3_path, SAMPLE_RATE), spec_samples,
+                               chunk_samples, dtype)
+    with tempfile.TemporaryDirectory(prefix="snap_pcm_") as tmp:
+        print(f"[*] Decoding MP3 via ffmpeg pipe into a memory-mapped PCM file...")
+        audio = decode_to_file(mp3_path, os.path.join(tmp, "source.pcm"), SAMPLE_RATE,
+                               chunk_samples=chunk_samples)
+        try:
+            return _mix_and_encode(audio, spec_samples, chunk_samples, dtype)
+        finally:
+            del audio
+
+
+def _mix_and_encode(audio, spec_samples, chunk_samples, dtype):
+    """Two-pass chunked peak scan + normalize/encode of audio with spectrogram mixed in."""
+    import numpy as np
+    from audio_io import Mp3Encoder, release_pages
+
+    dtype = np.dtype(dtype).type
+    # Trim spectrogram to the audio length, or place it in the middle
     if len(spec_samples) > len(audio):
         spec_samples = spec_samples[:len(audio)]
+        offset = 0
     else:
-        padded = np.zeros(len(audio))
-        # Place spectrogram in the middle of the audio
         offset = (len(audio) - len(spec_samples)) // 2
-        padded[offset:offset + len(spec_samples)] = spec_samples
-        spec_samples = padded
 
-    # Mix
-    mixed = audio + spec_samples
+    bounds = [(i, min(i + chunk_samples, len(audio))) for i in range(0, len(audio), chunk_samples)]
 
-    # Normalize
-    mixed = mixed / np.max(np.abs(mixed)) * 0.95
+    # Pass 1: peak of the mix
+    peak = 0.0
+    for start, stop in bounds:
+        chunk = _mixed_chunk(audio, spec_samples, offset, start, stop, dtype)
+        peak = max(peak, float(np.max(np.abs(chunk))))
+        release_pages(audio)
+    scale = dtype(0.95 / peak * 32767 if peak > 0 else 0.0)
 
-    # Convert to 16-bit
-    pcm = (mixed * 32767).astype(np.int16)
+    # Pass 2: normalize, convert to 16-bit and stream into the encoder
+    print(f"[*] Encoding mixed audio to MP3 via ffmpeg pipe...")
+    with Mp3Encoder(SAMPLE_RATE, bitrate=MP3_BITRATE) as encoder:
+        for start, stop in bounds:
+            chunk = _mixed_chunk(audio, spec_samples, offset, start, stop, dtype)
+            chunk *= scale
+            encoder.write(chunk.astype(np.int16))
+            release_pages(audio)
 
-    # Write mixed WAV
-    with wave.open(output_wav_path, 'wb') as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(SAMPLE_RATE)
-        wf.writeframes(pcm.tobytes())
-
-    # Clean up
-    os.remove(temp_wav)
-    print(f"[+] Mixed spectrogram into audio: {output_wav_path}")
+    print(f"[+] Mixed spectrogram into audio: {len(encoder.data)} bytes MP3")
+    return encoder.data
 
 
 # ─────────────────────────────────────────────
 # Step 8: Assemble Final Challenge
 # ─────────────────────────────────────────────
-def assemble_challenge():
+def build_png_layer(lsb_payload, width=800, height=600, base_image=None,
+                    png_profile=PNG_PROFILE):
+    """
+    Render the gauntlet, embed the LSB payload and encode the PNG with metadata.
+    `base_image` may be a pre-rendered gauntlet (PIL image or array) to reuse.
+    `png_profile` selects the encoder speed/size trade-off (png_encoder.PROFILES).
+    """
+    import numpy as np
+    from PIL import Image
+    from lsb_engine import verify_round_trip
+    from png_encoder import encode_png
+
+    if base_image is None:
+        img = generate_gauntlet_image(width, height)
+    elif isinstance(base_image, np.ndarray):
+        img = Image.fromarray(base_image, 'RGB')
+    else:
+        img = base_image
+    img = encode_lsb_red_channel(img, lsb_payload)
+
+    # Add text metadata (EXIF-like) as PNG tEXt chunks
+    png_data = encode_png(img, PNG_METADATA, png_profile)
+    # Read the payload back through the encoded PNG, not the in-memory image
+    verify_round_trip(Image.open(io.BytesIO(png_data)), lsb_payload, channels="R", depth=1)
+    print(f"[+] LSB payload round-trip verified")
+    print(f"[+] PNG with LSB + metadata ({png_profile}): {len(png_data)} bytes")
+    return png_data
+
+
+def write_challenge_file(path, mp3_data, png_data, wav_data, mission_log_data,
+                         index_path=None):
+    """
+    Stream the layers into the final challenge file. Returns its size.
+
+    Each layer may be bytes or a file path (copied with sendfile). The WAV is
+    deflated into a ZIP (binwalk v3 detects ZIP reliably, but not raw
+    RIFF/WAV) directly inside the output. Layer offsets go to a sidecar
+    <path without extension>.layers.json unless index_path is given (''
+    disables it).
+
+    The written file is carved back (carver.py) and must split into exactly
+    these layers at these offsets, or LayoutError is raised.
+    """
+    from carver import check_layout, index_file
+
+    index = assemble(path, [
+        Layer("mp3", mp3_data),
+        Layer("png", png_data),
+        Layer("wav_zip", wav_data, kind="zip", member="quantum_signal.wav"),
+        Layer("mission_log", mission_log_data),
+    ], index_path=index_path)
+    for entry in index:
+        print(f"    {entry['name']:<12} @ {entry['offset']:>9}  {entry['size']:>9} bytes")
+    carved = index_file(path)
+    check_layout(carved["layers"], ("mp3", "png", "zip", "text"),
+                 [entry["offset"] for entry in index])
+    print(f"[+] Layout carved in {carved['seconds'] * 1000:.1f} ms: "
+          f"{' | '.join(layer['kind'] for layer in carved['layers'])}")
+    return sum(entry["size"] for entry in index)
+
+
+def render_qa_images(mp3_data, wav_data, out_dir, prefix=""):
+    """
+    Render the QA spectrograms of the audio layers into out_dir: the
+    spectrogram text band of the MP3 and the morse band of the WAV.
+    Returns the render_qa() info dicts.
+    """
+    from spectrogram_qa import render_qa
+
+    os.makedirs(out_dir, exist_ok=True)
+    return [render_qa(mp3_data, os.path.join(out_dir, f"{prefix}spectrogram_mp3.png"),
+                      "spectrogram", SAMPLE_RATE),
+            render_qa(wav_data, os.path.join(out_dir, f"{prefix}morse_wav.png"),
+                      "morse", SAMPLE_RATE)]
+
+
+def _sources(*names):
+    """Source files whose contents are part of a stage's cache key."""
+    return [os.path.abspath(__file__)] + [os.path.join(BASE_DIR, n) for n in names]
+
+
+def _cached_stage(cache, stage, inputs, build, kind="bytes", code=(), *deps):
+    """
+    Stage-graph entry point: build (or load) one cached stage output.
+
+    `build` is called with the values of any dependency results, and those
+    values are hashed into the cache key. Returns (value, cache_status,
+    span_records) so the parent process can merge cache stats and spans.
+    """
+    values = [value for value, _, _ in deps]
+    if values:
+        inputs = {"inputs": inputs, "deps": values}
+    tracer = Tracer(stage)
+    with tracer.span(stage, bytes_in=sum(nbytes(v) or 0 for v in values) or None) as span:
+        value, status = cache.fetch(stage, inputs, partial(build, *values), kind, code)
+        span.bytes_out = nbytes(value)
+        span.args["cache"] = status
+    return value, status, tracer.records
+
+
+def source_pcm_path(cache, source_digest=None):
+    """
+    Decode INPUT_MP3 once into the stage cache as raw int16 PCM, keyed by the
+    source file's hash and sample rate. Returns (path, status); map the file
+    with audio_io.map_pcm so every build and worker shares one page-cache copy.
+    """
+    from audio_io import decode_to_file
+
+    if source_digest is None:
+        source_digest = file_digest(INPUT_MP3)
+    return cache.fetch_path(
+        "source_pcm", {"source": source_digest, "sr": SAMPLE_RATE, "channels": 1},
+        partial(decode_to_file, INPUT_MP3, sample_rate=SAMPLE_RATE),
+        kind="pcm", code=[os.path.join(BASE_DIR, "audio_io.py")])
+
+
+def _source_pcm_stage(cache, source_digest):
+    """Stage-graph entry point for source_pcm_path (path is None without a cache)."""
+    tracer = Tracer("source_pcm")
+    with tracer.span("source_pcm", bytes_in=os.path.getsize(INPUT_MP3)) as span:
+        if cache.enabled:
+            path, status = source_pcm_path(cache, source_digest)
+            span.bytes_out = os.path.getsize(path)
+        else:
+            path, status = None, 'off'
+        span.args["cache"] = status
+    return path, status, tracer.records
+
+
+def mix_from_source_pcm(pcm_path, spec_samples, low_memory=False):
+    """Mix from the mapped source PCM file, or decode INPUT_MP3 if there is none."""
+    from audio_io import map_pcm
+
+    audio = map_pcm(pcm_path) if pcm_path else None
+    return mix_spectrogram_into_mp3(INPUT_MP3, spec_samples, audio=audio, low_memory=low_memory)
+
+
+def declare_stages(cache, lsb_payload, source_digest, low_memory=False, png_profile=PNG_PROFILE):
+    """Declare the build as a stage graph (see stage_graph.run_stages)."""
+    def cached(stage, inputs, build, kind="bytes", code=()):
+        return partial(_cached_stage, cache, stage, inputs, build, kind, code)
+
+    return [
+        # Steps 1-3: PNG image, LSB payload, tEXt metadata
+        Stage("png", cached(
+            "png", {"size": (800, 600), "payload": lsb_payload, "meta": PNG_METADATA,
+                    "profile": png_profile},
+            partial(build_png_layer, lsb_payload, 800, 600, png_profile=png_profile),
+            code=_sources("gauntlet_render.py", "lsb_engine.py", "png_encoder.py"))),
+        # Step 4: Morse WAV (zipped while streaming the final file)
+        Stage("morse_wav", cached(
+            "morse_wav", {"decoy": MORSE_DECOY_TEXT, "real": FLAG_PART3, "sr": SAMPLE_RATE,
+                          "wpm": (MORSE_WPM_DECOY, MORSE_WPM_REAL),
+                          "freq": (MORSE_FREQ_DECOY, MORSE_FREQ_REAL)},
+            generate_morse_wav, code=_sources("morse_synth.py"))),
+        # Steps 5-6: Spectrogram audio, mixed into the (cached, mapped) source
+        # PCM and encoded through ffmpeg pipes
+        Stage("source_pcm", partial(_source_pcm_stage, cache, source_digest),
+              executor='thread'),
+        Stage("spectrogram", cached(
+            "spectrogram", {"text": FLAG_PART1, "sr": SAMPLE_RATE},
+            partial(generate_spectrogram_audio, FLAG_PART1),
+            kind="array", code=_sources("spectro_synth.py"))),
+        Stage("mixed_mp3", cached(
+            "mixed_mp3", {"source": source_digest, "bitrate": MP3_BITRATE},
+            partial(mix_from_source_pcm, low_memory=low_memory),
+            code=_sources("audio_io.py")),
+            deps=("source_pcm", "spectrogram"), executor='thread'),
+    ]
+
+
+def assemble_challenge(use_cache=True, cache_dir=CACHE_DIR, cache_max_mb=CACHE_MAX_MB,
+                       jobs=None, verify=True, trace_dir=TRACE_DIR, low_memory=False,
+                       png_profile=PNG_PROFILE, qa=True):
     """Main build function — assembles all layers into the final challenge file."""
     os.makedirs(OUTPUT_DIR, exist_ok=True)
+    cache = StageCache(cache_dir, cache_max_mb * 1024 * 1024, enabled=use_cache)
+    tracer = Tracer("the_snap")
 
     print("=" * 60)
     print("  Building 'The Snap' CTF Challenge")
     print("=" * 60)
     print()
 
-    # ── Step 1: Generate PNG image ──
-    img = generate_gauntlet_image(800, 600)
-
-    # ── Step 2: Build LSB payload and encode ──
-    lsb_payload = build_lsb_payload()
-    img = encode_lsb_red_channel(img, lsb_payload)
-
-    # ── Step 3: Save PNG with EXIF false flag ──
-    png_buffer = io.BytesIO()
-    # Add text metadata (EXIF-like) as PNG tEXt chunk
-    meta = PngImagePlugin.PngInfo()
-    meta.add_text("Comment", FALSE_FLAG_EXIF)
-    meta.add_text("Author", "S.H.I.E.L.D. Quantum Division")
-    meta.add_text("Description", "Gauntlet energy signature scan - classified")
-    img.save(png_buffer, format='PNG', pnginfo=meta)
-    png_data = png_buffer.getvalue()
-    print(f"[+] PNG with LSB + metadata: {len(png_data)} bytes")
-
-    # ── Step 4: Generate Morse WAV ──
-    wav_data = generate_morse_wav()
-
-    # Save standalone WAV for testing
-    wav_test_path = os.path.join(OUTPUT_DIR, "morse_signal_test.wav")
-    with open(wav_test_path, 'wb') as f:
-        f.write(wav_data)
-
-    # Save clean PNG (for testing)
-    png_test_path = os.path.join(OUTPUT_DIR, "gauntlet.png")
-    with open(png_test_path, 'wb') as f:
-        f.write(png_data)
-
-    # ── Step 5: Generate spectrogram audio ──
-    spec_samples = generate_spectrogram_audio(FLAG_PART1)
-
-    # ── Step 6: Mix spectrogram into MP3 ──
-    mixed_wav_path = os.path.join(OUTPUT_DIR, "mixed_audio.wav")
-    mix_spectrogram_into_mp3(INPUT_MP3, spec_samples, mixed_wav_path)
-
-    # ── Step 7: Convert mixed WAV back to MP3 ──
-    import subprocess
-    mixed_mp3_path = os.path.join(OUTPUT_DIR, "mixed_audio.mp3")
-    print(f"[*] Converting mixed audio to MP3...")
-    subprocess.run([
-        'ffmpeg', '-y', '-i', mixed_wav_path,
-        '-codec:a', 'libmp3lame', '-b:a', '128k',
-        mixed_mp3_path
-    ], capture_output=True, check=True)
-
-    # ── Step 8: Build mission_log.txt ──
-    mission_log_data = build_mission_log()
-
-    # Save for testing
-    with open(os.path.join(OUTPUT_DIR, "mission_log.txt"), 'wb') as f:
-        f.write(mission_log_data)
-
-    # ── Step 9: Assemble final file ──
+    # Independent layers run in parallel; ffmpeg overlaps the NumPy stages
+    build_start = time.time()
+    with tracer.span("lsb_payload") as span:
+        lsb_payload = build_lsb_payload()
+        span.bytes_out = len(lsb_payload)
+    with tracer.span("source_digest") as span:
+        source_digest = file_digest(INPUT_MP3)
+        span.bytes_in = os.path.getsize(INPUT_MP3)
+    stages = declare_stages(cache, lsb_payload, source_digest, low_memory, png_profile)
+    with tracer.span("stages", jobs=jobs):
+        results, timings = run_stages(stages, max_workers=jobs)
+        for name, (_, status, records) in results.items():
+            cache.stats.append((name, status))
+            tracer.merge(records, executor=timings[name].executor)
+    png_data = results["png"][0]
+    wav_data = results["morse_wav"][0]
+    mp3_data = results["mixed_mp3"][0]
+
+    with tracer.span("test_outputs", bytes_in=len(wav_data) + len(png_data) + len(mp3_data)):
+        # Standalone WAV and clean PNG for testing, plus the mixed MP3 so
+        # single-layer rebuilds (see the subcommands) can reassemble
+        wav_test_path = _write(WAV_FILE, wav_data)
+        png_test_path = _write(PNG_FILE, png_data)
+        _write(MIXED_MP3_FILE, mp3_data)
+
+    # ── Step 7: Build mission_log.txt ──
+    with tracer.span("mission_log") as span:
+        mission_log_data = build_mission_log()
+        span.bytes_out = len(mission_log_data)
+        _write(MISSION_LOG_FILE, mission_log_data)     # Save for testing
+
+    # ── Step 8: Assemble final file ──
     # Architecture: MP3 + PNG + ZIP(WAV) + TXT all concatenated at top level.
     # binwalk v3 detects PNG and ZIP natively.
     # The ZIP contains the morse WAV, requiring an extra extraction step.
     print(f"[*] Assembling final challenge file...")
-    with open(mixed_mp3_path, 'rb') as f:
-        mp3_data = f.read()
-
-    # Wrap WAV in a ZIP archive (binwalk v3 detects ZIP reliably, but not raw RIFF/WAV)
-    import zipfile
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("quantum_signal.wav", wav_data)
-    zip_data = zip_buffer.getvalue()
-    print(f"[+] WAV wrapped in ZIP: {len(zip_data)} bytes")
 
     # Build final file: MP3 data + PNG + ZIP(WAV) + mission_log.txt
-    # All separate — binwalk finds each independently
-    final_data = mp3_data + png_data + zip_data + mission_log_data
-
-    with open(FINAL_FILE, 'wb') as f:
-        f.write(final_data)
+    # All separate — binwalk finds each independently. The PNG and WAV are
+    # copied from the test files just written; nothing is concatenated in memory.
+    with tracer.span("assemble", bytes_in=len(mp3_data) + len(png_data) + len(wav_data)
+                     + len(mission_log_data)) as span:
+        final_size = write_challenge_file(FINAL_FILE, mp3_data, png_test_path, wav_test_path,
+                                          mission_log_data)
+        span.bytes_out = final_size
 
     print()
     print("=" * 60)
     print(f"[✓] Challenge built successfully!")
     print(f"    Output: {FINAL_FILE}")
-    print(f"    Size: {len(final_data)} bytes ({len(final_data)/1024:.1f} KB)")
+    print(f"    Size: {final_size} bytes ({final_size/1024:.1f} KB)")
     print("=" * 60)
     print()
     print("Solve path summary:")
@@ -655,14 +676,203 @@ def assemble_challenge():
     print(f"     800 Hz morse -> 'ENDGAME' (DECOY)")
     print(f"     6000 Hz morse -> hex -> '{FLAG_PART3}'")
     print(f"  FULL FLAG: MYTHIX{{I_4m_Ir0n_M4n_6000}}")
+    print()
+    print("Stage timings (* = critical path):")
+    print(format_report(stages, timings, wall=time.time() - build_start))
+    print()
+    print(cache.summary())
+
+    if verify:
+        # verifier imports this module, so import it only when needed
+        from verifier import format_results, passed, verify_file
+        print()
+        print("Solve-path verification:")
+        with tracer.span("verify", bytes_in=final_size):
+            results = verify_file(FINAL_FILE)
+        print(format_results(results))
+        if not passed(results):
+            raise RuntimeError(f"{FINAL_FILE} failed solve-path verification")
+
+    if qa:
+        print()
+        print("QA spectrograms:")
+        with tracer.span("qa", bytes_in=len(mp3_data) + len(wav_data)):
+            for info in render_qa_images(mp3_data, wav_data, QA_DIR):
+                print(f"    {os.path.relpath(info['path'], BASE_DIR):<40} "
+                      f"{info['band'][0]:>6.0f}-{info['band'][1]:.0f} Hz  "
+                      f"{info['render_s'] * 1000:6.1f} ms")
 
-    # Clean up intermediate files
-    os.remove(mixed_wav_path)
-    os.remove(mixed_mp3_path)
-    print("\n[*] Cleaned up intermediate files.")
+    print()
+    print("Build trace:")
+    print(tracer.summary())
+    if trace_dir:
+        trace_path = tracer.write_trace(os.path.join(trace_dir, "last_build.json"))
+        tracer.append_history(os.path.join(trace_dir, "history.jsonl"),
+                              cache=use_cache, jobs=jobs)
+        print(f"[*] Trace events: {trace_path} (history: {trace_dir}/history.jsonl)")
 
     return FINAL_FILE
 
 
+# ─────────────────────────────────────────────
+# Layer-selective commands
+# ─────────────────────────────────────────────
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def build_layer(name, use_cache=True, cache_dir=CACHE_DIR, cache_max_mb=CACHE_MAX_MB,
+                low_memory=False, png_profile=PNG_PROFILE):
+    """
+    Run one declared stage (and the stages it depends on) inline, through
+    the stage cache, and return its value. Nothing else is built or imported.
+    """
+    cache = StageCache(cache_dir, cache_max_mb * 1024 * 1024, enabled=use_cache)
+    declared = {s.name: s for s in declare_stages(cache, None, None)}
+    needed, todo = set(), [name]
+    while todo:
+        stage = declared[todo.pop()]
+        needed.add(stage.name)
+        todo.extend(stage.deps)
+    lsb_payload = build_lsb_payload() if "png" in needed else None
+    source_digest = file_digest(INPUT_MP3) if "source_pcm" in needed else None
+    stages = [s for s in declare_stages(cache, lsb_payload, source_digest, low_memory, png_profile)
+              if s.name in needed]
+    results, _ = run_stages(stages, max_workers=1)
+    for stage_name, (_, status, _) in results.items():
+        cache.stats.append((stage_name, status))
+    print(cache.summary())
+    return results[name][0]
+
+
+def _stage_options(args):
+    return {"use_cache": not args.no_cache, "cache_dir": args.cache_dir,
+            "cache_max_mb": args.cache_max_mb,
+            "low_memory": getattr(args, 'low_memory', False),
+            "png_profile": getattr(args, 'png_profile', None) or PNG_PROFILE}
+
+
+def cmd_lsb(args):
+    _write(LSB_PAYLOAD_FILE, build_lsb_payload())
+    print(f"[+] Wrote {LSB_PAYLOAD_FILE}")
+
+
+def cmd_image(args):
+    _write(PNG_FILE, build_layer("png", **_stage_options(args)))
+    print(f"[+] Wrote {PNG_FILE}")
+
+
+def cmd_morse(args):
+    _write(WAV_FILE, build_layer("morse_wav", **_stage_options(args)))
+    print(f"[+] Wrote {WAV_FILE}")
+
+
+def cmd_spectrogram(args):
+    _write(MIXED_MP3_FILE, build_layer("mixed_mp3", **_stage_options(args)))
+    print(f"[+] Wrote {MIXED_MP3_FILE}")
+
+
+def cmd_assemble(args):
+    """Assemble the_snap.mp3 from the intermediate files, building any that are missing."""
+    for path, build in ((PNG_FILE, cmd_image), (WAV_FILE, cmd_morse),
+                        (MIXED_MP3_FILE, cmd_spectrogram)):
+        if not os.path.exists(path):
+            print(f"[*] {os.path.relpath(path, BASE_DIR)} missing, building it")
+            build(args)
+    mission_log_data = build_mission_log()
+    _write(MISSION_LOG_FILE, mission_log_data)
+    print(f"[*] Assembling final challenge file...")
+    size = write_challenge_file(FINAL_FILE, MIXED_MP3_FILE, PNG_FILE, WAV_FILE, mission_log_data)
+    print(f"[+] Wrote {FINAL_FILE} ({size} bytes)")
+
+
+def cmd_verify(args):
+    from verifier import format_results, passed, verify_file
+
+    results = verify_file(args.file)
+    print(format_results(results))
+    if not passed(results):
+        sys.exit(1)
+
+
+def cmd_build(args):
+    assemble_challenge(use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                       cache_max_mb=args.cache_max_mb, jobs=args.jobs,
+                       verify=not args.no_verify, trace_dir=args.trace_dir,
+                       low_memory=args.low_memory, png_profile=args.png_profile or PNG_PROFILE,
+                       qa=not args.no_qa)
+
+
+COMMANDS = {
+    "build": (cmd_build, "build every layer and assemble (default)"),
+    "lsb": (cmd_lsb, f"write the LSB payload to {os.path.relpath(LSB_PAYLOAD_FILE, BASE_DIR)}"),
+    "image": (cmd_image, f"build {os.path.relpath(PNG_FILE, BASE_DIR)} (gauntlet + LSB + tEXt)"),
+    "morse": (cmd_morse, f"build {os.path.relpath(WAV_FILE, BASE_DIR)}"),
+    "spectrogram": (cmd_spectrogram, f"mix the spectrogram text into "
+                                     f"{os.path.relpath(MIXED_MP3_FILE, BASE_DIR)}"),
+    "assemble": (cmd_assemble, "assemble the_snap.mp3 from the intermediate files"),
+    "verify": (cmd_verify, "solve the_snap.mp3 with verifier.py"),
+}
+
+
+def parse_args(argv=None):
+    import argparse
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0].startswith('-') and argv[0] not in ('-h', '--help')):
+        argv = ["build"] + argv         # flags only: the full build, as before subcommands
+
+    cache_opts = argparse.ArgumentParser(add_help=False)
+    cache_opts.add_argument('--no-cache', action='store_true',
+                            help="rebuild every stage and do not read or write the stage cache")
+    cache_opts.add_argument('--cache-dir', default=CACHE_DIR,
+                            help=f"stage cache directory (default: {CACHE_DIR})")
+    cache_opts.add_argument('--cache-max-mb', type=int, default=CACHE_MAX_MB,
+                            help=f"evict least-recently-used entries above this size (default: {CACHE_MAX_MB})")
+    png_opts = argparse.ArgumentParser(add_help=False)
+    png_opts.add_argument('--png-profile', default=None,
+                          help=f"gauntlet.png encoder speed/size profile: pillow, fast, balanced "
+                               f"or small (default: {PNG_PROFILE})")
+    mix_opts = argparse.ArgumentParser(add_help=False)
+    mix_opts.add_argument('--low-memory', action='store_true',
+                          help="decode the source MP3 into a memory-mapped temp file instead of RAM")
+
+    parser = argparse.ArgumentParser(description="Build 'The Snap' CTF challenge")
+    sub = parser.add_subparsers(dest='command', metavar='command')
+    parents = {"build": [cache_opts, png_opts, mix_opts], "lsb": [],
+               "image": [cache_opts, png_opts], "morse": [cache_opts],
+               "spectrogram": [cache_opts, mix_opts],
+               "assemble": [cache_opts, png_opts, mix_opts], "verify": []}
+    commands = {name: sub.add_parser(name, parents=parents[name], help=help_text)
+                for name, (_, help_text) in COMMANDS.items()}
+
+    build = commands["build"]
+    build.add_argument('-j', '--jobs', type=int, default=None,
+                       help="worker processes for CPU stages (default: CPU count; 1 = run serially)")
+    build.add_argument('--no-verify', action='store_true',
+                       help="skip solving the built file with verifier.py")
+    build.add_argument('--trace-dir', default=TRACE_DIR,
+                       help=f"where to write trace events and run history (default: {TRACE_DIR}; '' disables)")
+    build.add_argument('--no-qa', action='store_true',
+                       help=f"skip rendering QA spectrograms into {QA_DIR}")
+    commands["verify"].add_argument('file', nargs='?', default=FINAL_FILE,
+                                    help=f"challenge file (default: {FINAL_FILE})")
+
+    args = parser.parse_args(argv)
+    if getattr(args, 'png_profile', None):
+        from png_encoder import PROFILES
+        if args.png_profile not in PROFILES:
+            parser.error(f"unknown --png-profile '{args.png_profile}' "
+                         f"(choose from {', '.join(PROFILES)})")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    COMMANDS[args.command][0](args)
+
+
 if __name__ == '__main__':
-    assemble_challenge()
+    main()
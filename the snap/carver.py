@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+In-process signature carver for polyglot outputs (the_snap.mp3).
+
+The file is memory-mapped and every structural signature is found in one
+pass. The buffer is read in cache-sized blocks as two little-endian uint16
+views (even and odd offsets). Each view is compared against the distinct
+2-byte signature prefixes with NumPy. Only the rare prefix hits are checked
+against the full signatures in Python. MPEG frame sync is too common a bit
+pattern to scan for, so the MP3 layer is found by walking its frame chain
+instead. The hits are then turned into a layer index:
+
+  mp3   ID3v2 tag (if any) + the contiguous chain of MPEG audio frames from
+        offset 0 (frame-sync headers validated and walked one by one)
+  png   PNG signature through IEND + CRC
+  zip   first local header through the end-of-central-directory record
+  riff  RIFF/WAVE header + its declared size
+  text  printable trailer; anything else unclaimed is 'unknown'
+
+This is what binwalk has to see for the challenge to be solvable, so the
+build checks its own output with it instead of running binwalk.
+
+Usage:
+  python3 carver.py [file ...]        # print the layer index as JSON
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+SIGNATURES = {
+    "png": b'\x89PNG\r\n\x1a\n',
+    "iend": b'IEND\xaeB`\x82',
+    "zip_local": b'PK\x03\x04',
+    "zip_central": b'PK\x01\x02',
+    "zip_end": b'PK\x05\x06',
+    "riff": b'RIFF',
+}
+_PREFIXES = sorted({int.from_bytes(sig[:2], 'little') for sig in SIGNATURES.values()})
+SCAN_BLOCK = 1 << 18       # bytes per block: the compares stay in L2 cache
+
+# MPEG audio frame header tables (version -> bitrates kbps / sample rates)
+_BITRATES = {
+    (3, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),     # MPEG1 L3
+    (3, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),    # MPEG1 L2
+    (3, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448), # MPEG1 L1
+    (2, 1): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),        # MPEG2 L3
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+}
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+MIN_MP3_FRAMES = 2
+
+
+class LayoutError(Exception):
+    """The carved layers do not match the expected layout."""
+
+
+@contextmanager
+def mapped(path):
+    """Read-only mmap of a file (an empty bytes object for empty files)."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def scan(buf, block_size=SCAN_BLOCK):
+    """One pass over `buf`: {kind: [offsets]} for every signature in SIGNATURES."""
+    hits = {kind: [] for kind in SIGNATURES}
+    size = len(buf)
+    for start in range(0, size, block_size):
+        stop = min(start + block_size, size)
+        for align in (0, 1):
+            count = (min(stop + 1, size) - start - align) // 2
+            if count <= 0:
+                continue
+            view = np.frombuffer(buf, '<u2', count=count, offset=start + align)
+            mask = view == _PREFIXES[0]
+            for prefix in _PREFIXES[1:]:
+                mask |= view == prefix
+            if not mask.any():
+                continue
+            for i in np.flatnonzero(mask).tolist():
+                pos = start + align + 2 * i
+                if pos >= stop:
+                    continue
+                for kind, sig in SIGNATURES.items():
+                    if buf[pos:pos + len(sig)] == sig:
+                        hits[kind].append(pos)
+    for offsets in hits.values():
+        offsets.sort()
+    return hits
+
+
+# ─────────────────────────────────────────────
+# MP3 frame chain
+# ─────────────────────────────────────────────
+def _frame_length(header):
+    """Byte length of the MPEG audio frame with this 32-bit header, or 0 if invalid."""
+    if header >> 21 != 0x7FF:
+        return 0
+    version = (header >> 19) & 3          # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+    layer = (header >> 17) & 3            # 1 = III, 2 = II, 3 = I
+    rate_idx = (header >> 12) & 0xF
+    sr_idx = (header >> 10) & 3
+    if version == 1 or layer == 0 or rate_idx in (0, 15) or sr_idx == 3:
+        return 0
+    bitrate = _BITRATES[(3 if version == 3 else 2, layer)][rate_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version][sr_idx]
+    padding = (header >> 9) & 1
+    if layer == 3:
+        return (12 * bitrate // sample_rate + padding) * 4
+    per_frame = 144 if (layer == 2 or version == 3) else 72
+    return per_frame * bitrate // sample_rate + padding
+
+
+def mp3_extent(buf, start=0, limit=None):
+    """(end, n_frames) of the contiguous MP3 frame chain at `start` (after any ID3v2 tag)."""
+    limit = len(buf) if limit is None else limit
+    pos = start
+    if buf[pos:pos + 3] == b'ID3' and pos + 10 <= limit:
+        size = buf[pos + 6:pos + 10]
+        pos += 10 + ((size[0] << 21) | (size[1] << 14) | (size[2] << 7) | size[3])
+    frames = 0
+    unpack = struct.Struct('>I').unpack_from
+    while pos + 4 <= limit:
+        length = _frame_length(unpack(buf, pos)[0])
+        if length == 0 or pos + length > limit:
+            break
+        pos += length
+        frames += 1
+    return pos, frames
+
+
+# ─────────────────────────────────────────────
+# Layer index
+# ─────────────────────────────────────────────
+def _first_after(offsets, pos):
+    for off in offsets:
+        if off >= pos:
+            return off
+    return None
+
+
+def _is_text(data, threshold=0.95):
+    if not data:
+        return False
+    printable = sum(32 <= b < 127 or b in (9, 10, 13) for b in data)
+    return printable / len(data) >= threshold
+
+
+def carve_layers(buf):
+    """Carve `buf` (bytes, memoryview or mmap) into a list of layer dicts."""
+    hits = scan(buf)
+    size = len(buf)
+    layers = []
+    pos = 0
+
+    # The audio stream (the "host" file) starts at offset 0
+    end, frames = mp3_extent(buf, 0, _first_after(hits["png"], 0) or size)
+    if frames >= MIN_MP3_FRAMES:
+        layers.append({"kind": "mp3", "offset": 0, "size": end, "frames": frames})
+        pos = end
+
+    # Embedded layers in file order, skipping signatures inside claimed ranges
+    starts = sorted([(o, "png") for o in hits["png"]] + [(o, "zip") for o in hits["zip_local"]]
+                    + [(o, "riff") for o in hits["riff"]])
+    for offset, kind in starts:
+        if offset < pos:
+            continue
+        if kind == "png":
+            iend = _first_after(hits["iend"], offset)
+            if iend is None:
+                continue
+            layer = {"kind": "png", "offset": offset, "size": iend + 8 - offset}
+        elif kind == "zip":
+            eocd = _first_after(hits["zip_end"], offset)
+            if eocd is None or eocd + 22 > size:
+                continue
+            comment_len, = struct.unpack_from('<H', buf, eocd + 20)
+            end = eocd + 22 + comment_len
+            layer = {"kind": "zip", "offset": offset, "size": end - offset,
+                     "members": sum(offset <= o < end for o in hits["zip_local"]),
+                     "central": sum(offset <= o < end for o in hits["zip_central"])}
+        else:
+            if offset + 12 > size or buf[offset + 8:offset + 12] != b'WAVE':
+                continue
+            riff_size, = struct.unpack_from('<I', buf, offset + 4)
+            layer = {"kind": "riff", "offset": offset, "size": min(riff_size + 8, size - offset)}
+        if offset > pos:
+            layers.append({"kind": "unknown", "offset": pos, "size": offset - pos})
+        layers.append(layer)
+        pos = offset + layer["size"]
+
+    if pos < size:
+        kind = "text" if _is_text(buf[pos:pos + (1 << 16)]) else "unknown"
+        layers.append({"kind": kind, "offset": pos, "size": size - pos})
+    return layers
+
+
+def index_file(path):
+    """Memory-map `path` and return {file, size, seconds, layers}."""
+    start = time.perf_counter()
+    with mapped(path) as buf:
+        layers = carve_layers(buf)
+        size = len(buf)
+    return {"file": os.path.basename(path), "size": size,
+            "seconds": time.perf_counter() - start, "layers": layers}
+
+
+def check_layout(layers, kinds, offsets=None):
+    """
+    Raise LayoutError unless the carved layer kinds equal `kinds` (and, if
+    given, the layer offsets equal `offsets`). Returns the layers.
+    """
+    found = [layer["kind"] for layer in layers]
+    if found != list(kinds):
+        raise LayoutError(f"carved layers {found}, expected {list(kinds)}")
+    if offsets is not None:
+        got = [layer["offset"] for layer in layers]
+        if got != list(offsets):
+            raise LayoutError(f"carved offsets {got}, expected {list(offsets)}")
+    return layers
+
+
+def main(argv):
+    paths = argv or [os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "challenge_output", "the_snap.mp3")]
+    for path in paths:
+        print(json.dumps(index_file(path), indent=2))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Vectorized renderer for the "gauntlet energy" swirl image used by The Snap.
+
+The whole swirl field is computed at once on meshgrid arrays, the LSB of
+every channel is cleared across the array, and a single uint8 buffer is
+handed to Image.fromarray. Output is byte-for-byte identical to the original
+per-pixel loop (kept here as render_gauntlet_reference for parity checks).
+
+Usage:
+  python3 gauntlet_render.py                 # benchmark all presets
+  python3 gauntlet_render.py default hd      # benchmark selected presets
+"""
+
+import math
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+# ─────────────────────────────────────────────
+# Resolution presets
+# ─────────────────────────────────────────────
+PRESETS = {
+    "thumb": (320, 240),
+    "default": (800, 600),
+    "hd": (1280, 960),
+    "fhd": (1920, 1440),
+}
+
+
+def resolve_size(size):
+    """Accept a preset name or a (width, height) tuple."""
+    if isinstance(size, str):
+        if size not in PRESETS:
+            raise ValueError(f"Unknown preset '{size}' (choose from {', '.join(PRESETS)})")
+        return PRESETS[size]
+    width, height = size
+    return int(width), int(height)
+
+
+# ─────────────────────────────────────────────
+# Vectorized renderer
+# ─────────────────────────────────────────────
+def render_gauntlet_array(width=800, height=600):
+    """Return the swirl image as an (height, width, 3) uint8 array with LSBs cleared."""
+    cx, cy = width / 2, height / 2
+    dx, dy = np.meshgrid(np.arange(width, dtype=np.float64) - cx,
+                         np.arange(height, dtype=np.float64) - cy)
+    dist = np.sqrt(dx * dx + dy * dy)
+    angle = np.arctan2(dy, dx)
+
+    out = np.empty((height, width, 3), dtype=np.uint8)
+    # Purple-gold-orange galaxy swirl; trunc matches int() for these ranges
+    out[..., 0] = np.trunc(128 + 127 * np.sin(dist * 0.03 + angle * 3))
+    out[..., 1] = np.trunc(80 + 80 * np.sin(dist * 0.025 - angle * 2 + 1.5))
+    out[..., 2] = np.trunc(140 + 115 * np.sin(dist * 0.02 + angle * 4 + 3.0))
+
+    # Ensure even values for LSB embedding later (clear LSB)
+    out &= 0xFE
+    return out
+
+
+def render_gauntlet(size="default"):
+    """Render the swirl image for a preset name or (width, height) tuple."""
+    width, height = resolve_size(size)
+    return Image.fromarray(render_gauntlet_array(width, height), 'RGB')
+
+
+# ─────────────────────────────────────────────
+# Reference per-pixel renderer (parity only)
+# ─────────────────────────────────────────────
+def render_gauntlet_reference(width=800, height=600):
+    """Original per-pixel implementation, kept to check the vectorized output."""
+    img = Image.new('RGB', (width, height))
+    pixels = img.load()
+
+    for y in range(height):
+        for x in range(width):
+            cx, cy = width / 2, height / 2
+            dx, dy = x - cx, y - cy
+            dist = math.sqrt(dx * dx + dy * dy)
+            angle = math.atan2(dy, dx)
+
+            r = int(128 + 127 * math.sin(dist * 0.03 + angle * 3))
+            g = int(80 + 80 * math.sin(dist * 0.025 - angle * 2 + 1.5))
+            b = int(140 + 115 * math.sin(dist * 0.02 + angle * 4 + 3.0))
+
+            pixels[x, y] = (r & 0xFE, g & 0xFE, b & 0xFE)
+
+    return img
+
+
+# ─────────────────────────────────────────────
+# Benchmark
+# ─────────────────────────────────────────────
+def benchmark(presets=None, repeats=3, check_parity=True):
+    """Time the vectorized renderer per preset and compare against the reference."""
+    results = []
+    for name in presets or PRESETS:
+        width, height = resolve_size(name)
+
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            img = render_gauntlet((width, height))
+            best = min(best, time.perf_counter() - start)
+
+        row = {"preset": name, "size": (width, height), "vectorized_s": best}
+        if check_parity:
+            start = time.perf_counter()
+            ref = render_gauntlet_reference(width, height)
+            row["reference_s"] = time.perf_counter() - start
+            row["identical"] = ref.tobytes() == img.tobytes()
+        results.append(row)
+    return results
+
+
+def main(argv):
+    print("=" * 60)
+    print("  Gauntlet renderer benchmark")
+    print("=" * 60)
+    for row in benchmark(argv or None):
+        size = "{}x{}".format(*row["size"])
+        line = f"  {row['preset']:<8} {size:<10} vectorized {row['vectorized_s'] * 1000:8.1f} ms"
+        if "reference_s" in row:
+            speedup = row["reference_s"] / row["vectorized_s"]
+            mark = "✓" if row["identical"] else "✗ MISMATCH"
+            line += f"  reference {row['reference_s'] * 1000:9.1f} ms  ({speedup:.0f}x) {mark}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Array-backed LSB embedding / extraction engine for The Snap.
+
+Payload bytes are unpacked with np.unpackbits (MSB first) and written into
+the low bit plane(s) of the selected channels with vectorized slices.
+
+Parameters shared by embed_lsb / extract_lsb:
+  channels  String of channel letters ("R", "G", "RGB", "BR", ...). Order
+            matters: it is the order in which channels receive bits.
+  depth     Number of low bit planes used per channel sample (1-8). Each
+            sample carries `depth` payload bits, most significant first.
+  layout    "interleaved" walks pixels in row-major order and visits every
+            selected channel of a pixel before moving on (zsteg's "rgb"
+            order). "planar" fills the whole first channel, then the next.
+
+The default (channels="R", depth=1) reproduces the original red-channel
+layout used by encode_lsb_red_channel exactly.
+"""
+
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+CHANNEL_INDEX = {'R': 0, 'G': 1, 'B': 2}
+LAYOUTS = ("interleaved", "planar")
+
+
+def _channel_indices(channels):
+    try:
+        idx = [CHANNEL_INDEX[c] for c in channels.upper()]
+    except KeyError as e:
+        raise ValueError(f"Unknown channel {e.args[0]!r} in '{channels}' (use R, G, B)")
+    if not idx or len(set(idx)) != len(idx):
+        raise ValueError(f"Channels must be a non-empty set of R/G/B, got '{channels}'")
+    return idx
+
+
+def _check_params(channels, depth, layout):
+    if not 1 <= depth <= 8:
+        raise ValueError(f"Bit depth must be between 1 and 8, got {depth}")
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}' (choose from {', '.join(LAYOUTS)})")
+    return _channel_indices(channels)
+
+
+def _as_rgb_array(img):
+    """Return an (H, W, 3) uint8 array copy of a PIL image or array."""
+    if isinstance(img, Image.Image):
+        return np.array(img.convert('RGB'), dtype=np.uint8)
+    arr = np.array(img, dtype=np.uint8)
+    if arr.ndim != 3 or arr.shape[2] < 3:
+        raise ValueError(f"Expected an (H, W, 3) image array, got shape {arr.shape}")
+    return arr[..., :3].copy()
+
+
+def capacity_bits(shape, channels="R", depth=1):
+    """Number of payload bits an image of `shape` (H, W, ...) can carry."""
+    height, width = shape[:2]
+    return height * width * len(_channel_indices(channels)) * depth
+
+
+# ─────────────────────────────────────────────
+# Sample <-> bit-group conversion
+# ─────────────────────────────────────────────
+def _bits_to_groups(bits, depth):
+    """Pack a 0/1 array into `depth`-bit values (MSB first, zero padded)."""
+    pad = (-len(bits)) % depth
+    if pad:
+        bits = np.concatenate([bits, np.zeros(pad, dtype=np.uint8)])
+    if depth == 1:
+        return bits
+    weights = (1 << np.arange(depth - 1, -1, -1)).astype(np.uint8)
+    return (bits.reshape(-1, depth) * weights).sum(axis=1, dtype=np.uint8)
+
+
+def _groups_to_bits(values, depth):
+    """Inverse of _bits_to_groups."""
+    if depth == 1:
+        return values & 1
+    shifts = np.arange(depth - 1, -1, -1, dtype=np.uint8)
+    return ((values[:, None] >> shifts) & 1).reshape(-1).astype(np.uint8)
+
+
+def _carrier_view(arr, ch_idx, layout):
+    """
+    Return (flat, write_back) where `flat` is a 1-D sample sequence in
+    embedding order and write_back(flat) stores it into `arr`.
+    """
+    pixels = arr.reshape(-1, 3)
+    if len(ch_idx) == 1:
+        # Single channel: a strided view, writes land directly in arr
+        return pixels[:, ch_idx[0]], lambda flat: None
+    if layout == "interleaved":
+        flat = pixels[:, ch_idx].reshape(-1)
+
+        def write_back(flat):
+            pixels[:, ch_idx] = flat.reshape(-1, len(ch_idx))
+    else:
+        flat = pixels[:, ch_idx].T.reshape(-1)
+
+        def write_back(flat):
+            pixels[:, ch_idx] = flat.reshape(len(ch_idx), -1).T
+    return flat, write_back
+
+
+# ─────────────────────────────────────────────
+# Embedding / extraction
+# ─────────────────────────────────────────────
+def embed_lsb_array(arr, payload, channels="R", depth=1, layout="interleaved"):
+    """Embed `payload` into `arr` (modified in place). Returns the bit count written."""
+    ch_idx = _check_params(channels, depth, layout)
+    if arr.ndim != 3 or arr.shape[2] != 3 or not arr.flags['C_CONTIGUOUS']:
+        raise ValueError("Image array must be a C-contiguous (H, W, 3) uint8 array")
+    bits = np.unpackbits(np.frombuffer(bytes(payload), dtype=np.uint8))
+
+    max_bits = arr.shape[0] * arr.shape[1] * len(ch_idx) * depth
+    if len(bits) > max_bits:
+        raise ValueError(f"Message too large: {len(bits)} bits > {max_bits} capacity")
+
+    values = _bits_to_groups(bits, depth)
+    n = len(values)
+    keep = np.uint8((0xFF << depth) & 0xFF)
+
+    flat, write_back = _carrier_view(arr, ch_idx, layout)
+    flat[:n] = (flat[:n] & keep) | values
+    write_back(flat)
+    return len(bits)
+
+
+def extract_lsb_array(arr, n_bytes=None, channels="R", depth=1, layout="interleaved"):
+    """Read `n_bytes` (default: full capacity) back out of an image array."""
+    ch_idx = _check_params(channels, depth, layout)
+    flat, _ = _carrier_view(np.ascontiguousarray(arr[..., :3], dtype=np.uint8), ch_idx, layout)
+
+    if n_bytes is None:
+        n_samples = len(flat)
+    else:
+        n_samples = -(-n_bytes * 8 // depth)
+        if n_samples > len(flat):
+            raise ValueError(f"Requested {n_bytes} bytes but image holds {len(flat) * depth // 8}")
+
+    values = flat[:n_samples] & np.uint8((1 << depth) - 1)
+    bits = _groups_to_bits(values, depth)
+    data = np.packbits(bits[:len(bits) - len(bits) % 8])
+    return data[:n_bytes].tobytes() if n_bytes is not None else data.tobytes()
+
+
+def embed_lsb(img, payload, channels="R", depth=1, layout="interleaved"):
+    """Embed `payload` into a copy of `img` and return it as a PIL RGB image."""
+    arr = _as_rgb_array(img)
+    embed_lsb_array(arr, payload, channels, depth, layout)
+    return Image.fromarray(arr, 'RGB')
+
+
+def extract_lsb(img, n_bytes=None, channels="R", depth=1, layout="interleaved"):
+    """Extract bytes from a PIL image or (H, W, 3) array."""
+    arr = np.asarray(img.convert('RGB') if isinstance(img, Image.Image) else img)
+    return extract_lsb_array(arr, n_bytes, channels, depth, layout)
+
+
+def verify_round_trip(img, payload, channels="R", depth=1, layout="interleaved"):
+    """Check that `payload` reads back from `img` unchanged."""
+    recovered = extract_lsb(img, len(payload), channels, depth, layout)
+    if recovered != bytes(payload):
+        raise AssertionError(
+            f"LSB round-trip failed ({channels}, depth={depth}, {layout}): "
+            f"got {recovered[:32]!r}..., expected {bytes(payload)[:32]!r}...")
+    return recovered
+
+
+# ─────────────────────────────────────────────
+# Quick self-check
+# ─────────────────────────────────────────────
+def main(argv):
+    size = (800, 600)
+    rng = np.random.default_rng(1337)
+    base = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    payload = rng.integers(0, 256, 2048, dtype=np.uint8).tobytes()
+
+    print("=" * 60)
+    print("  LSB engine round-trip check")
+    print("=" * 60)
+    for channels in ("R", "G", "B", "RGB", "BGR"):
+        for depth in (1, 2, 4):
+            for layout in LAYOUTS:
+                if len(channels) == 1 and layout == "planar":
+                    continue
+                start = time.perf_counter()
+                img = embed_lsb(base, payload, channels, depth, layout)
+                verify_round_trip(img, payload, channels, depth, layout)
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"  {channels:<4} depth={depth} {layout:<12} {elapsed:6.2f} ms ✓")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Template-based morse keying synthesizer for The Snap.
+
+A morse string is first compiled into a compact keying schedule (start
+sample + element kind for every dot and dash). Precomputed dot and dash
+envelope templates are then scattered into one preallocated float32 buffer
+and multiplied by a phase-continuous carrier, so no per-sample Python lists
+are ever built. Several carriers (e.g. the 800 Hz decoy and the 6000 Hz real
+channel) are mixed into the same buffer in one pass.
+
+Element and gap lengths follow the original generate_morse_tone exactly.
+
+Usage:
+  python3 morse_synth.py            # benchmark against the list-extend version
+"""
+
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+import numpy as np
+
+DOT, DASH = 0, 1
+CHUNK_SAMPLES = 1 << 16
+
+KeyingSchedule = namedtuple('KeyingSchedule', 'starts kinds element_lengths total_samples')
+Carrier = namedtuple('Carrier', 'morse frequency wpm amplitude')
+
+
+# ─────────────────────────────────────────────
+# Schedule
+# ─────────────────────────────────────────────
+def build_schedule(morse_str, wpm, sample_rate=44100):
+    """Compile a morse string ('.', '-', ' ') into a KeyingSchedule."""
+    dot_duration = 1.2 / wpm  # seconds per dot (PARIS standard)
+    dot_len = int(sample_rate * dot_duration)
+    dash_len = int(sample_rate * dot_duration * 3)
+    gap = int(sample_rate * dot_duration)
+    letter_gap = int(sample_rate * dot_duration * 2)
+    word_gap = int(sample_rate * dot_duration * 4)
+
+    starts, kinds = [], []
+    pos = 0
+    for i, char in enumerate(morse_str):
+        if char == '.':
+            starts.append(pos)
+            kinds.append(DOT)
+            pos += dot_len + gap
+        elif char == '-':
+            starts.append(pos)
+            kinds.append(DASH)
+            pos += dash_len + gap
+        elif char == ' ':
+            # Letter gap = 3 dots (1 already from inter-element), word gap
+            # is signalled by a run of spaces and handled on its last one
+            if i + 1 < len(morse_str) and morse_str[i + 1] == ' ':
+                continue
+            elif i > 0 and morse_str[i - 1] == ' ':
+                pos += word_gap
+            else:
+                pos += letter_gap
+
+    return KeyingSchedule(np.asarray(starts, dtype=np.int64),
+                          np.asarray(kinds, dtype=np.int8),
+                          (dot_len, dash_len), pos)
+
+
+def _envelope_template(length, sample_rate):
+    """Flat-top keying envelope with 5 ms linear ramps to avoid clicks."""
+    env = np.ones(length, dtype=np.float32)
+    ramp = min(int(0.005 * sample_rate), length // 4)
+    if ramp > 0:
+        env[:ramp] = np.linspace(0, 1, ramp, dtype=np.float32)
+        env[-ramp:] = np.linspace(1, 0, ramp, dtype=np.float32)
+    return env
+
+
+# ─────────────────────────────────────────────
+# Rendering
+# ─────────────────────────────────────────────
+def render_envelope(schedule, sample_rate=44100, out=None):
+    """Scatter dot/dash templates into a float32 on/off envelope."""
+    if out is None:
+        out = np.zeros(schedule.total_samples, dtype=np.float32)
+    for kind, length in zip((DOT, DASH), schedule.element_lengths):
+        starts = schedule.starts[schedule.kinds == kind]
+        if len(starts) == 0 or length == 0:
+            continue
+        idx = starts[:, None] + np.arange(length)
+        out[idx] = _envelope_template(length, sample_rate)
+    return out
+
+
+def _add_carrier(out, envelope, frequency, amplitude, sample_rate):
+    """out += amplitude * envelope * sin(2*pi*f*n/sr), in bounded chunks."""
+    n = len(envelope)
+    for start in range(0, n, CHUNK_SAMPLES):
+        stop = min(start + CHUNK_SAMPLES, n)
+        env = envelope[start:stop]
+        if not env.any():
+            continue
+        # Phase is taken from the absolute sample index -> continuous carrier
+        phase = np.arange(start, stop, dtype=np.float64) * (2 * np.pi * frequency / sample_rate)
+        np.remainder(phase, 2 * np.pi, out=phase)
+        tone = np.sin(phase.astype(np.float32))
+        tone *= env
+        tone *= np.float32(amplitude)
+        out[start:stop] += tone
+    return out
+
+
+def synthesize(carriers, sample_rate=44100, length=None):
+    """
+    Render and mix several keyed carriers into one float32 buffer.
+
+    carriers: iterable of Carrier(morse, frequency, wpm, amplitude).
+    length:   output length in samples (default: longest schedule). Extra
+              samples are silence; a length shorter than any schedule
+              raises ValueError rather than cutting a carrier off.
+    """
+    carriers = list(carriers)
+    schedules = [build_schedule(c.morse, c.wpm, sample_rate) for c in carriers]
+    longest = max((s.total_samples for s in schedules), default=0)
+    if length is None:
+        length = longest
+    elif length < longest:
+        raise ValueError(f"length={length} is shorter than the longest carrier "
+                         f"({longest} samples)")
+
+    out = np.zeros(length, dtype=np.float32)
+    envelope = np.empty(length, dtype=np.float32)
+    for carrier, schedule in zip(carriers, schedules):
+        envelope.fill(0)
+        render_envelope(schedule, sample_rate, envelope[:schedule.total_samples])
+        _add_carrier(out, envelope, carrier.frequency, carrier.amplitude, sample_rate)
+    return out
+
+
+def generate_keyed_tone(morse_str, frequency, wpm, sample_rate=44100):
+    """Single-carrier convenience wrapper (unit amplitude)."""
+    return synthesize([Carrier(morse_str, frequency, wpm, 1.0)], sample_rate)
+
+
+# ─────────────────────────────────────────────
+# Legacy list-extend implementation (benchmark only)
+# ─────────────────────────────────────────────
+def _legacy_morse_tone(morse_str, frequency, wpm, sample_rate=44100):
+    dot_duration = 1.2 / wpm
+    samples = []
+    for i, char in enumerate(morse_str):
+        if char in '.-':
+            duration = dot_duration if char == '.' else dot_duration * 3
+            t = np.linspace(0, duration, int(sample_rate * duration), False)
+            tone = np.sin(2 * np.pi * frequency * t)
+            envelope = np.ones_like(t)
+            ramp = min(int(0.005 * sample_rate), len(t) // 4)
+            if ramp > 0:
+                envelope[:ramp] = np.linspace(0, 1, ramp)
+                envelope[-ramp:] = np.linspace(1, 0, ramp)
+            samples.extend(tone * envelope)
+            samples.extend([0.0] * int(sample_rate * dot_duration))
+        elif char == ' ':
+            if i + 1 < len(morse_str) and morse_str[i + 1] == ' ':
+                continue
+            elif i > 0 and morse_str[i - 1] == ' ':
+                samples.extend([0.0] * int(sample_rate * dot_duration * 4))
+            else:
+                samples.extend([0.0] * int(sample_rate * dot_duration * 2))
+    return np.array(samples)
+
+
+# ─────────────────────────────────────────────
+# Benchmark
+# ─────────────────────────────────────────────
+def _measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark(repeat_text=(1, 4, 16), sample_rate=44100):
+    """Compare legacy vs template synthesis of the two-carrier morse mix."""
+    decoy = '. -. -.. --. .- -- .'                   # ENDGAME
+    real = '....- -.. ...-- ....- -.... . ..... ..-.'  # 4D346E5F
+    rows = []
+    for n in repeat_text:
+        d, r = '   '.join([decoy] * n), '   '.join([real] * n)
+
+        def legacy():
+            a = _legacy_morse_tone(d, 800, 20, sample_rate)
+            b = _legacy_morse_tone(r, 6000, 15, sample_rate)
+            out = np.zeros(max(len(a), len(b)))
+            out[:len(a)] += a * 0.7
+            out[:len(b)] += b * 0.3
+            return out
+
+        def templated():
+            return synthesize([Carrier(d, 800, 20, 0.7), Carrier(r, 6000, 15, 0.3)], sample_rate)
+
+        ref, t_legacy, m_legacy = _measure(legacy)
+        new, t_new, m_new = _measure(templated)
+        rows.append({
+            "repeat": n, "samples": len(new),
+            "legacy_s": t_legacy, "legacy_peak": m_legacy,
+            "template_s": t_new, "template_peak": m_new,
+            "same_length": len(ref) == len(new),
+        })
+    return rows
+
+
+def main(argv):
+    print("=" * 60)
+    print("  Morse synthesizer benchmark (800 Hz + 6000 Hz mix)")
+    print("=" * 60)
+    for row in benchmark():
+        mark = "✓" if row["same_length"] else "✗ timing differs"
+        print(f"  x{row['repeat']:<3} {row['samples']:>9} samples  "
+              f"legacy {row['legacy_s'] * 1000:8.1f} ms / {row['legacy_peak'] / 1e6:7.1f} MB  "
+              f"template {row['template_s'] * 1000:7.1f} ms / {row['template_peak'] / 1e6:6.1f} MB  {mark}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
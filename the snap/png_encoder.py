@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Configurable PNG encoder for gauntlet.png.
+
+Pillow always encodes with its default zlib level and adaptive filtering.
+This encoder writes the PNG chunks itself, so each stage of the encode is
+selectable:
+
+  level     zlib compression level (0-9)
+  filter    scanline filter applied to every row: "none", "sub", "up",
+            "average", "paeth", or "adaptive" (per row, the filter with the
+            smallest sum of absolute signed bytes, as libpng does). All
+            filters are computed for the whole image at once with NumPy.
+  workers   when > 1, the filtered scanlines are split into blocks that are
+            deflated in parallel threads (zlib releases the GIL). Each
+            block is primed with the previous 32 KiB as a preset
+            dictionary, as pigz does. The blocks are joined into one zlib
+            stream, so decoders see an ordinary single-stream IDAT.
+
+Named profiles bundle these choices. "pillow" keeps Pillow's own encoder.
+The tEXt chunks are written before IDAT, as Pillow writes them. Pixels are
+stored losslessly, so LSB payloads survive any profile.
+
+Usage:
+  python3 png_encoder.py image.png [profile ...]   # size/time per profile
+"""
+
+import io
+import os
+import struct
+import sys
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, PngImagePlugin
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+FILTERS = ("none", "sub", "up", "average", "paeth", "adaptive")
+_FILTER_TYPES = {"none": 0, "sub": 1, "up": 2, "average": 3, "paeth": 4}
+_COLOR_TYPES = {1: 0, 3: 2, 4: 6}        # channels -> PNG colour type (L, RGB, RGBA)
+WINDOW = 1 << 15                         # deflate window: preset dictionary size
+MIN_BLOCK = 1 << 18                      # smallest parallel deflate block
+
+PngProfile = namedtuple('PngProfile', 'level filter workers')
+
+PROFILES = {
+    "pillow": None,                                  # Pillow's own encoder
+    "fast": PngProfile(level=4, filter="up", workers=0),
+    "balanced": PngProfile(level=6, filter="up", workers=0),
+    "small": PngProfile(level=9, filter="sub", workers=0),
+}
+DEFAULT_PROFILE = "pillow"
+
+
+def _pixels(img):
+    """(H, W, C) uint8 array of a PIL image or array (C = 1, 3 or 4)."""
+    arr = np.asarray(img, dtype=np.uint8)
+    if arr.ndim == 2:
+        arr = arr[..., None]
+    if arr.ndim != 3 or arr.shape[2] not in _COLOR_TYPES:
+        raise ValueError(f"Expected an L, RGB or RGBA image, got shape {arr.shape}")
+    return arr
+
+
+def _chunk(kind, data):
+    crc = zlib.crc32(data, zlib.crc32(kind))
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', crc)
+
+
+# ─────────────────────────────────────────────
+# Scanline filters (whole image at once)
+# ─────────────────────────────────────────────
+def _shifted(rows, bpp):
+    """(left, up, up-left) neighbours of every byte, zero outside the image."""
+    a = np.zeros_like(rows)
+    a[:, bpp:] = rows[:, :-bpp]
+    b = np.zeros_like(rows)
+    b[1:] = rows[:-1]
+    c = np.zeros_like(rows)
+    c[1:, bpp:] = rows[:-1, :-bpp]
+    return a, b, c
+
+
+def _apply_filter(name, rows, bpp):
+    """(H, stride) uint8 rows filtered with one basic filter (uint8 math wraps mod 256)."""
+    if name == "none":
+        return rows
+    if name == "up":
+        out = rows.copy()
+        out[1:] -= rows[:-1]
+        return out
+    if name == "sub":
+        out = rows.copy()
+        out[:, bpp:] -= rows[:, :-bpp]
+        return out
+    a, b, c = _shifted(rows, bpp)
+    if name == "average":
+        return rows - ((a >> 1) + (b >> 1) + (a & b & 1))
+    a, b, c = (v.astype(np.int16) for v in (a, b, c))
+    p = a + b - c
+    pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+    predictor = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+    return rows - predictor.astype(np.uint8)
+
+
+def filter_scanlines(pixels, filter="adaptive"):
+    """Filtered PNG scanline data (filter byte + row) as one contiguous array."""
+    if filter not in FILTERS:
+        raise ValueError(f"Unknown filter '{filter}' (choose from {', '.join(FILTERS)})")
+    height, width, bpp = pixels.shape
+    rows = pixels.reshape(height, width * bpp)
+    out = np.empty((height, width * bpp + 1), dtype=np.uint8)
+
+    if filter != "adaptive":
+        out[:, 0] = _FILTER_TYPES[filter]
+        out[:, 1:] = _apply_filter(filter, rows, bpp)
+        return out
+
+    # libpng heuristic: minimum sum of absolute values of the signed bytes
+    names = list(_FILTER_TYPES)
+    filtered = {name: _apply_filter(name, rows, bpp) for name in names}
+    scores = np.stack([np.abs(filtered[n].view(np.int8).astype(np.int32)).sum(axis=1)
+                       for n in names])
+    choice = scores.argmin(axis=0)
+    out[:, 0] = choice
+    for i, name in enumerate(names):
+        picked = choice == i
+        out[picked, 1:] = filtered[name][picked]
+    return out
+
+
+# ─────────────────────────────────────────────
+# Deflate
+# ─────────────────────────────────────────────
+def _deflate_block(view, start, stop, level, last):
+    zdict = bytes(view[max(0, start - WINDOW):start]) if start else None
+    if zdict:
+        comp = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict)
+    else:
+        comp = zlib.compressobj(level, zlib.DEFLATED, -15)
+    data = comp.compress(view[start:stop])
+    return data + comp.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def deflate(data, level=6, workers=1):
+    """
+    zlib-compress `data`. With workers > 1, blocks are deflated in parallel
+    and joined into one zlib stream (raw deflate blocks + Adler-32 trailer).
+    """
+    view = memoryview(data).cast('B')
+    blocks = max(1, min(workers, len(view) // MIN_BLOCK))
+    if blocks == 1:
+        return zlib.compress(view, level)
+
+    step = -(-len(view) // blocks)
+    bounds = [(start, min(start + step, len(view))) for start in range(0, len(view), step)]
+    with ThreadPoolExecutor(max_workers=blocks) as pool:
+        parts = list(pool.map(lambda b: _deflate_block(view, b[0], b[1], level,
+                                                       b[1] == len(view)), bounds))
+    header = b'\x78\x01' if level < 2 else b'\x78\x9c' if level < 7 else b'\x78\xda'
+    return header + b''.join(parts) + struct.pack('>I', zlib.adler32(view))
+
+
+# ─────────────────────────────────────────────
+# Encoder
+# ─────────────────────────────────────────────
+def resolve_profile(profile):
+    """A PngProfile (or None for Pillow) from a profile name or PngProfile."""
+    if isinstance(profile, PngProfile) or profile is None:
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown PNG profile '{profile}' (choose from {', '.join(PROFILES)})")
+
+
+def _save_pillow(img, text):
+    if not isinstance(img, Image.Image):
+        arr = _pixels(img)
+        img = Image.fromarray(arr[..., 0] if arr.shape[2] == 1 else arr)
+    meta = PngImagePlugin.PngInfo()
+    for key, value in (text or {}).items():
+        meta.add_text(key, value)
+    buf = io.BytesIO()
+    img.save(buf, format='PNG', pnginfo=meta)
+    return buf.getvalue()
+
+
+def encode_png(img, text=None, profile=DEFAULT_PROFILE):
+    """
+    Encode a PIL image or (H, W[, C]) uint8 array as PNG bytes with tEXt
+    chunks from `text`. `profile` is a name from PROFILES or a PngProfile.
+    A workers value of 0 means one per CPU.
+    """
+    profile = resolve_profile(profile)
+    if profile is None:
+        return _save_pillow(img, text)
+
+    pixels = _pixels(img)
+    height, width, channels = pixels.shape
+    workers = profile.workers or os.cpu_count() or 1
+    scanlines = filter_scanlines(pixels, profile.filter)
+
+    out = [PNG_SIGNATURE,
+           _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8,
+                                       _COLOR_TYPES[channels], 0, 0, 0))]
+    for key, value in (text or {}).items():
+        out.append(_chunk(b'tEXt', key.encode('latin-1') + b'\x00' + value.encode('latin-1')))
+    out.append(_chunk(b'IDAT', deflate(scanlines, profile.level, workers)))
+    out.append(_chunk(b'IEND', b''))
+    return b''.join(out)
+
+
+def main(argv):
+    if not argv:
+        print("usage: png_encoder.py IMAGE [profile ...]")
+        sys.exit(2)
+    img = Image.open(argv[0])
+    img.load()
+    reference = np.asarray(img)
+    for name in argv[1:] or list(PROFILES):
+        start = time.perf_counter()
+        data = encode_png(img, img.text if hasattr(img, 'text') else None, name)
+        elapsed = time.perf_counter() - start
+        same = np.array_equal(np.asarray(Image.open(io.BytesIO(data))), reference)
+        print(f"  {name:<10} {len(data):>10} bytes  {elapsed * 1000:8.1f} ms  "
+              f"{'lossless' if same else 'PIXELS DIFFER'}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
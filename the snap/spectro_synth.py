@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Vectorized spectrogram-text synthesizer for The Snap.
+
+Glyphs live in a NumPy atlas (5x7 cells, 1 blank spacer column per glyph)
+covering A-Z, a-z, 0-9 and the flag punctuation. A text string is turned
+into its bitmap with one gather from the atlas; every bitmap column then
+becomes a time slot and every row a frequency, and all slots are
+synthesized with a single batched sinusoid sum (one matmul of the bitmap
+against a row-tone matrix) instead of a column x row Python loop.
+
+Optional modes:
+  phase_continuous  Tones keep their phase across columns instead of
+                    restarting at every slot (no phase steps in the band).
+  window            'hann' or 'tukey' column window to soften slot edges.
+  row_scale         Repeat each glyph row over N frequency rows so text can
+                    fill a wider band without getting thinner.
+
+Usage:
+  python3 spectro_synth.py "MYTHIX{I_"      # benchmark a string
+"""
+
+import sys
+import time
+
+import numpy as np
+
+GLYPH_ROWS = 7
+GLYPH_COLS = 5
+CELL_COLS = GLYPH_COLS + 1          # glyph + 1 blank spacer column
+CHUNK_SAMPLES = 1 << 16
+
+# ─────────────────────────────────────────────
+# Glyph atlas (rows top to bottom, '#' = lit)
+# ─────────────────────────────────────────────
+GLYPHS = {
+    'A': ".###. #...# #...# ##### #...# #...# #...#",
+    'B': "####. #...# #...# ####. #...# #...# ####.",
+    'C': ".###. #...# #.... #.... #.... #...# .###.",
+    'D': "####. #...# #...# #...# #...# #...# ####.",
+    'E': "##### #.... #.... ####. #.... #.... #####",
+    'F': "##### #.... #.... ####. #.... #.... #....",
+    'G': ".###. #...# #.... #.### #...# #...# .####",
+    'H': "#...# #...# #...# ##### #...# #...# #...#",
+    'I': "##### ..#.. ..#.. ..#.. ..#.. ..#.. #####",
+    'J': "..### ...#. ...#. ...#. ...#. #..#. .##..",
+    'K': "#...# #..#. #.#.. ##... #.#.. #..#. #...#",
+    'L': "#.... #.... #.... #.... #.... #.... #####",
+    'M': "#...# ##.## #.#.# #...# #...# #...# #...#",
+    'N': "#...# #...# ##..# #.#.# #..## #...# #...#",
+    'O': ".###. #...# #...# #...# #...# #...# .###.",
+    'P': "####. #...# #...# ####. #.... #.... #....",
+    'Q': ".###. #...# #...# #...# #.#.# #..#. .##.#",
+    'R': "####. #...# #...# ####. #.#.. #..#. #...#",
+    'S': ".#### #.... #.... .###. ....# ....# ####.",
+    'T': "##### ..#.. ..#.. ..#.. ..#.. ..#.. ..#..",
+    'U': "#...# #...# #...# #...# #...# #...# .###.",
+    'V': "#...# #...# #...# #...# #...# .#.#. ..#..",
+    'W': "#...# #...# #...# #.#.# #.#.# #.#.# .#.#.",
+    'X': "#...# .#.#. ..#.. ..#.. ..#.. .#.#. #...#",
+    'Y': "#...# #...# .#.#. ..#.. ..#.. ..#.. ..#..",
+    'Z': "##### ....# ...#. ..#.. .#... #.... #####",
+    'a': "..... ..... .###. ....# .#### #...# .####",
+    'b': "#.... #.... #.##. ##..# #...# #...# ####.",
+    'c': "..... ..... .###. #.... #.... #...# .###.",
+    'd': "....# ....# .##.# #..## #...# #...# .####",
+    'e': "..... ..... .###. #...# ##### #.... .###.",
+    'f': "..##. .#..# .#... ###.. .#... .#... .#...",
+    'g': "..... .#### #...# #...# .#### ....# .###.",
+    'h': "#.... #.... #.##. ##..# #...# #...# #...#",
+    'i': "..#.. ..... .##.. ..#.. ..#.. ..#.. .###.",
+    'j': "...#. ..... ..##. ...#. ...#. #..#. .##..",
+    'k': "#.... #.... #..#. #.#.. ##... #.#.. #..#.",
+    'l': ".##.. ..#.. ..#.. ..#.. ..#.. ..#.. .###.",
+    'm': "..... ..... ##.#. #.#.# #.#.# #...# #...#",
+    'n': "..... ..... #.##. ##..# #...# #...# #...#",
+    'o': "..... ..... .###. #...# #...# #...# .###.",
+    'p': "..... ..... ####. #...# ####. #.... #....",
+    'q': "..... ..... .##.# #..## .#### ....# ....#",
+    'r': "..... ..... #.##. ##..# #.... #.... #....",
+    's': "..... ..... .###. #.... .###. ....# ####.",
+    't': ".#... .#... ###.. .#... .#... .#..# ..##.",
+    'u': "..... ..... #...# #...# #...# #..## .##.#",
+    'v': "..... ..... #...# #...# #...# .#.#. ..#..",
+    'w': "..... ..... #...# #...# #.#.# #.#.# .#.#.",
+    'x': "..... ..... #...# .#.#. ..#.. .#.#. #...#",
+    'y': "..... ..... #...# #...# .#### ....# .###.",
+    'z': "..... ..... ##### ...#. ..#.. .#... #####",
+    '0': ".###. #...# #..## #.#.# ##..# #...# .###.",
+    '1': "..#.. .##.. ..#.. ..#.. ..#.. ..#.. .###.",
+    '2': ".###. #...# ....# ...#. ..#.. .#... #####",
+    '3': "##### ...#. ..#.. ...#. ....# #...# .###.",
+    '4': "...#. ..##. .#.#. #..#. ##### ...#. ...#.",
+    '5': "##### #.... ####. ....# ....# #...# .###.",
+    '6': "..##. .#... #.... ####. #...# #...# .###.",
+    '7': "##### ....# ...#. ..#.. .#... .#... .#...",
+    '8': ".###. #...# #...# .###. #...# #...# .###.",
+    '9': ".###. #...# #...# .#### ....# ...#. .##..",
+    '{': "..##. ..#.. ..#.. .#... ..#.. ..#.. ..##.",
+    '}': ".##.. ..#.. ..#.. ...#. ..#.. ..#.. .##..",
+    '_': "..... ..... ..... ..... ..... ..... #####",
+    '-': "..... ..... ..... ##### ..... ..... .....",
+    '!': "..#.. ..#.. ..#.. ..#.. ..#.. ..... ..#..",
+    '?': ".###. #...# ....# ...#. ..#.. ..... ..#..",
+    '.': "..... ..... ..... ..... ..... .##.. .##..",
+}
+
+
+def _build_atlas():
+    """Return (atlas, lookup): atlas[0] is blank; lookup maps byte -> glyph."""
+    atlas = np.zeros((len(GLYPHS) + 1, GLYPH_ROWS, CELL_COLS), dtype=np.uint8)
+    lookup = np.zeros(256, dtype=np.intp)
+    for i, (ch, rows) in enumerate(GLYPHS.items(), start=1):
+        cells = np.frombuffer(rows.replace(' ', '').encode(), dtype=np.uint8)
+        atlas[i, :, :GLYPH_COLS] = (cells == ord('#')).reshape(GLYPH_ROWS, GLYPH_COLS)
+        lookup[ord(ch)] = i
+    return atlas, lookup
+
+
+GLYPH_ATLAS, GLYPH_LOOKUP = _build_atlas()
+
+
+def render_bitmap(text):
+    """Render `text` to a (7, 6 * len(text)) uint8 bitmap; unknown chars are blank."""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    codes = np.where(codes < len(GLYPH_LOOKUP), codes, 0)   # beyond latin-1 -> blank
+    cells = GLYPH_ATLAS[GLYPH_LOOKUP[codes]]              # (n, rows, cols)
+    return cells.transpose(1, 0, 2).reshape(GLYPH_ROWS, -1)
+
+
+# ─────────────────────────────────────────────
+# Synthesis
+# ─────────────────────────────────────────────
+def _column_window(kind, length):
+    if kind is None:
+        return np.ones(length)
+    if kind == 'hann':
+        return np.hanning(length)
+    if kind == 'tukey':
+        # Flat top with 10% raised-cosine tapers on each side
+        win = np.ones(length)
+        taper = max(1, int(0.1 * length))
+        ramp = 0.5 * (1 - np.cos(np.pi * np.arange(taper) / taper))
+        win[:taper] = ramp
+        win[-taper:] = ramp[::-1]
+        return win
+    raise ValueError(f"Unknown window '{kind}' (use None, 'hann' or 'tukey')")
+
+
+def row_frequencies(n_rows, freq_low=15000, freq_high=19000):
+    """Frequencies for bitmap rows, top row = freq_high, bottom row = freq_low."""
+    return np.linspace(freq_high, freq_low, n_rows)
+
+
+def synthesize_bitmap(bitmap, sample_rate=44100, freq_low=15000, freq_high=19000,
+                      col_duration=0.04, duration_sec=None, phase_continuous=False,
+                      window=None, amplitude=0.15):
+    """
+    Turn a (rows, cols) 0/1 bitmap into audio whose spectrogram shows it.
+
+    Column c occupies samples [int(c * cd * sr), int((c * cd + cd) * sr)) with
+    cd = col_duration. Returns un-normalized float64 samples.
+    """
+    bitmap = np.asarray(bitmap, dtype=np.float64)
+    n_rows, n_cols = bitmap.shape
+    if duration_sec is None:
+        duration_sec = col_duration * n_cols + 0.5  # small padding
+    total = int(sample_rate * duration_sec)
+    samples = np.zeros(total)
+
+    # Slot edges are computed exactly like the original per-column loop, so
+    # neighbouring slots may overlap or leave a gap of one sample.
+    col_start = np.arange(n_cols) * col_duration
+    starts = np.minimum((col_start * sample_rate).astype(np.int64), total)
+    ends = np.minimum(((col_start + col_duration) * sample_rate).astype(np.int64), total)
+    if n_cols == 0 or ends.max() <= 0:
+        return samples
+
+    omega = 2 * np.pi * row_frequencies(n_rows, freq_low, freq_high) / sample_rate
+    weights = amplitude * bitmap                            # (rows, cols)
+    lengths = ends - starts
+    max_len = int(lengths.max())
+    win = _column_window(window, max_len)
+
+    if not phase_continuous:
+        # Every slot restarts at phase 0: one (cols x rows) @ (rows x len)
+        # matmul produces all slot waveforms at once.
+        tones = np.sin(omega[:, None] * np.arange(max_len)[None, :]) * win
+        slots = weights.T @ tones                           # (cols, max_len)
+        offsets = np.arange(max_len)[None, :]
+        valid = offsets < lengths[:, None]
+        index = (starts[:, None] + offsets)[valid]
+        return np.bincount(index, weights=slots[valid], minlength=total)
+
+    # Phase-continuous: tone phase follows the absolute sample index. Work
+    # in bounded chunks of samples, looking up each sample's column.
+    end = int(ends[-1])
+    for start in range(0, end, CHUNK_SAMPLES):
+        stop = min(start + CHUNK_SAMPLES, end)
+        n = np.arange(start, stop)
+        col = np.searchsorted(starts, n, side='right') - 1
+        local = np.minimum(n - starts[col], max_len - 1)
+        tones = np.sin(omega[:, None] * n[None, :])         # (rows, chunk)
+        samples[start:stop] = np.einsum('rc,rc->c', weights[:, col], tones) * win[local]
+    return samples
+
+
+def synthesize_text(text, sample_rate=44100, freq_low=15000, freq_high=19000,
+                    col_duration=0.04, duration_sec=None, phase_continuous=False,
+                    window=None, row_scale=1, peak=0.3):
+    """Render text through the glyph atlas and synthesize it, normalized to `peak`."""
+    bitmap = render_bitmap(text)
+    if row_scale > 1:
+        bitmap = np.repeat(bitmap, row_scale, axis=0)
+    samples = synthesize_bitmap(bitmap, sample_rate, freq_low, freq_high, col_duration,
+                                duration_sec, phase_continuous, window)
+    max_val = np.max(np.abs(samples)) if len(samples) else 0
+    if max_val > 0:
+        samples *= peak / max_val  # Keep amplitude low
+    return samples
+
+
+# ─────────────────────────────────────────────
+# Benchmark
+# ─────────────────────────────────────────────
+def main(argv):
+    text = argv[0] if argv else "MYTHIX{I_4m_Ir0n_M4n_6000}"
+    print("=" * 60)
+    print(f"  Spectrogram synthesizer benchmark: '{text}'")
+    print("=" * 60)
+    for repeat in (1, 8, 32):
+        long_text = text * repeat
+        for label, kwargs in (("slot", {}),
+                              ("continuous+hann", {"phase_continuous": True, "window": 'hann'}),
+                              ("slot x3 rows", {"row_scale": 3})):
+            start = time.perf_counter()
+            samples = synthesize_text(long_text, **kwargs)
+            elapsed = time.perf_counter() - start
+            print(f"  {len(long_text):>5} chars  {label:<16} {len(samples) / 44100:7.1f}s audio "
+                  f"in {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Batched STFT spectrogram renderer for QA of The Snap's audio layers.
+
+Renders what a solver sees in a spectrogram viewer, without the viewer:
+
+  - the 15-19 kHz spectrogram text mixed into the MP3
+  - the 800 Hz decoy and 6 kHz real morse carriers in the WAV
+
+Audio is read in blocks (ffmpeg pipe for MP3, wave module for WAV, slices
+for arrays). Each block is framed with a strided view, no copy
+(sliding_window_view over the block plus the previous block's tail). All
+frames of a block are windowed and transformed with one batched rfft. Only
+the bins inside the requested band are kept, quantized to uint8 dB at once.
+Columns are max-pooled on the fly, doubling the pool factor whenever the
+image would exceed max_width. Short pulses stay visible, and memory is
+bounded by the image size, never by the track length.
+
+Usage:
+  python3 spectrogram_qa.py input.{mp3,wav} out.png [--preset morse] [--band LO HI]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+from audio_io import CHUNK_SAMPLES, iter_decode
+from png_encoder import encode_png
+
+N_FFT = 2048
+HOP = 512
+DB_RANGE = (-110.0, -30.0)      # dBFS mapped to black .. white
+MAX_WIDTH = 2048
+
+# QA presets for the challenge layers: band of interest (Hz) and STFT size.
+# The spectrogram text has 40 ms columns, so it needs a short window.
+PRESETS = {
+    "spectrogram": {"band": (14000.0, 20000.0), "n_fft": 512, "hop": 128},
+    "morse": {"band": (0.0, 8000.0), "n_fft": N_FFT, "hop": HOP},
+}
+
+# Dark-blue -> purple -> orange -> pale-yellow colour ramp (like "magma")
+_RAMP = np.array([[0, 0, 4], [59, 15, 112], [140, 41, 129], [222, 73, 104],
+                  [254, 159, 109], [252, 253, 191]], dtype=np.float64)
+COLORMAP = np.stack([np.interp(np.linspace(0, len(_RAMP) - 1, 256),
+                               np.arange(len(_RAMP)), _RAMP[:, c])
+                     for c in range(3)], axis=1).astype(np.uint8)
+
+
+# ─────────────────────────────────────────────
+# Sample sources (int16 or float blocks, mono)
+# ─────────────────────────────────────────────
+def _wav_blocks(source, block=CHUNK_SAMPLES):
+    with wave.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source) as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"Only 16-bit WAV is supported, got {wf.getsampwidth() * 8}-bit")
+        channels = wf.getnchannels()
+        sample_rate = wf.getframerate()
+        yield sample_rate
+        while True:
+            data = wf.readframes(block)
+            if not data:
+                break
+            pcm = np.frombuffer(data, dtype='<i2')
+            yield pcm.reshape(-1, channels).mean(axis=1) if channels > 1 else pcm
+
+
+def _is_wav(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:4]) == b'RIFF' and bytes(source[8:12]) == b'WAVE'
+    with open(source, 'rb') as f:
+        head = f.read(12)
+    return head[:4] == b'RIFF' and head[8:12] == b'WAVE'
+
+
+def iter_blocks(source, sample_rate=44100, block=CHUNK_SAMPLES):
+    """
+    (sample_rate, iterator of mono sample blocks) for a NumPy array, WAV
+    bytes/path, or any file ffmpeg decodes (MP3 bytes/path, resampled to
+    `sample_rate`).
+    """
+    if isinstance(source, np.ndarray):
+        samples = source if source.ndim == 1 else source.mean(axis=1)
+        # Float audio is in [-1, 1]; scale it to the int16 range dB are measured against
+        scale = 32767.0 if samples.dtype.kind == 'f' else 1.0
+        return sample_rate, (samples[i:i + block] * scale for i in range(0, len(samples), block))
+    if _is_wav(source):
+        blocks = _wav_blocks(source, block)
+        return next(blocks), blocks
+    return sample_rate, iter_decode(source, sample_rate, 1, block)
+
+
+# ─────────────────────────────────────────────
+# STFT
+# ─────────────────────────────────────────────
+def _band_bins(band, sample_rate, n_fft):
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    if band is None:
+        return slice(0, len(freqs)), freqs
+    lo, hi = band
+    sel = np.flatnonzero((freqs >= lo) & (freqs <= hi))
+    if len(sel) == 0:
+        raise ValueError(f"Band {lo}-{hi} Hz has no bins at {sample_rate} Hz / n_fft {n_fft}")
+    return slice(sel[0], sel[-1] + 1), freqs[sel[0]:sel[-1] + 1]
+
+
+def stft_columns(blocks, sample_rate, n_fft=N_FFT, hop=HOP, band=None, db_range=DB_RANGE):
+    """
+    Yield (bins, frames) uint8 column blocks of the band-limited STFT of a
+    stream of sample blocks. Only the last n_fft - hop samples are carried
+    between blocks. dB are relative to int16 full scale.
+    """
+    bins, _ = _band_bins(band, sample_rate, n_fft)
+    window = np.hanning(n_fft).astype(np.float32)
+    full_scale = 32768.0 * window.sum() / 2
+    lo, hi = db_range
+    tail = np.zeros(0, dtype=np.float32)
+    for block in blocks:
+        buf = np.concatenate([tail, np.asarray(block, dtype=np.float32)])
+        n_frames = (len(buf) - n_fft) // hop + 1 if len(buf) >= n_fft else 0
+        if n_frames:
+            frames = np.lib.stride_tricks.sliding_window_view(buf, n_fft)[::hop][:n_frames]
+            spectrum = np.abs(np.fft.rfft(frames * window, axis=1)[:, bins])
+            db = 20 * np.log10(np.maximum(spectrum / full_scale, 1e-12))
+            scaled = (np.clip(db, lo, hi) - lo) * (255.0 / (hi - lo))
+            yield scaled.astype(np.uint8).T
+        tail = buf[n_frames * hop:]
+
+
+class _ColumnPool:
+    """Max-pools a stream of (rows, n) column blocks to at most max_width columns."""
+
+    def __init__(self, max_width):
+        self.max_width = max_width
+        self.pool = 1
+        self.blocks = []
+        self.width = 0
+        self.partial = None          # max of the current, incomplete group
+        self.partial_n = 0           # frames in that group
+
+    def _emit(self, cols):
+        self.blocks.append(cols)
+        self.width += cols.shape[1]
+
+    def add(self, block):
+        if self.partial is not None:
+            take = min(self.pool - self.partial_n, block.shape[1])
+            if take:
+                self.partial = np.maximum(self.partial, block[:, :take].max(axis=1))
+                self.partial_n += take
+                block = block[:, take:]
+            if self.partial_n < self.pool:
+                return
+            self._emit(self.partial[:, None])
+            self.partial, self.partial_n = None, 0
+        full = block.shape[1] // self.pool * self.pool
+        if full:
+            self._emit(block[:, :full].reshape(block.shape[0], -1, self.pool).max(axis=2))
+        if full < block.shape[1]:
+            self.partial = block[:, full:].max(axis=1)
+            self.partial_n = block.shape[1] - full
+        while self.max_width and self.width > self.max_width:
+            self._halve()
+
+    def _halve(self):
+        cols = np.concatenate(self.blocks, axis=1)
+        if cols.shape[1] % 2:
+            last = cols[:, -1]
+            self.partial = last if self.partial is None else np.maximum(last, self.partial)
+            self.partial_n += self.pool
+            cols = cols[:, :-1]
+        self.blocks = [cols.reshape(cols.shape[0], -1, 2).max(axis=2)]
+        self.width = self.blocks[0].shape[1]
+        self.pool *= 2
+
+    def image(self, rows):
+        blocks = self.blocks + ([self.partial[:, None]] if self.partial is not None else [])
+        return np.concatenate(blocks, axis=1) if blocks else np.zeros((rows, 0), dtype=np.uint8)
+
+
+def spectrogram(source, sample_rate=44100, n_fft=N_FFT, hop=HOP, band=None,
+                db_range=DB_RANGE, max_width=MAX_WIDTH):
+    """
+    (image, info) for `source`: image is a (bins, columns) uint8 array with
+    the highest frequency in row 0; every column is the max of `pool`
+    consecutive frames (a power of two) so the width stays <= max_width + 1.
+    """
+    sample_rate, blocks = iter_blocks(source, sample_rate)
+    _, freqs = _band_bins(band, sample_rate, n_fft)
+    pooler = _ColumnPool(max_width)
+    n_frames = 0
+    for columns in stft_columns(blocks, sample_rate, n_fft, hop, band, db_range):
+        pooler.add(columns)
+        n_frames += columns.shape[1]
+    image = pooler.image(len(freqs))
+    info = {"sample_rate": sample_rate, "frames": n_frames, "pool": pooler.pool,
+            "seconds": (n_frames - 1) * hop / sample_rate + n_fft / sample_rate if n_frames else 0.0,
+            "band": (float(freqs[0]), float(freqs[-1]))}
+    return image[::-1], info
+
+
+def render_png(image, path=None, profile="fast"):
+    """Colour-map a spectrogram image and encode it as PNG (written to `path` if given)."""
+    png = encode_png(COLORMAP[image], profile=profile)
+    if path:
+        with open(path, 'wb') as f:
+            f.write(png)
+    return png
+
+
+def render_qa(source, path, preset=None, sample_rate=44100, max_width=MAX_WIDTH, **stft):
+    """
+    Render `source` to a spectrogram PNG at `path` with a PRESETS entry
+    (overridden by band / n_fft / hop keywords). Returns the info dict.
+    """
+    start = time.perf_counter()
+    stft = {**PRESETS.get(preset, {}), **{k: v for k, v in stft.items() if v is not None}}
+    image, info = spectrogram(source, sample_rate, max_width=max_width, **stft)
+    render_png(image, path)
+    info["render_s"] = time.perf_counter() - start
+    info["path"] = path
+    return info
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Render a spectrogram PNG")
+    parser.add_argument('input', help="MP3, WAV or anything ffmpeg decodes")
+    parser.add_argument('output', help="PNG path")
+    parser.add_argument('--band', nargs=2, type=float, metavar=('LO', 'HI'),
+                        help="frequency band in Hz (default: full range)")
+    parser.add_argument('--preset', choices=list(PRESETS), help="settings for a challenge layer")
+    parser.add_argument('--n-fft', type=int, help=f"FFT size (default: {N_FFT})")
+    parser.add_argument('--hop', type=int, help=f"frame hop in samples (default: {HOP})")
+    parser.add_argument('--width', type=int, default=MAX_WIDTH, help="maximum image width")
+    args = parser.parse_args(argv)
+
+    info = render_qa(args.input, args.output, args.preset, max_width=args.width,
+                     band=tuple(args.band) if args.band else None,
+                     n_fft=args.n_fft, hop=args.hop)
+    print(f"[+] {os.path.basename(args.output)}: {info['frames']} frames "
+          f"({info['seconds']:.1f}s, pool {info['pool']}), "
+          f"{info['band'][0]:.0f}-{info['band'][1]:.0f} Hz in {info['render_s'] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
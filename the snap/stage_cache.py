@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for build stages.
+
+Every stage output is stored under the SHA-256 of its inputs: the stage
+name, constants and parameters it depends on, the digest of any input files
+(e.g. the source MP3) and the source code of the modules that implement it.
+Unchanged stages load from disk; anything whose inputs changed rebuilds.
+
+Entries are plain files (raw bytes, .npy arrays or raw int16 PCM). Large
+outputs can be written straight into the cache and used in place by path
+(fetch_path), e.g. memory-mapped read-only by many workers at once. The
+cache is bounded by total size and evicts least-recently-used entries
+first; a hit refreshes the entry's mtime. NumPy is only imported to load or
+store array entries, so byte-only callers start fast.
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+KINDS = {"bytes": ".bin", "array": ".npy", "pcm": ".pcm"}
+
+
+def file_digest(path, block_size=1 << 20):
+    """SHA-256 hex digest of a file, read in blocks."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _canonical(value):
+    """Make a stage input JSON-serializable and order-independent."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"sha256": hashlib.sha256(value).hexdigest()}
+    np = sys.modules.get('numpy')   # no array can exist before NumPy is imported
+    if np is not None and isinstance(value, np.ndarray):
+        return {"dtype": str(value.dtype), "shape": value.shape,
+                "sha256": hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()}
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+class StageCache:
+    """Size-bounded LRU cache of stage outputs keyed by input hashes."""
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.stats = []          # (stage, 'hit' | 'miss' | 'off')
+        self._code_digests = {}
+
+    # ── Keys ──
+    def code_digest(self, paths):
+        """Digest of the given source files (cached per process)."""
+        parts = []
+        for path in paths:
+            if path not in self._code_digests:
+                self._code_digests[path] = file_digest(path)
+            parts.append(self._code_digests[path])
+        return hashlib.sha256(''.join(parts).encode()).hexdigest()
+
+    def key(self, stage, inputs, code=()):
+        """Hash a stage name, its inputs and its implementation sources."""
+        payload = {"stage": stage, "inputs": _canonical(inputs),
+                   "code": self.code_digest(code) if code else None}
+        blob = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(blob).hexdigest()
+
+    def _path(self, key, kind):
+        return os.path.join(self.root, key[:2], key + KINDS[kind])
+
+    # ── Access ──
+    def load(self, key, kind="bytes"):
+        """Return the cached value or None."""
+        path = self._path(key, kind)
+        try:
+            if kind == "array":
+                import numpy as np
+                value = np.load(path, allow_pickle=False)
+            else:
+                with open(path, 'rb') as f:
+                    value = f.read()
+        except (ValueError, EOFError, OSError):
+            return None
+        os.utime(path)  # refresh LRU position
+        return value
+
+    def store(self, key, value, kind="bytes"):
+        """
+        Atomically write a value and evict old entries if over budget. The
+        new entry is kept even when it alone exceeds the budget.
+        """
+        path = self._path(key, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if kind == "array":
+            import numpy as np
+            buf = io.BytesIO()
+            np.save(buf, np.asarray(value), allow_pickle=False)
+            data = buf.getbuffer()
+        else:
+            data = value
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict(keep=path)
+
+    def fetch(self, stage, inputs, build, kind="bytes", code=()):
+        """
+        Return (value, status) for (stage, inputs), building and storing on a
+        miss. status is 'hit', 'miss' or 'off'. Does not touch self.stats, so
+        it is safe to call from worker processes or threads.
+        """
+        if not self.enabled:
+            return build(), 'off'
+        key = self.key(stage, inputs, code)
+        value = self.load(key, kind)
+        if value is not None:
+            print(f"[=] {stage}: cache hit ({key[:12]})")
+            return value, 'hit'
+        value = build()
+        self.store(key, value, kind)
+        return value, 'miss'
+
+    def fetch_path(self, stage, inputs, write, kind="bytes", code=()):
+        """
+        Return (path, status) of an entry that `write(tmp_path)` produces
+        directly on disk, for outputs too large to pass around in memory.
+        Callers map or stream the file in place. Requires an enabled cache.
+        """
+        if not self.enabled:
+            raise RuntimeError(f"{stage}: fetch_path needs an enabled cache")
+        key = self.key(stage, inputs, code)
+        path = self._path(key, kind)
+        try:
+            os.utime(path)  # refresh LRU position
+            print(f"[=] {stage}: cache hit ({key[:12]})")
+            return path, 'hit'
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict(keep=path)
+        return path, 'miss'
+
+    # ── Maintenance ──
+    def entries(self):
+        """List (mtime, size, path) for every cache entry."""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                found.append((st.st_mtime, st.st_size, path))
+        return found
+
+    def evict(self, keep=None):
+        """
+        Delete least-recently-used entries until under max_bytes, never the
+        entry at `keep` (one just written, which the caller is about to use).
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        return evicted
+
+    def summary(self):
+        """Hit/miss summary printed at the end of a build."""
+        if not self.enabled:
+            return "[*] Stage cache disabled (--no-cache)"
+        hits = [s for s, r in self.stats if r == 'hit']
+        misses = [s for s, r in self.stats if r == 'miss']
+        size = sum(size for _, size, _ in self.entries())
+        line = f"[*] Stage cache: {len(hits)} hit(s), {len(misses)} miss(es), {size / 1024 / 1024:.1f} MB on disk"
+        if hits:
+            line += f"\n    hit:  {', '.join(hits)}"
+        if misses:
+            line += f"\n    miss: {', '.join(misses)}"
+        return line
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Minimal DAG scheduler for build stages.
+
+A build is declared as a list of Stage(name, func, deps, executor). A stage
+runs as soon as all of its dependencies have finished and is called as
+func(*dep_results) in dependency order. Executors:
+
+  process  CPU-bound NumPy work, run on a ProcessPoolExecutor
+  thread   subprocess-bound work (ffmpeg), run on a ThreadPoolExecutor so it
+           overlaps with the process pool without occupying a CPU worker
+  inline   cheap glue, run in the scheduling process
+
+Stage functions (and their results) must be picklable for the process
+executor. Every stage is timed; critical_path() and format_report() show
+which chain of stages bounds the build's wall time.
+"""
+
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+Stage = namedtuple('Stage', 'name func deps executor')
+Stage.__new__.__defaults__ = ((), 'process')
+
+StageTiming = namedtuple('StageTiming', 'start end executor pid')
+EXECUTORS = ('process', 'thread', 'inline')
+
+
+class StageError(RuntimeError):
+    """A stage raised; the original exception is chained."""
+
+
+def _timed_call(func, args):
+    """Run func(*args) and return (result, start, end, pid) with wall-clock times."""
+    start = time.time()
+    result = func(*args)
+    return result, start, time.time(), os.getpid()
+
+
+def _validate(stages):
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stage names in {names}")
+    known = set(names)
+    for s in stages:
+        if s.executor not in EXECUTORS:
+            raise ValueError(f"Stage '{s.name}': unknown executor '{s.executor}'")
+        missing = [d for d in s.deps if d not in known]
+        if missing:
+            raise ValueError(f"Stage '{s.name}' depends on unknown stage(s) {missing}")
+    # Cycle check (Kahn)
+    indegree = {s.name: len(s.deps) for s in stages}
+    children = {s.name: [] for s in stages}
+    for s in stages:
+        for d in s.deps:
+            children[d].append(s.name)
+    ready = [n for n, deg in indegree.items() if deg == 0]
+    seen = 0
+    while ready:
+        n = ready.pop()
+        seen += 1
+        for c in children[n]:
+            indegree[c] -= 1
+            if indegree[c] == 0:
+                ready.append(c)
+    if seen != len(stages):
+        raise ValueError("Stage graph contains a cycle")
+
+
+def run_stages(stages, max_workers=None, io_workers=4):
+    """
+    Execute a stage graph. Returns (results, timings) dicts keyed by stage name.
+
+    max_workers=1 runs every stage inline, in declaration order where
+    dependencies allow, which is handy for debugging.
+    """
+    _validate(stages)
+    by_name = {s.name: s for s in stages}
+    results, timings = {}, {}
+    pending = list(stages)
+
+    def ready_stages():
+        return [s for s in pending if all(d in results for d in s.deps)]
+
+    def record(stage, outcome):
+        result, start, end, pid = outcome
+        results[stage.name] = result
+        timings[stage.name] = StageTiming(start, end, stage.executor, pid)
+
+    if max_workers == 1:
+        while pending:
+            stage = ready_stages()[0]
+            pending.remove(stage)
+            record(stage, _timed_call(stage.func, [results[d] for d in stage.deps]))
+        return results, timings
+
+    with ProcessPoolExecutor(max_workers=max_workers) as procs, \
+            ThreadPoolExecutor(max_workers=io_workers) as threads:
+        running = {}
+        while pending or running:
+            for stage in ready_stages():
+                pending.remove(stage)
+                args = [results[d] for d in stage.deps]
+                if stage.executor == 'inline':
+                    record(stage, _timed_call(stage.func, args))
+                    continue
+                pool = procs if stage.executor == 'process' else threads
+                running[pool.submit(_timed_call, stage.func, args)] = stage.name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = by_name[running.pop(future)]
+                try:
+                    record(stage, future.result())
+                except Exception as e:
+                    for other in running:
+                        other.cancel()
+                    raise StageError(f"Stage '{stage.name}' failed: {e}") from e
+    return results, timings
+
+
+# ─────────────────────────────────────────────
+# Reporting
+# ─────────────────────────────────────────────
+def critical_path(stages, timings):
+    """Return (names, seconds) of the longest duration-weighted dependency chain."""
+    by_name = {s.name: s for s in stages}
+    best = {}
+
+    def longest(name):
+        if name not in best:
+            dur = timings[name].end - timings[name].start
+            chains = [longest(d) for d in by_name[name].deps]
+            prev = max(chains, key=lambda c: c[1], default=([], 0.0))
+            best[name] = (prev[0] + [name], prev[1] + dur)
+        return best[name]
+
+    return max((longest(s.name) for s in stages), key=lambda c: c[1], default=([], 0.0))
+
+
+def format_report(stages, timings, wall=None):
+    """Timeline table plus the critical path, as a printable string."""
+    if not timings:
+        return "  (no stages ran)"
+    t0 = min(t.start for t in timings.values())
+    path, path_s = critical_path(stages, timings)
+    lines = [f"  {'stage':<14} {'executor':<8} {'start':>8} {'duration':>9}"]
+    for s in sorted(stages, key=lambda s: timings[s.name].start):
+        t = timings[s.name]
+        mark = '*' if s.name in path else ' '
+        lines.append(f"{mark} {s.name:<14} {t.executor:<8} {t.start - t0:7.3f}s {t.end - t.start:8.3f}s")
+    lines.append(f"  Critical path: {' -> '.join(path)} ({path_s:.3f}s)")
+    if wall is not None:
+        serial = sum(t.end - t.start for t in timings.values())
+        lines.append(f"  Wall time: {wall:.3f}s (stages sum to {serial:.3f}s serially)")
+    return '\n'.join(lines)
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+All-bit-plane steganalysis scanner for The Snap's generated images.
+
+Checks gauntlet.png the way zsteg-style tools see it. That means the LSB
+payload should sit in the red LSB, read row by row, and nowhere else. It
+also means the base64 decoys in that payload should be as easy to find as
+the real string.
+
+  planes    All 24 bit planes (R/G/B x bits 0-7) are built with eight
+            whole-array shift-and-mask ops over the pixel array.
+  orders    Each plane is read row-major (xy) and column-major (yx). All
+            48 streams are packed into bytes at once with np.packbits.
+  runs      Printable-text and base64-alphabet runs come from one
+            256-entry byte-class lookup over all streams. A block test
+            (any all-True aligned block of min_len / 2) drops the streams
+            that cannot hold a run. np.diff run edges then find the exact
+            runs in the rest. Only runs of min_len bytes or more reach
+            Python.
+            base64 runs that decode cleanly are reported with what they
+            decode to.
+  chi2      Per plane, the bit-balance chi-square (ones vs zeros). Per
+            channel, the Westfeld-Pfitzmann pairs-of-values chi-square.
+            Both come from the three channel histograms. The
+            pairs-of-values p-value is near 1 when the LSBs look like
+            an embedded random payload and near 0 for a natural image.
+
+Input can be a PNG, or any file with a PNG layer (the_snap.mp3), which is
+carved out in memory with carver.py.
+
+Usage:
+  python3 stegscan.py [file ...]                     # default: gauntlet.png
+  python3 stegscan.py --manifest variants/manifest.json
+  python3 stegscan.py --json file.png
+"""
+
+import argparse
+import base64
+import binascii
+import io
+import json
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+CHANNELS = "RGB"
+ORDERS = ("xy", "yx")                  # row-major, column-major
+MIN_TEXT = 16
+MIN_BASE64 = 16
+MIN_DISTINCT = 4                       # ignore runs like 'UUUUUUUU' from smooth planes
+
+Finding = namedtuple('Finding', 'plane order offset kind text decoded')
+PlaneStats = namedtuple('PlaneStats', 'plane ones chi2')
+ChannelStats = namedtuple('ChannelStats', 'channel chi2 dof p_embedded')
+
+# Byte classes: 1 = printable, 3 = printable and in the base64 alphabet
+TEXT, BASE64 = 1, 3
+_CLASSES = np.zeros(256, dtype=np.uint8)
+_CLASSES[32:127] = TEXT
+_CLASSES[[9, 10, 13]] = TEXT
+_CLASSES[np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=',
+                       dtype=np.uint8)] = BASE64
+_WORD_TYPES = {2: np.uint16, 4: np.uint32, 8: np.uint64}      # block sizes tested as one word
+
+
+def plane_name(index):
+    """'R0' .. 'B7' for plane index channel * 8 + bit (bit 0 = LSB)."""
+    return f"{CHANNELS[index // 8]}{index % 8}"
+
+
+def _pixels(source):
+    """(H, W, 3) uint8 array of an image path, PNG bytes, PIL image or array."""
+    if isinstance(source, np.ndarray):
+        return np.ascontiguousarray(source[..., :3], dtype=np.uint8)
+    if isinstance(source, Image.Image):
+        return np.asarray(source.convert('RGB'))
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return np.asarray(Image.open(io.BytesIO(source)).convert('RGB'))
+    return _pixels(png_bytes(source))
+
+
+def png_bytes(path):
+    """The PNG in `path`: the whole file, or the carved PNG layer of a polyglot."""
+    from carver import carve_layers, mapped
+
+    with mapped(path) as buf:
+        for layer in carve_layers(buf):
+            if layer["kind"] == "png":
+                return bytes(buf[layer["offset"]:layer["offset"] + layer["size"]])
+    raise ValueError(f"No PNG layer found in {path}")
+
+
+# ─────────────────────────────────────────────
+# Bit planes
+# ─────────────────────────────────────────────
+def bit_planes(arr):
+    """(24, H, W) 0/1 planes; plane channel * 8 + bit, bit 0 = LSB."""
+    height, width, channels = arr.shape
+    planes = np.empty((channels, 8, height, width), dtype=np.uint8)
+    for bit in range(8):
+        planes[:, bit] = ((arr >> bit) & 1).transpose(2, 0, 1)
+    return planes.reshape(channels * 8, height, width)
+
+
+def plane_streams(planes):
+    """{order: (24, n_bytes) uint8} of every plane read in each order, MSB-first bytes."""
+    n = planes.shape[0]
+    return {"xy": np.packbits(planes.reshape(n, -1), axis=1),
+            "yx": np.packbits(planes.transpose(0, 2, 1).reshape(n, -1), axis=1)}
+
+
+# ─────────────────────────────────────────────
+# Runs
+# ─────────────────────────────────────────────
+def _runs(mask, min_len):
+    """
+    (row, start, length) of True runs of >= min_len along axis 1 of a 2-D
+    mask. Such a run covers at least one whole aligned block of min_len // 2
+    and the rest of it lies in the neighbouring blocks, so the exact edge
+    search only looks at all-True blocks and their neighbours.
+    """
+    half = max(1, min_len // 2)
+    rows, width = mask.shape
+    n_blocks = -(-width // half)
+    mask = np.ascontiguousarray(mask)
+    if width % half:
+        padded = np.zeros((rows, n_blocks * half), dtype=bool)
+        padded[:, :width] = mask
+        mask = padded
+    segments = mask.reshape(rows, n_blocks, half)
+    if half in _WORD_TYPES:
+        # One integer compare per block instead of a reduction over it
+        full = mask.view(_WORD_TYPES[half]) == int.from_bytes(b'\x01' * half, 'little')
+    else:
+        full = segments.all(axis=2)
+    near = full.copy()
+    near[:, 1:] |= full[:, :-1]
+    near[:, :-1] |= full[:, 1:]
+    seg_rows, seg_blocks = np.nonzero(near)
+    if not len(seg_rows):
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, empty
+
+    # Candidate blocks back to back; a run may only continue across a block
+    # boundary when the next candidate is the next block of the same row
+    flat = segments[seg_rows, seg_blocks].reshape(-1)
+    joined = np.zeros(len(seg_rows), dtype=bool)
+    joined[:-1] = (seg_rows[1:] == seg_rows[:-1]) & (seg_blocks[1:] == seg_blocks[:-1] + 1)
+    before = np.zeros_like(flat)
+    before[1:] = flat[:-1]
+    before[half::half] &= joined[:-1]
+    after = np.zeros_like(flat)
+    after[:-1] = flat[1:]
+    after[half - 1::half] &= joined
+    starts = np.flatnonzero(flat & ~before)
+    lengths = np.flatnonzero(flat & ~after) + 1 - starts
+    seg, offset = np.divmod(starts, half)
+    keep = lengths >= min_len
+    return seg_rows[seg[keep]], seg_blocks[seg[keep]] * half + offset[keep], lengths[keep]
+
+
+def _decode_base64(run):
+    """Decoded bytes of a base64 run (trailing partial quantum dropped), or None."""
+    usable = run[:len(run) - len(run) % 4]
+    try:
+        return base64.b64decode(usable, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def find_runs(streams, min_text=MIN_TEXT, min_base64=MIN_BASE64):
+    """Text and base64 findings in every (order, plane) stream."""
+    findings = []
+    for order, data in streams.items():
+        classes = _CLASSES[data]            # one table lookup for both kinds
+        for kind, mask, min_len in (("text", classes != 0, min_text),
+                                    ("base64", classes == BASE64, min_base64)):
+            for row, start, length in zip(*_runs(mask, min_len)):
+                run = data[row, start:start + length].tobytes()
+                if len(set(run)) < MIN_DISTINCT:
+                    continue
+                decoded = None
+                if kind == "base64":
+                    decoded = _decode_base64(run)
+                    if decoded is None:
+                        continue
+                findings.append(Finding(plane_name(int(row)), order, int(start), kind,
+                                        run.decode('latin-1'), decoded))
+    return findings
+
+
+# ─────────────────────────────────────────────
+# Chi-square statistics
+# ─────────────────────────────────────────────
+def _chi2_sf(x, dof):
+    """Chi-square survival function (Wilson-Hilferty approximation, no SciPy)."""
+    if dof <= 0:
+        return 1.0
+    z = ((x / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def histograms(arr):
+    """(3, 256) int64 value histogram of each channel."""
+    return np.stack([np.bincount(arr[..., c].reshape(-1), minlength=256)
+                     for c in range(arr.shape[2])])
+
+
+def plane_stats(hists):
+    """
+    Fraction of ones and bit-balance chi-square (1 dof) for every plane,
+    read off the channel histograms rather than the planes themselves.
+    """
+    n = int(hists[0].sum())
+    bits = (np.arange(256)[:, None] >> np.arange(8)) & 1      # (value, bit)
+    ones = (hists @ bits).reshape(-1)                          # plane c * 8 + bit
+    chi2 = (2 * ones - n) ** 2 / n
+    return [PlaneStats(plane_name(i), ones[i] / n, float(chi2[i])) for i in range(len(ones))]
+
+
+def pov_stats(hists):
+    """
+    Pairs-of-values chi-square per channel. LSB embedding equalizes the
+    counts of 2k and 2k+1; p_embedded near 1 means they are equalized.
+    """
+    stats = []
+    for name, hist in zip(CHANNELS, hists.astype(np.float64)):
+        even, odd = hist[0::2], hist[1::2]
+        expected = (even + odd) / 2
+        used = expected > 0
+        chi2 = float((((even - expected) ** 2)[used] / expected[used]).sum())
+        dof = int(used.sum()) - 1
+        stats.append(ChannelStats(name, chi2, dof, _chi2_sf(chi2, dof)))
+    return stats
+
+
+# ─────────────────────────────────────────────
+# Scan
+# ─────────────────────────────────────────────
+def scan(source, min_text=MIN_TEXT, min_base64=MIN_BASE64):
+    """Scan an image (see _pixels for accepted sources). Returns a report dict."""
+    start = time.perf_counter()
+    arr = _pixels(source)
+    hists = histograms(arr)
+    report = {
+        "shape": arr.shape,
+        "findings": find_runs(plane_streams(bit_planes(arr)), min_text, min_base64),
+        "planes": plane_stats(hists),
+        "channels": pov_stats(hists),
+    }
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def check_payload(report, expected, plane="R0", order="xy"):
+    """
+    Problems (a list of strings, empty if fine) with where the payload
+    shows up: every expected base64 string must be found in `plane` read in
+    `order`, and no text or base64 may be found in any other stream.
+    """
+    problems = []
+    home = [f for f in report["findings"] if (f.plane, f.order) == (plane, order)]
+    for text in expected:
+        if not any(f.kind == "base64" and text in f.text for f in home):
+            problems.append(f"{text!r} not found in {plane}/{order}")
+    for f in report["findings"]:
+        if (f.plane, f.order) != (plane, order):
+            problems.append(f"{f.kind} in {f.plane}/{f.order} @ {f.offset}: {f.text[:40]!r}")
+    return problems
+
+
+def format_report(report):
+    lines = [f"  {report['shape'][1]}x{report['shape'][0]} image, "
+             f"24 planes x {len(ORDERS)} orders in {report['seconds'] * 1000:.1f} ms"]
+    for f in report["findings"]:
+        shown = f"  -> {f.decoded!r}" if f.decoded is not None else ''
+        lines.append(f"  {f.plane}/{f.order} @ {f.offset:<7} {f.kind:<6} {f.text[:48]!r}{shown}")
+    if not report["findings"]:
+        lines.append("  no text or base64 runs found")
+    skewed = [p for p in report["planes"] if 0 < p.ones < 0.4 or 0.6 < p.ones < 1]
+    for p in skewed:
+        lines.append(f"  plane {p.plane}: {p.ones:.4f} ones (chi2 {p.chi2:.1f})")
+    for c in report["channels"]:
+        lines.append(f"  channel {c.channel}: pairs-of-values chi2 {c.chi2:.1f} "
+                     f"({c.dof} dof), p(embedded) {c.p_embedded:.3f}")
+    return '\n'.join(lines)
+
+
+def _report_json(report):
+    return {
+        "shape": list(report["shape"]),
+        "seconds": report["seconds"],
+        "findings": [{**f._asdict(), "decoded": f.decoded.decode('latin-1')
+                      if f.decoded is not None else None} for f in report["findings"]],
+        "planes": [p._asdict() for p in report["planes"]],
+        "channels": [c._asdict() for c in report["channels"]],
+    }
+
+
+def _expected_strings(part2):
+    """The three base64 strings build_lsb_payload() hides for `part2`."""
+    import contextlib
+    import build_challenge as snap
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return snap.build_lsb_payload(part2).decode().split('\n')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Scan all 24 bit planes of an image")
+    parser.add_argument('files', nargs='*', help="PNG files or challenge files with a PNG layer")
+    parser.add_argument('--manifest', help="variants manifest.json: scan and check every team")
+    parser.add_argument('--min-len', type=int, default=MIN_TEXT, help="shortest run reported")
+    parser.add_argument('--json', action='store_true', help="print reports as JSON")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    if args.manifest:
+        root = os.path.dirname(os.path.abspath(args.manifest))
+        with open(args.manifest) as f:
+            for team in json.load(f)["teams"]:
+                jobs.append((os.path.join(root, team["artifact"]), team["parts"][1]))
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "challenge_output", "gauntlet.png")
+    for path in args.files or ([] if args.manifest else [default]):
+        jobs.append((path, None))
+
+    failures = 0
+    start = time.perf_counter()
+    for path, part2 in jobs:
+        try:
+            report = scan(path, args.min_len, args.min_len)
+        except (OSError, ValueError) as e:
+            print(f"[!] {path}: {e}")
+            failures += 1
+            continue
+        problems = check_payload(report, _expected_strings(part2)) if part2 else []
+        failures += bool(problems)
+        if args.json:
+            print(json.dumps({"file": path, **_report_json(report), "problems": problems}))
+            continue
+        print(f"[*] {path}")
+        print(format_report(report))
+        for problem in problems:
+            print(f"  [!] {problem}")
+    if not args.json:
+        print(f"[=] {len(jobs)} image(s) in {time.perf_counter() - start:.2f}s")
+    if failures:
+        print(f"[!] {failures}/{len(jobs)} image(s) failed the scan or the payload check")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
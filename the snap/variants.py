@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Bulk per-team variant builder for "The Snap".
+
+Every team gets its own flag so answers cannot be shared. Flag parts are
+derived from HMAC-SHA256(secret, team_id), keeping the original phrase and
+adding a short hex tag to each layer:
+
+    MYTHIX{I_<t1>_4m_Ir0n_<t2>_M4n_6000_<t3>}
+    part1 = "MYTHIX{I_<t1>_"   spectrogram
+    part2 = "4m_Ir0n_<t2>_"     LSB -> base64 -> hex
+    part3 = "M4n_6000_<t3>}"    6 kHz morse -> hex
+
+Work that does not depend on the flag is done once and shared with every
+worker: the base gauntlet image, the 800 Hz decoy morse channel and the
+mission_log.txt decoy. The decoded source MP3 PCM comes from the stage
+cache as a raw file that every worker maps read-only, so all of them share
+one page-cache copy. Each team then only
+embeds its LSB payload, synthesizes its 6 kHz channel and spectrogram text,
+and encodes its MP3, in parallel across a process pool. Every artifact is
+then solved by verifier.py against its own flag before it is listed.
+
+Usage:
+  python3 variants.py teams.txt --secret "$SNAP_VARIANT_SECRET" [-j 8]
+
+teams.txt holds one team ID per line (blank lines and # comments ignored).
+Artifacts go to challenge_output/variants/<team>/the_snap.mp3, next to QA
+spectrograms of its audio layers (qa_*.png), and a manifest.json maps teams
+to artifacts and flags.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import build_challenge as snap
+from audio_io import map_pcm
+from gauntlet_render import render_gauntlet_array
+from png_encoder import PROFILES as PNG_PROFILES, resolve_profile
+from stage_cache import StageCache, file_digest
+from team_variants import assign_dirs, assign_unique, read_team_ids, team_digest
+from verifier import format_results, passed, verify_file
+
+VARIANTS_DIR = os.path.join(snap.OUTPUT_DIR, "variants")
+TAG_CHARS = (2, 2, 4)      # hex chars of per-team tag in parts 1, 2, 3
+VARIANT_PNG_PROFILE = "fast"   # PNG encoding dominates per-variant time; trade a few KB
+
+# Shared, flag-independent material (set in each worker by _init_worker)
+_shared = {}
+
+
+# ─────────────────────────────────────────────
+# Flag derivation
+# ─────────────────────────────────────────────
+def derive_flag_parts(team_id, secret, attempt=0):
+    """Deterministically derive (part1, part2, part3) for one team."""
+    digest = team_digest(secret, team_id, attempt).hex()
+    t1, t2, t3 = (digest[sum(TAG_CHARS[:i]):sum(TAG_CHARS[:i + 1])] for i in range(3))
+    return (f"MYTHIX{{I_{t1}_", f"4m_Ir0n_{t2}_", f"M4n_6000_{t3}}}")
+
+
+def assign_flags(team_ids, secret):
+    """Derive flag parts for all teams, re-deriving on the (rare) collision."""
+    return assign_unique(team_ids, lambda team, attempt: derive_flag_parts(team, secret, attempt),
+                         key=''.join)
+
+
+# ─────────────────────────────────────────────
+# Shared work
+# ─────────────────────────────────────────────
+def build_shared(cache_dir=snap.CACHE_DIR):
+    """Compute every flag-independent layer once (the source PCM as a cached file)."""
+    cache = StageCache(cache_dir, snap.CACHE_MAX_MB * 1024 * 1024)
+    pcm_path, _ = snap.source_pcm_path(cache)
+    return {
+        "base_image": render_gauntlet_array(800, 600),
+        "source_pcm_path": pcm_path,
+        "decoy_morse": snap.generate_decoy_morse(),
+        "mission_log": snap.build_mission_log(),
+    }
+
+
+def _init_worker(shared):
+    _shared.update(shared)
+    _shared["source_pcm"] = map_pcm(shared["source_pcm_path"])
+
+
+def build_variant(team_id, parts, team_dir, verify=True, png_profile=VARIANT_PNG_PROFILE,
+                  qa=True):
+    """Build one team's the_snap.mp3 (in team_dir) from the shared material and solve it."""
+    part1, part2, part3 = parts
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        lsb_payload = snap.build_lsb_payload(part2)
+        png_data = snap.build_png_layer(lsb_payload, base_image=_shared["base_image"],
+                                        png_profile=png_profile)
+        wav_data = snap.generate_morse_wav(part3, decoy_samples=_shared["decoy_morse"])
+        spec_samples = snap.generate_spectrogram_audio(part1)
+        mp3_data = snap.mix_spectrogram_into_mp3(snap.INPUT_MP3, spec_samples,
+                                                 audio=_shared["source_pcm"])
+
+    os.makedirs(team_dir, exist_ok=True)
+    artifact = os.path.join(team_dir, "the_snap.mp3")
+    with contextlib.redirect_stdout(io.StringIO()):
+        size = snap.write_challenge_file(artifact, mp3_data, png_data, wav_data,
+                                         _shared["mission_log"])
+    verified = None
+    if verify:
+        results = verify_file(artifact, parts)
+        verified = {r.name: r.ok for r in results}
+        if not passed(results):
+            raise RuntimeError(f"Variant for {team_id!r} failed verification:\n"
+                               f"{format_results(results)}")
+    qa_images = None
+    if qa:
+        infos = snap.render_qa_images(mp3_data, wav_data, team_dir, prefix="qa_")
+        qa_images = [os.path.basename(info["path"]) for info in infos]
+
+    return {
+        "team": team_id,
+        "flag": ''.join(parts),
+        "parts": list(parts),
+        "artifact": os.path.join(os.path.basename(team_dir), "the_snap.mp3"),
+        "size": size,
+        "sha256": file_digest(artifact),
+        "verified": verified,
+        "qa": qa_images,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def build_variants(team_ids, secret, out_dir=VARIANTS_DIR, jobs=None, verify=True,
+                   png_profile=VARIANT_PNG_PROFILE, qa=True):
+    """Build every team's variant and write manifest.json. Returns the manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    profile = resolve_profile(png_profile)
+    if profile is not None and jobs != 1:
+        # The process pool already uses every CPU: deflate each PNG in one thread
+        profile = profile._replace(workers=1)
+    flags = assign_flags(team_ids, secret)
+    dirs = {team: os.path.join(out_dir, name) for team, name in assign_dirs(team_ids).items()}
+
+    print(f"[*] Building shared layers (gauntlet, source PCM, decoys)...")
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        shared = build_shared()
+    print(f"[+] Shared layers ready in {time.perf_counter() - t0:.2f}s")
+
+    print(f"[*] Building {len(team_ids)} team variants...")
+    entries = {}
+    t1 = time.perf_counter()
+    if jobs == 1:
+        _init_worker(shared)
+        for team in team_ids:
+            entries[team] = build_variant(team, flags[team], dirs[team], verify, profile, qa)
+            print(f"    [{len(entries)}/{len(team_ids)}] {team}")
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(shared,)) as pool:
+            futures = {pool.submit(build_variant, team, flags[team], dirs[team], verify,
+                                   profile, qa): team
+                       for team in team_ids}
+            for future in as_completed(futures):
+                entry = future.result()
+                entries[entry["team"]] = entry
+                print(f"    [{len(entries)}/{len(team_ids)}] {entry['team']}")
+    elapsed = time.perf_counter() - t1
+
+    manifest = {
+        "challenge": "The Snap",
+        "flag_format": "MYTHIX{I_<t1>_4m_Ir0n_<t2>_M4n_6000_<t3>}",
+        "png_profile": png_profile,
+        "teams": [entries[team] for team in team_ids],
+    }
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    rate = len(team_ids) / elapsed if elapsed > 0 else float('inf')
+    print(f"[+] {len(team_ids)} variants in {elapsed:.1f}s ({rate:.1f} variants/s)")
+    print(f"[+] Manifest: {manifest_path}")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build per-team variants of 'The Snap'")
+    parser.add_argument('teams', help="file with one team ID per line")
+    parser.add_argument('--secret', default=os.environ.get('SNAP_VARIANT_SECRET'),
+                        help="HMAC secret for flag derivation (default: $SNAP_VARIANT_SECRET)")
+    parser.add_argument('-o', '--out', default=VARIANTS_DIR, help="output directory")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="worker processes (default: CPU count; 1 = serial)")
+    parser.add_argument('--no-verify', action='store_true',
+                        help="skip solving each variant with verifier.py after building it")
+    parser.add_argument('--no-qa', action='store_true',
+                        help="skip rendering each variant's QA spectrograms")
+    parser.add_argument('--png-profile', default=VARIANT_PNG_PROFILE, choices=list(PNG_PROFILES),
+                        help=f"PNG encoder speed/size profile (default: {VARIANT_PNG_PROFILE})")
+    args = parser.parse_args(argv)
+    if not args.secret:
+        parser.error("a flag secret is required (--secret or $SNAP_VARIANT_SECRET)")
+
+    build_variants(read_team_ids(args.teams), args.secret, args.out, args.jobs,
+                   verify=not args.no_verify, png_profile=args.png_profile, qa=not args.no_qa)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+In-process solve-path verifier for "The Snap".
+
+Solves every layer of a built the_snap.mp3 the way a player would, without
+binwalk or a spectrogram viewer:
+
+  carve        PNG (signature + chunk walk to IEND) and ZIP (local header to
+               end-of-central-directory) found by signature; the MP3 is
+               everything before the PNG
+  lsb          red-channel LSBs -> newline-separated base64 -> the one that
+               decodes to hex -> ASCII (part 2)
+  morse        WAV from the ZIP -> Goertzel envelope at 6 kHz -> dots/dashes
+               -> hex -> ASCII (part 3)
+  spectrogram  MP3 layer decoded through ffmpeg -> tone magnitudes at the
+               seven glyph rows (15-19 kHz) per column -> nearest glyph in
+               the spectro_synth atlas (part 1)
+
+Each layer reports pass/fail, what it recovered and how long it took.
+
+Usage:
+  python3 verifier.py [the_snap.mp3 ...]            # expects the default flag
+  python3 verifier.py --manifest variants/manifest.json
+"""
+
+import argparse
+import base64
+import binascii
+import io
+import json
+import os
+import struct
+import sys
+import time
+import wave
+import zipfile
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+import build_challenge as snap
+from audio_io import decode_pcm
+from lsb_engine import extract_lsb_array
+from spectro_synth import CELL_COLS, GLYPH_ATLAS, GLYPH_ROWS, GLYPHS, row_frequencies
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+ZIP_LOCAL_HEADER = b'PK\x03\x04'
+ZIP_END_RECORD = b'PK\x05\x06'
+WAV_MEMBER = "quantum_signal.wav"
+
+SPECTRO_COL_DURATION = 0.04     # seconds per bitmap column (synthesize_text default)
+SPECTRO_FREQ_RANGE = (15000, 19000)
+MORSE_FRAME_SEC = 0.005         # Goertzel block length for the morse envelope
+
+LayerResult = namedtuple('LayerResult', 'name ok found expected seconds detail')
+Carved = namedtuple('Carved', 'mp3 png zip trailer')
+
+# Glyph index -> character (index 0 is the blank cell)
+GLYPH_CHARS = ' ' + ''.join(GLYPHS)
+MORSE_DECODE = {code: ch for ch, code in snap.MORSE_CODE.items() if code.strip()}
+
+
+class VerifyError(Exception):
+    """A layer could not be solved; the message says which step failed."""
+
+
+# ─────────────────────────────────────────────
+# Carving
+# ─────────────────────────────────────────────
+def _png_end(data, start):
+    """Offset just past IEND for a PNG at `start`, or None if the chunks don't parse."""
+    pos = start + len(PNG_SIGNATURE)
+    while pos + 12 <= len(data):
+        length, ctype = struct.unpack_from('>I4s', data, pos)
+        pos += 12 + length
+        if ctype == b'IEND':
+            return pos if pos <= len(data) else None
+        if not ctype.isalpha():
+            return None
+    return None
+
+
+def _zip_end(data, start):
+    """Offset just past the end-of-central-directory record after `start`."""
+    eocd = data.find(ZIP_END_RECORD, start)
+    if eocd < 0 or eocd + 22 > len(data):
+        return None
+    comment_len, = struct.unpack_from('<H', data, eocd + 20)
+    return eocd + 22 + comment_len
+
+
+def carve(data):
+    """Split a challenge file into its layers by signature. Returns Carved."""
+    png_start = data.find(PNG_SIGNATURE)
+    png_end = None
+    while png_start >= 0:
+        png_end = _png_end(data, png_start)
+        if png_end is not None:
+            break
+        png_start = data.find(PNG_SIGNATURE, png_start + 1)
+    if png_start < 0:
+        raise VerifyError("no PNG signature with a valid chunk chain")
+
+    zip_start = data.find(ZIP_LOCAL_HEADER, png_end)
+    zip_end = _zip_end(data, zip_start) if zip_start >= 0 else None
+    if zip_end is None:
+        raise VerifyError("no ZIP (local header + end record) after the PNG")
+
+    view = memoryview(data)
+    return Carved(view[:png_start], view[png_start:png_end],
+                  view[zip_start:zip_end], view[zip_end:])
+
+
+# ─────────────────────────────────────────────
+# Layer solvers
+# ─────────────────────────────────────────────
+def solve_lsb(png_data):
+    """Recover part 2 from the red-channel LSB payload. Returns (part2, decoys)."""
+    arr = np.asarray(Image.open(io.BytesIO(png_data)).convert('RGB'))
+    payload = extract_lsb_array(arr, channels="R", depth=1).split(b'\x00', 1)[0]
+    found, decoys = None, []
+    for line in payload.split(b'\n'):
+        try:
+            text = base64.b64decode(line, validate=True).decode('ascii')
+        except (binascii.Error, UnicodeDecodeError):
+            continue
+        try:
+            found = bytes.fromhex(text).decode('ascii')
+        except (ValueError, UnicodeDecodeError):
+            decoys.append(text)
+    if found is None:
+        raise VerifyError(f"no base64 -> hex string in {len(payload)}-byte LSB payload")
+    return found, decoys
+
+
+def _tone_magnitudes(frames, freqs, sample_rate):
+    """|DFT| of each (hann-windowed) frame at the given frequencies (Goertzel as matmul)."""
+    n = frames.shape[-1]
+    basis = np.exp(-2j * np.pi * np.outer(np.arange(n), freqs) / sample_rate)
+    basis *= np.hanning(n)[:, None]
+    return np.abs(frames @ basis.astype(np.complex64))
+
+
+def _frames(samples, length, hop):
+    """Strided (n_frames, length) view of `samples`."""
+    if len(samples) < length:
+        return np.zeros((0, length), dtype=samples.dtype)
+    return np.lib.stride_tricks.sliding_window_view(samples, length)[::hop]
+
+
+def _runs(mask):
+    """Run-length encode a boolean array into (values, lengths)."""
+    if len(mask) == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0, dtype=np.int64)
+    edges = np.flatnonzero(np.diff(mask.astype(np.int8))) + 1
+    bounds = np.concatenate(([0], edges, [len(mask)]))
+    return mask[bounds[:-1]], np.diff(bounds)
+
+
+def decode_morse_envelope(on):
+    """Turn an on/off frame mask into text (dot length estimated from the data)."""
+    values, lengths = _runs(on)
+    # Trim leading/trailing silence
+    if len(values) and not values[0]:
+        values, lengths = values[1:], lengths[1:]
+    if len(values) and not values[-1]:
+        values, lengths = values[:-1], lengths[:-1]
+    if len(values) == 0:
+        return ''
+    # One unit = a dot = the gap inside a letter: the shortest cluster of runs
+    unit = float(np.median(lengths[lengths < 2 * lengths.min()]))
+    text, symbol = [], ''
+    for is_on, length in zip(values, lengths):
+        if is_on:
+            symbol += '.' if length < 2 * unit else '-'
+        elif length >= 2 * unit:
+            text.append(MORSE_DECODE.get(symbol, '?'))
+            symbol = ''
+            if length >= 4 * unit:
+                text.append(' ')
+    text.append(MORSE_DECODE.get(symbol, '?'))
+    return ''.join(text)
+
+
+def solve_morse(zip_data, frequency=snap.MORSE_FREQ_REAL):
+    """Recover part 3 from the morse WAV in the ZIP. Returns (part3, raw_morse_text)."""
+    with zipfile.ZipFile(io.BytesIO(zip_data)) as zf:
+        wav_data = zf.read(WAV_MEMBER)
+    with wave.open(io.BytesIO(wav_data)) as wf:
+        sample_rate = wf.getframerate()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype='<i2')
+    samples = pcm.astype(np.float32) / np.float32(32768)
+
+    frame = max(16, int(sample_rate * MORSE_FRAME_SEC))
+    n = len(samples) // frame
+    env = _tone_magnitudes(samples[:n * frame].reshape(n, frame), [frequency], sample_rate)[:, 0]
+    level = np.percentile(env, 99)
+    if level <= 0:
+        raise VerifyError(f"no energy at {frequency} Hz")
+    text = decode_morse_envelope(env > 0.5 * level).strip()
+    try:
+        return bytes.fromhex(text).decode('ascii'), text
+    except (ValueError, UnicodeDecodeError):
+        raise VerifyError(f"{frequency} Hz morse decoded to {text!r}, not hex") from None
+
+
+def _column_bits(samples, sample_rate, freqs, col_len):
+    """Locate the text and return its (rows, cols) on/off matrix."""
+    # Coarse onset: band energy in short frames with a hop of 1/12 column
+    short, hop = col_len // 4, col_len // 12
+    mags = _tone_magnitudes(_frames(samples, short, hop), freqs, sample_rate)
+    if len(mags) == 0 or not mags.max(axis=0).all():
+        raise VerifyError("no energy at the spectrogram row frequencies")
+    # Per-row normalization: a glyph like '_' lights a single row
+    active = np.flatnonzero((mags / mags.max(axis=0)).max(axis=1) > 0.25)
+    onset = active[0] * hop + short // 2
+    end = active[-1] * hop + short // 2
+
+    # Central half of every column slot, aligned to the onset
+    n_cols = int(round((end - onset) / col_len)) + 1
+    starts = onset + np.arange(n_cols) * col_len + col_len // 4
+    starts = starts[starts + col_len // 2 <= len(samples)]
+    frames = np.stack([samples[s:s + col_len // 2] for s in starts])
+    mags = _tone_magnitudes(frames, freqs, sample_rate).T           # (rows, cols)
+    level = np.percentile(mags, 95, axis=1, keepdims=True)
+    return (mags > 0.4 * level).astype(np.uint8)
+
+
+def decode_glyph_bits(bits):
+    """Nearest-glyph decode of a (7, cols) bitmap whose first lit column is column 0."""
+    atlas = GLYPH_ATLAS.reshape(len(GLYPH_ATLAS), -1).astype(np.int16)
+    best = None
+    # The first lit column may sit anywhere in the first cell: try every shift
+    for shift in range(CELL_COLS):
+        padded = np.pad(bits, ((0, 0), (shift, (-(bits.shape[1] + shift)) % CELL_COLS)))
+        cells = padded.reshape(GLYPH_ROWS, -1, CELL_COLS).transpose(1, 0, 2)
+        cells = cells.reshape(len(cells), -1).astype(np.int16)
+        dist = np.abs(cells[:, None, :] - atlas[None, :, :]).sum(axis=2)   # (cells, glyphs)
+        idx = dist.argmin(axis=1)
+        score = int(dist[np.arange(len(idx)), idx].sum())
+        if best is None or score < best[0]:
+            best = (score, ''.join(GLYPH_CHARS[i] for i in idx))
+    return best[1].strip(), best[0]
+
+
+def solve_spectrogram(mp3_data, sample_rate=snap.SAMPLE_RATE):
+    """Recover part 1 from the 15-19 kHz text in the MP3. Returns (part1, bit_errors)."""
+    samples = decode_pcm(bytes(mp3_data), sample_rate).astype(np.float32)
+    freqs = row_frequencies(GLYPH_ROWS, *SPECTRO_FREQ_RANGE)
+    bits = _column_bits(samples, sample_rate, freqs, int(SPECTRO_COL_DURATION * sample_rate))
+    return decode_glyph_bits(bits)
+
+
+# ─────────────────────────────────────────────
+# Driver
+# ─────────────────────────────────────────────
+def _failure(e):
+    """Detail text for a layer that raised: corrupt data must fail the layer, not the run."""
+    return str(e) if isinstance(e, VerifyError) else f"{type(e).__name__}: {e}"
+
+
+def _run_layer(name, expected, solve, *args):
+    start = time.perf_counter()
+    try:
+        found, detail = solve(*args)
+        ok = expected is None or found == expected
+    except Exception as e:
+        found, detail, ok = None, _failure(e), False
+    return LayerResult(name, ok, found, expected, time.perf_counter() - start, detail)
+
+
+def verify_data(data, parts=(snap.FLAG_PART1, snap.FLAG_PART2, snap.FLAG_PART3)):
+    """
+    Solve every layer of an in-memory challenge file.
+
+    `parts` are the expected (part1, part2, part3); pass None for a part to
+    only report what was recovered. Returns a list of LayerResult.
+    """
+    part1, part2, part3 = parts if parts is not None else (None, None, None)
+    start = time.perf_counter()
+    try:
+        layers = carve(data)
+    except Exception as e:
+        return [LayerResult("carve", False, None, None, time.perf_counter() - start, _failure(e))]
+    sizes = f"mp3={len(layers.mp3)} png={len(layers.png)} zip={len(layers.zip)} tail={len(layers.trailer)}"
+    results = [LayerResult("carve", True, None, None, time.perf_counter() - start, sizes)]
+
+    def lsb():
+        found, decoys = solve_lsb(layers.png)
+        return found, f"{len(decoys)} decoy(s)"
+
+    def morse():
+        found, text = solve_morse(layers.zip)
+        return found, text
+
+    def spectrogram():
+        found, errors = solve_spectrogram(layers.mp3)
+        return found, f"{errors} bit error(s) vs glyph atlas"
+
+    results.append(_run_layer("lsb", part2, lsb))
+    results.append(_run_layer("morse", part3, morse))
+    results.append(_run_layer("spectrogram", part1, spectrogram))
+    return results
+
+
+def verify_file(path, parts=(snap.FLAG_PART1, snap.FLAG_PART2, snap.FLAG_PART3)):
+    """Verify a challenge file on disk. Returns a list of LayerResult."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return verify_data(data, parts)
+
+
+def passed(results):
+    return all(r.ok for r in results)
+
+
+def format_results(results):
+    """Per-layer pass/fail table as a printable string."""
+    lines = [f"  {'layer':<12} {'result':<6} {'time':>8}  recovered"]
+    for r in results:
+        shown = repr(r.found) if r.found is not None else ''
+        if r.expected is not None and not r.ok:
+            shown += f" (expected {r.expected!r})"
+        lines.append(f"  {r.name:<12} {'PASS' if r.ok else 'FAIL':<6} {r.seconds:7.3f}s  "
+                     f"{shown}{'  ' if shown else ''}[{r.detail}]")
+    total = sum(r.seconds for r in results)
+    lines.append(f"  {'total':<12} {'PASS' if passed(results) else 'FAIL':<6} {total:7.3f}s")
+    return '\n'.join(lines)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Solve every layer of a built 'The Snap'")
+    parser.add_argument('files', nargs='*', help=f"challenge files (default: {snap.FINAL_FILE})")
+    parser.add_argument('--manifest', help="variants manifest.json: verify every team's artifact")
+    parser.add_argument('--any', action='store_true',
+                        help="report what each layer decodes to without expecting a flag")
+    args = parser.parse_args(argv)
+
+    jobs = []
+    if args.manifest:
+        root = os.path.dirname(os.path.abspath(args.manifest))
+        with open(args.manifest) as f:
+            for team in json.load(f)["teams"]:
+                jobs.append((os.path.join(root, team["artifact"]), tuple(team["parts"])))
+    for path in args.files or ([] if args.manifest else [snap.FINAL_FILE]):
+        jobs.append((path, None if args.any else
+                     (snap.FLAG_PART1, snap.FLAG_PART2, snap.FLAG_PART3)))
+
+    failures = 0
+    for path, parts in jobs:
+        results = verify_file(path, parts)
+        print(f"[*] {path}")
+        print(format_results(results))
+        failures += not passed(results)
+    if failures:
+        print(f"[!] {failures}/{len(jobs)} file(s) failed verification")
+        sys.exit(1)
+    print(f"[+] {len(jobs)} file(s) verified")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])